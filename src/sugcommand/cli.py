@@ -127,7 +127,7 @@ def suggest(ctx: click.Context,
             # Fallback to direct engine
             engine = SuggestionEngine(config)
             start_time = time.time()
-            suggestions = engine.get_suggestions(input_text)
+            suggestions = engine.get_suggestions(input_text, os.getcwd())
             elapsed_time = time.time() - start_time
         
         # Apply limit if specified
@@ -536,6 +536,120 @@ def status(ctx: click.Context) -> None:
         click.echo(f"{shell_name.upper():6}: Installed: {installed}  Daemon: {daemon_status}  Script: {status['completion_script']}")
 
 
+@main.group()
+def bench() -> None:
+    """Offline benchmarks."""
+    pass
+
+
+@bench.command()
+@click.argument('history_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--train-fraction', default=0.8, type=click.FloatRange(0.0, 1.0, min_open=True, max_open=True),
+              help='Share of the history (oldest first) to train on')
+@click.option('--limit', '-n', default=None, type=int, help='Maximum number of commands to replay')
+@click.option('--cwd', default=None, type=click.Path(file_okay=False), help='Working directory to report')
+@click.option('--no-learn', is_flag=True, help='Do not record replayed commands as they finish')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write the results as JSON')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON')
+@click.pass_context
+def replay(ctx: click.Context,
+           history_file: str,
+           train_fraction: float,
+           limit: Optional[int],
+           cwd: Optional[str],
+           no_learn: bool,
+           output: Optional[str],
+           as_json: bool) -> None:
+    """Train on the start of a history file and replay the rest keystroke by keystroke."""
+    import json
+    from . import __version__
+    from .utils.benchmark import replay_history
+    
+    config: ConfigManager = ctx.obj['config']
+    formatter: SuggestionFormatter = ctx.obj['formatter']
+    
+    try:
+        report = replay_history(Path(history_file), config, train_fraction, limit, cwd, not no_learn)
+        report['version'] = __version__
+        
+        if output:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+        
+        if as_json:
+            click.echo(json.dumps(report, indent=2))
+            return
+        
+        latency = report['latency_ms']
+        lines = [
+            f"{formatter.colors.get('bright', '')}Replay of {history_file}:{formatter.colors.get('reset', '')}",
+            f"Commands: {report['train_commands']} trained, {report['test_commands']} replayed "
+            f"({report['keystrokes']} keystrokes)",
+            f"Latency: p50 {latency['p50']:.3f}ms  p95 {latency['p95']:.3f}ms  p99 {latency['p99']:.3f}ms",
+            f"Late sources: {report['late_keystrokes']} keystrokes missed the "
+            f"{report['source_deadline_ms']}ms deadline"
+            f"{' (parallel sources off)' if not report['parallel_sources'] else ''}",
+            f"Hit@1: {report['hit@1']:.1%}  Hit@5: {report['hit@5']:.1%}",
+            f"Keystrokes saved: {report['keystrokes_saved']} ({report['keystrokes_saved_ratio']:.1%})",
+        ]
+        click.echo("\n".join(lines))
+        if output:
+            click.echo(formatter.format_success(f"Results written to {output}"))
+    
+    except Exception as e:
+        click.echo(formatter.format_error(f"Benchmark failed: {e}"))
+        sys.exit(1)
+
+
+@bench.command()
+@click.argument('history_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--train-fraction', default=0.8, type=click.FloatRange(0.0, 1.0, min_open=True, max_open=True),
+              help='Share of the history (oldest first) the engine learns from')
+@click.option('--limit', '-n', default=None, type=int, help='Maximum number of commands to fit on')
+@click.option('--cwd', default=None, type=click.Path(file_okay=False), help='Working directory to report')
+@click.option('--dry-run', is_flag=True, help='Show the fitted weights without saving them')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON')
+@click.pass_context
+def tune(ctx: click.Context,
+         history_file: str,
+         train_fraction: float,
+         limit: Optional[int],
+         cwd: Optional[str],
+         dry_run: bool,
+         as_json: bool) -> None:
+    """Fit the ranking weights to a history file and save them in the configuration."""
+    import json
+    from .utils.tuning import tune_weights
+    
+    config: ConfigManager = ctx.obj['config']
+    formatter: SuggestionFormatter = ctx.obj['formatter']
+    
+    try:
+        report = tune_weights(Path(history_file), config, train_fraction, limit, cwd, apply=not dry_run)
+        
+        if as_json:
+            click.echo(json.dumps(report, indent=2))
+            return
+        
+        before, after = report['before'], report['after']
+        lines = [
+            f"{formatter.colors.get('bright', '')}Tuned on {history_file}:{formatter.colors.get('reset', '')}",
+            f"Keystrokes: {report['keystrokes']} ({report['covered_keystrokes']} with the command among candidates)",
+            f"MRR@5: {before['mrr@5']:.3f} -> {after['mrr@5']:.3f}",
+            f"Hit@1: {before['hit@1']:.1%} -> {after['hit@1']:.1%}  Hit@5: {before['hit@5']:.1%} -> {after['hit@5']:.1%}",
+        ]
+        for key, value in report['settings'].items():
+            lines.append(f"{key}: {value}")
+        click.echo("\n".join(lines))
+        
+        if not dry_run:
+            click.echo(formatter.format_success(f"Weights saved to {config.config_file}"))
+    
+    except Exception as e:
+        click.echo(formatter.format_error(f"Tuning failed: {e}"))
+        sys.exit(1)
+
+
 @main.command()
 @click.option('--force', '-f', is_flag=True, help='Force refresh even if cache is valid')
 @click.pass_context
@@ -3,14 +3,25 @@ Core modules for sugcommand.
 """
 
 from .command_scanner import CommandScanner
-from .history_analyzer import HistoryAnalyzer
-from .suggestion_engine import SuggestionEngine, SuggestionResult
-from .config_manager import ConfigManager
+from .history_analyzer import HistoryAnalyzer, HistoryEntry
+from .suggestion_engine import QueryResult, SuggestionEngine, SuggestionResult, SuggestionSession, SuggestionUpdate
+from .config_manager import ConfigManager, ConfigSnapshot
+from .sources import QueryContext, SourceRegistry, SuggestionSource
+from .tokenizer import parse_command_line
 
 __all__ = [
     "CommandScanner",
     "HistoryAnalyzer",
+    "HistoryEntry",
     "SuggestionEngine", 
     "SuggestionResult",
+    "SuggestionSession",
+    "SuggestionUpdate",
+    "QueryResult",
     "ConfigManager",
+    "ConfigSnapshot",
+    "SuggestionSource",
+    "SourceRegistry",
+    "QueryContext",
+    "parse_command_line",
 ] 
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Argument Model Module
+
+Learns which tokens users type at each position of a command line, conditioned
+on the tokens that precede them, and precomputes per-prefix lookup tables so
+that "what comes next after `git checkout`" is a single dictionary lookup.
+"""
+
+from collections import Counter
+from typing import Dict, List, Sequence, Set, Tuple
+import logging
+
+from .shared_counters import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+
+TokenPrefix = Tuple[str, ...]
+
+
+class ArgumentModel:
+    """Positional next-token model for command arguments and subcommands."""
+
+    def __init__(self, max_depth: int = 4, table_size: int = 10):
+        """
+        Initialize ArgumentModel.
+
+        Args:
+            max_depth: Number of argument positions to learn after the command
+            table_size: Number of candidate tokens kept per prefix table
+        """
+        self.max_depth = max_depth
+        self.table_size = table_size
+        # Counters are shared with copies until either side changes them
+        self._counts: Dict[TokenPrefix, Counter] = SharedCounters()
+        self._tables: Dict[TokenPrefix, List[Tuple[str, float]]] = {}
+        self._dirty: Set[TokenPrefix] = set()
+
+    def copy(self) -> 'ArgumentModel':
+        """Get a copy that can learn more lines without changing this model."""
+        clone = ArgumentModel(self.max_depth, self.table_size)
+        clone._counts = self._counts.share()
+        clone._tables = dict(self._tables)
+        clone._dirty = set(self._dirty)
+        return clone
+
+    def add(self, tokens: Sequence[str], count: int = 1) -> None:
+        """
+        Record one tokenized command line.
+
+        Args:
+            tokens: Command line tokens, starting with the base command
+            count: Number of times the line was seen
+        """
+        limit = min(len(tokens), self.max_depth + 1)
+        for position in range(1, limit):
+            prefix = tuple(tokens[:position])
+            self._counts.writable(prefix)[tokens[position]] += count
+            self._dirty.add(prefix)
+
+    def build_tables(self) -> None:
+        """Precompute ranked lookup tables for every prefix changed since the last build."""
+        for prefix in self._dirty:
+            counter = self._counts[prefix]
+            total = sum(counter.values())
+            self._tables[prefix] = [
+                (token, count / total)
+                for token, count in counter.most_common(self.table_size)
+            ]
+        self._dirty.clear()
+
+    def lookup(self, prefix: Sequence[str]) -> List[Tuple[str, float]]:
+        """
+        Get the most likely next tokens after a prefix.
+
+        Args:
+            prefix: Tokens typed so far, starting with the base command
+
+        Returns:
+            List of (token, probability) tuples, most likely first
+        """
+        return self._tables.get(tuple(prefix), [])
+
+    def clear(self) -> None:
+        """Drop all learned counts and tables."""
+        self._counts.clear()
+        self._tables.clear()
+        self._dirty.clear()
+
+    def __len__(self) -> int:
+        return len(self._counts)
@@ -12,7 +12,7 @@ import stat
 import threading
 import time
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Tuple
+from typing import Dict, Iterable, List, Set, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
 import logging
 
@@ -34,6 +34,12 @@ class CommandScanner:
         self._command_descriptions: Dict[str, str] = {}
         self._last_scan_time = 0
         self._scan_lock = threading.Lock()
+        # Bumped whenever the command index is replaced
+        self.generation = 0
+        # When False, a stale index keeps being served until one is installed
+        # or a scan is forced (e.g. the daemon rebuilds out of process)
+        self.auto_refresh = True
+        self._lower_names: Tuple[int, Set[str]] = (-1, set())
         
         # Standard directories to scan
         self.scan_directories = self._get_scan_directories()
@@ -177,7 +183,7 @@ class CommandScanner:
         with self._scan_lock:
             if (not force_refresh and 
                 self._commands and 
-                current_time - self._last_scan_time < self.cache_duration):
+                (not self.auto_refresh or current_time - self._last_scan_time < self.cache_duration)):
                 return self._commands.copy()
             
             logger.info(f"Scanning {len(self.scan_directories)} directories for commands...")
@@ -210,10 +216,36 @@ class CommandScanner:
             
             self._commands = all_commands
             self._last_scan_time = current_time
+            self.generation += 1
             
             logger.info(f"Found {len(self._commands)} unique commands")
             return self._commands.copy()
     
+    def refresh_if_stale(self) -> None:
+        """Rescan if the index is empty or expired, without copying it."""
+        if self._commands and (not self.auto_refresh or
+                               time.time() - self._last_scan_time < self.cache_duration):
+            return
+        self.scan_commands()
+    
+    def export_index(self) -> Tuple[Dict[str, List[str]], float]:
+        """Get the command index and its scan time, for install_index() elsewhere."""
+        commands = self.scan_commands()
+        return commands, self._last_scan_time
+    
+    def install_index(self, commands: Dict[str, List[str]], scan_time: float) -> None:
+        """
+        Replace the command index with one scanned elsewhere (e.g. in a child process).
+        
+        Args:
+            commands: Mapping of command names to their paths
+            scan_time: When the scan ran
+        """
+        with self._scan_lock:
+            self._commands = commands
+            self._last_scan_time = scan_time
+            self.generation += 1
+    
     def get_command_paths(self, command_name: str) -> List[str]:
         """Get all paths for a specific command."""
         commands = self.scan_commands()
@@ -234,12 +266,59 @@ class CommandScanner:
         Returns:
             List of (command_name, relevance_score) tuples
         """
-        commands = self.scan_commands()
+        results = self.match_commands(pattern)
+        
+        # Sort by score (descending) and return top results
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+    
+    def max_match_score(self, pattern: str) -> float:
+        """
+        Get the highest score match_commands() can give any command for a pattern.
+        
+        Args:
+            pattern: Search pattern
+            
+        Returns:
+            0 when nothing can match (command names never contain whitespace),
+            100 when a command has exactly this name, else the prefix ceiling
+        """
+        pattern_lower = pattern.lower()
+        if not pattern_lower or any(char.isspace() for char in pattern_lower):
+            return 0.0
+        
+        self.refresh_if_stale()
+        current = self.generation
+        generation, names = self._lower_names
+        if generation != current:
+            names = {name.lower() for name in self._commands}
+            self._lower_names = (current, names)
+        return 100.0 if pattern_lower in names else 80.0
+    
+    def match_commands(self, pattern: str, candidates: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Score every command matching a pattern, in index order.
+        
+        Matching is monotone: a command that does not match a pattern cannot
+        match any extension of it, so the matches for a prefix of `pattern`
+        are a valid (and much smaller) candidate set.
+        
+        Args:
+            pattern: Search pattern
+            candidates: Command names to consider instead of the whole index
+            
+        Returns:
+            Unsorted list of (command_name, relevance_score) tuples
+        """
+        if candidates is None:
+            # Index dicts are replaced, never mutated, so iterating one is safe
+            self.refresh_if_stale()
+            candidates = self._commands
         pattern_lower = pattern.lower()
         
         results = []
         
-        for cmd_name in commands:
+        for cmd_name in candidates:
             cmd_lower = cmd_name.lower()
             score = 0.0
             
@@ -268,9 +347,7 @@ class CommandScanner:
             if score > 0:
                 results.append((cmd_name, score))
         
-        # Sort by score (descending) and return top results
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:limit]
+        return results
     
     def get_command_stats(self) -> Dict[str, any]:
         """Get statistics about scanned commands."""
@@ -7,12 +7,85 @@ Manages user settings and preferences for the sugcommand tool.
 import json
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, FrozenSet, Mapping, NamedTuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ConfigSnapshot(NamedTuple):
+    """
+    Immutable, precompiled view of one configuration generation.
+    
+    The suggestion engine takes one per request instead of looking settings
+    up for every candidate of every source.
+    """
+    generation: int
+    enabled: bool
+    max_suggestions: int
+    min_confidence: float
+    excluded_commands: FrozenSet[str]
+    frecency_weight: float
+    argument_weight: float
+    flag_weight: float
+    directory_weight: float
+    pipe_weight: float
+    path_weight: float
+    history_exact_weight: float
+    history_partial_weight: float
+    history_sequence_weight: float
+    sequential_weight: float
+    parallel_sources: bool
+    source_deadline_ms: float
+    early_termination: bool
+    # Ranking weight per source (feature); missing sources weigh 1.0
+    source_weights: Mapping[str, float]
+    # Read-only view of every setting, for values without an attribute
+    values: Mapping[str, Any]
+    
+    @classmethod
+    def compile(cls, config: Dict[str, Any], generation: int) -> 'ConfigSnapshot':
+        """
+        Build a snapshot from a configuration dictionary.
+        
+        Args:
+            config: Settings merged with the defaults
+            generation: ConfigManager generation the settings belong to
+            
+        Returns:
+            ConfigSnapshot
+        """
+        values = MappingProxyType(dict(config))
+        get = values.get
+        return cls(
+            generation=generation,
+            enabled=bool(get('enabled', True)),
+            max_suggestions=get('max_suggestions', 10),
+            min_confidence=get('min_confidence_threshold', 0.1),
+            excluded_commands=frozenset(get('excluded_commands', [])),
+            frecency_weight=get('frecency_weight', 1.5),
+            argument_weight=get('argument_suggestions_weight', 1.0),
+            flag_weight=get('flag_suggestions_weight', 1.0),
+            directory_weight=get('directory_suggestions_weight', 1.0),
+            pipe_weight=get('pipe_suggestions_weight', 1.0),
+            path_weight=get('path_suggestions_weight', 1.0),
+            history_exact_weight=get('history_exact_weight', 0.9),
+            history_partial_weight=get('history_partial_weight', 0.7),
+            history_sequence_weight=get('history_sequence_weight', 0.3),
+            sequential_weight=get('sequential_weight', 0.9),
+            parallel_sources=bool(get('parallel_sources_enabled', True)),
+            source_deadline_ms=get('source_deadline_ms', 15),
+            early_termination=bool(get('early_termination_enabled', True)),
+            source_weights=MappingProxyType(dict(get('source_weights') or {})),
+            values=values,
+        )
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a configuration value as of this snapshot."""
+        return self.values.get(key, default)
+
+
 class ConfigManager:
     """Manager for user configuration and settings."""
     
@@ -26,18 +99,48 @@ class ConfigManager:
         'command_scan_enabled': True,
         'cache_duration': 3600,  # seconds
         'history_cache_duration': 1800,  # seconds
+        'daemon_refresh_interval': 900,  # seconds between daemon rebuilds (0 = off)
+        'daemon_refresh_in_child': True,  # rebuild in a low-priority child process
+        'result_cache_size': 512,  # finished suggestion lists kept (0 = off)
+        'result_cache_ttl': 60,  # seconds a cached suggestion list is served
+        'daemon_max_sessions': 64,  # shells whose keystroke sessions the daemon keeps
+        'parallel_sources_enabled': True,  # run suggestion sources concurrently
+        'source_deadline_ms': 15,  # sources answering later are dropped (0 = wait for all)
+        'early_termination_enabled': True,  # skip sources that cannot change the top suggestions
+        'source_weights': {},  # ranking weight per source name, e.g. {"frecency": 1.2} (default 1.0)
         'min_confidence_threshold': 0.1,
         'fuzzy_search_enabled': True,
-        'recent_commands_weight': 1.5,
-        'frequent_commands_weight': 1.2,
+        'frecency_weight': 1.5,
+        'frecency_half_life': 604800,  # seconds (one week)
+        'argument_suggestions_weight': 1.0,
+        'flag_suggestions_weight': 1.0,
+        'directory_suggestions_weight': 1.0,
+        'pipe_suggestions_weight': 1.0,
+        'path_suggestions_weight': 1.0,
+        'path_completion_enabled': True,  # complete file and directory arguments
+        'path_cache_size': 2048,  # directory listings kept
+        'path_prefetch_depth': 1,  # levels of matching subdirectories listed ahead (0 = off)
+        # Fitted by `sugcommand bench tune`
+        'history_exact_weight': 0.9,  # history lines starting with the input
+        'history_partial_weight': 0.7,  # history lines containing the input
+        'history_sequence_weight': 0.3,  # boost when the command often follows the last one
+        'sequential_weight': 0.9,  # commands that usually come next
         'color_enabled': True,
         'compact_display': False,
         'custom_directories': [],
+        'history_sources': [],  # extra history file globs, e.g. "~/.bash_history.d/*"
+        'history_ingest_workers': 0,  # 0 = one process per CPU
+        'history_parallel_ingest_bytes': 8 * 1024 * 1024,  # smaller histories are parsed in-process
+        'history_live_publish_interval': 1.0,  # seconds between snapshots taking live commands
+        'sequence_counter_backend': 'exact',  # or 'space_saving' for bounded memory
+        'sequence_lines_per_command': 1000,  # memory budget of the space_saving backend
+        'columnar_history_enabled': True,  # NumPy column store (used when numpy is installed)
         'excluded_commands': [
             'history', 'clear', 'exit', 'logout',
             'sudo -s', 'su -', 'passwd'
         ],
         'shell_integration_enabled': False,
+        'live_capture_enabled': True,
         'auto_complete_enabled': True,
         'keyboard_shortcuts': {
             'accept_suggestion': 'Tab',
@@ -66,6 +169,9 @@ class ConfigManager:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
         self._config: Dict[str, Any] = {}
+        # Bumped on every change so dependents can tell their view is stale
+        self.generation = 0
+        self._snapshot: Optional[ConfigSnapshot] = None
         self.load_config()
     
     def load_config(self) -> None:
@@ -89,6 +195,8 @@ class ConfigManager:
         except Exception as e:
             logger.warning(f"Failed to load config, using defaults: {e}")
             self._config = self.DEFAULT_CONFIG.copy()
+        
+        self.generation += 1
     
     def save_config(self) -> None:
         """Save current configuration to file."""
@@ -103,19 +211,31 @@ class ConfigManager:
         """Get configuration value."""
         return self._config.get(key, default)
     
+    def snapshot(self) -> ConfigSnapshot:
+        """Get the compiled, immutable view of the current settings (rebuilt once per generation)."""
+        snapshot = self._snapshot
+        generation = self.generation
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = ConfigSnapshot.compile(self._config, generation)
+            self._snapshot = snapshot
+        return snapshot
+    
     def set(self, key: str, value: Any) -> None:
         """Set configuration value."""
         self._config[key] = value
+        self.generation += 1
         self.save_config()
     
     def update(self, updates: Dict[str, Any]) -> None:
         """Update multiple configuration values."""
         self._config.update(updates)
+        self.generation += 1
         self.save_config()
     
     def reset_to_defaults(self) -> None:
         """Reset configuration to defaults."""
         self._config = self.DEFAULT_CONFIG.copy()
+        self.generation += 1
         self.save_config()
         logger.info("Configuration reset to defaults")
     
@@ -160,6 +280,10 @@ class ConfigManager:
         """Get history cache duration in seconds."""
         return self.get('history_cache_duration', 1800)
     
+    def get_frecency_half_life(self) -> float:
+        """Get half-life of decayed command usage scores in seconds."""
+        return self.get('frecency_half_life', 604800)
+    
     def is_history_analysis_enabled(self) -> bool:
         """Check if history analysis is enabled."""
         return self.get('history_analysis_enabled', True)
@@ -168,6 +292,10 @@ class ConfigManager:
         """Check if command scanning is enabled."""
         return self.get('command_scan_enabled', True)
     
+    def is_live_capture_enabled(self) -> bool:
+        """Check if shell hooks should push executed commands to the daemon."""
+        return self.get('live_capture_enabled', True)
+    
     def is_fuzzy_search_enabled(self) -> bool:
         """Check if fuzzy search is enabled."""
         return self.get('fuzzy_search_enabled', True)
@@ -198,6 +326,16 @@ class ConfigManager:
             directories.remove(directory)
             self.set('custom_directories', directories)
     
+    def get_history_sources(self) -> list:
+        """Get extra glob patterns of history files to analyze."""
+        return self.get('history_sources', [])
+    
+    def get_sequence_line_capacity(self) -> Optional[int]:
+        """Get distinct command lines kept per command, or None for exact counting."""
+        if self.get('sequence_counter_backend', 'exact') != 'space_saving':
+            return None
+        return max(1, int(self.get('sequence_lines_per_command', 1000)))
+    
     def get_excluded_commands(self) -> list:
         """Get list of excluded commands."""
         return self.get('excluded_commands', [])
@@ -248,6 +386,7 @@ class ConfigManager:
             
             # Merge with current config
             self._config.update(imported_config)
+            self.generation += 1
             self.save_config()
             logger.info(f"Configuration imported from {file_path}")
         except Exception as e:
@@ -287,6 +426,13 @@ class ConfigManager:
         if not isinstance(self.get('cache_duration'), int) or self.get('cache_duration') < 0:
             issues.append("cache_duration must be a non-negative integer")
         
+        if self.get('sequence_counter_backend') not in ('exact', 'space_saving'):
+            issues.append("sequence_counter_backend must be 'exact' or 'space_saving'")
+        
+        half_life = self.get('frecency_half_life')
+        if not isinstance(half_life, (int, float)) or half_life <= 0:
+            issues.append("frecency_half_life must be a positive number of seconds")
+        
         # Check threshold
         threshold = self.get('min_confidence_threshold')
         if not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1:
@@ -0,0 +1,118 @@
+"""
+Directory Index Module
+
+Partitions command usage by working directory so the same prefix can mean
+different things in different projects. Per-directory top-k tables are
+precomputed; lookups fall back to the nearest indexed parent directory.
+"""
+
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+from .shared_counters import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryIndex:
+    """Per-directory command line usage with parent-directory fallback."""
+
+    def __init__(self, table_size: int = 20, max_directories: int = 5000):
+        """
+        Initialize DirectoryIndex.
+
+        Args:
+            table_size: Command lines kept in each directory's top-k table
+            max_directories: Maximum number of directories tracked
+        """
+        self.table_size = table_size
+        self.max_directories = max_directories
+        # Counters are shared with copies until either side changes them
+        self._counts: Dict[str, Counter] = SharedCounters()
+        self._tables: Dict[str, List[Tuple[str, float]]] = {}
+        self._dirty: Set[str] = set()
+
+    def copy(self) -> 'DirectoryIndex':
+        """Get a copy that can record more commands without changing this index."""
+        clone = DirectoryIndex(self.table_size, self.max_directories)
+        clone._counts = self._counts.share()
+        clone._tables = dict(self._tables)
+        clone._dirty = set(self._dirty)
+        return clone
+
+    @staticmethod
+    def _normalize(directory: str) -> str:
+        """Normalize a directory path used as an index key."""
+        return os.path.normpath(os.path.expanduser(directory))
+
+    def add(self, directory: str, command_line: str, count: int = 1) -> None:
+        """
+        Record a command line run in a directory.
+
+        Args:
+            directory: Working directory of the command
+            command_line: Full command line
+            count: Number of times it was run there
+        """
+        directory = self._normalize(directory)
+        if directory not in self._counts and len(self._counts) >= self.max_directories:
+            return
+        self._counts.writable(directory)[command_line] += count
+        self._dirty.add(directory)
+
+    def merge(self, other: 'DirectoryIndex') -> None:
+        """
+        Fold another index into this one.
+
+        Args:
+            other: Index built from a different slice of history
+        """
+        for directory, counter in other._counts.items():
+            for command_line, count in counter.items():
+                self.add(directory, command_line, count)
+
+    def build_tables(self) -> None:
+        """Precompute top-k tables for every directory changed since the last build."""
+        for directory in self._dirty:
+            counter = self._counts[directory]
+            top = counter.most_common(self.table_size)
+            if not top:
+                continue
+            top_count = top[0][1]
+            self._tables[directory] = [(line, count / top_count) for line, count in top]
+        self._dirty.clear()
+
+    def lookup(self, cwd: str) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """
+        Get the top-k table for a directory, falling back to its parents.
+
+        Args:
+            cwd: Current working directory
+
+        Returns:
+            (indexed_directory, [(command_line, score)]) with scores relative
+            to the directory's most used line; (None, []) if nothing matches
+        """
+        if not self._tables:
+            return None, []
+
+        directory = self._normalize(cwd)
+        while True:
+            table = self._tables.get(directory)
+            if table is not None:
+                return directory, table
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None, []
+            directory = parent
+
+    def clear(self) -> None:
+        """Drop all directory statistics."""
+        self._counts.clear()
+        self._tables.clear()
+        self._dirty.clear()
+
+    def __len__(self) -> int:
+        return len(self._counts)
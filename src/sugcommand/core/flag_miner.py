@@ -0,0 +1,213 @@
+"""
+Flag Miner Module
+
+Mines frequent flag combinations per command (`rsync -avzP --delete`,
+`kubectl -n X get pods -o wide`) with an FP-growth style algorithm and turns
+them into an association table that completes a habitual flag set from the
+flags already typed.
+"""
+
+from collections import Counter
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+FlagSet = FrozenSet[str]
+
+
+class _FPNode:
+    """Node of an FP-tree."""
+
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item: Optional[str], parent: Optional['_FPNode']):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children: Dict[str, '_FPNode'] = {}
+
+
+def _build_fp_tree(transactions: List[Tuple[Sequence[str], int]],
+                   min_support: int,
+                   max_items: int) -> Tuple[Dict[str, List[_FPNode]], List[str]]:
+    """Build an FP-tree and return its header table with items in ascending support order."""
+    item_counts: Counter = Counter()
+    for items, count in transactions:
+        for item in items:
+            item_counts[item] += count
+
+    frequent = [
+        item for item, count in item_counts.most_common(max_items)
+        if count >= min_support
+    ]
+    rank = {item: index for index, item in enumerate(frequent)}
+
+    root = _FPNode(None, None)
+    header: Dict[str, List[_FPNode]] = {item: [] for item in frequent}
+
+    for items, count in transactions:
+        ordered = sorted((item for item in items if item in rank), key=rank.__getitem__)
+        node = root
+        for item in ordered:
+            child = node.children.get(item)
+            if child is None:
+                child = _FPNode(item, node)
+                node.children[item] = child
+                header[item].append(child)
+            child.count += count
+            node = child
+
+    return header, list(reversed(frequent))
+
+
+def _mine_fp_tree(transactions: List[Tuple[Sequence[str], int]],
+                  suffix: Tuple[str, ...],
+                  min_support: int,
+                  max_items: int,
+                  max_size: int,
+                  results: Dict[FlagSet, int]) -> None:
+    """Recursively collect frequent itemsets from conditional pattern bases."""
+    header, items = _build_fp_tree(transactions, min_support, max_items)
+
+    for item in items:
+        nodes = header[item]
+        support = sum(node.count for node in nodes)
+        if support < min_support:
+            continue
+
+        itemset = suffix + (item,)
+        results[frozenset(itemset)] = support
+
+        if len(itemset) >= max_size:
+            continue
+
+        # Conditional pattern base: prefix paths leading to this item
+        conditional = []
+        for node in nodes:
+            path = []
+            parent = node.parent
+            while parent is not None and parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional.append((path, node.count))
+
+        if conditional:
+            _mine_fp_tree(conditional, itemset, min_support, max_items, max_size, results)
+
+
+class FlagMiner:
+    """Frequent flag itemset miner with a precomputed completion table."""
+
+    def __init__(self,
+                 min_support: int = 3,
+                 max_itemset_size: int = 4,
+                 max_transactions: int = 2000,
+                 max_flags: int = 32,
+                 table_size: int = 5):
+        """
+        Initialize FlagMiner.
+
+        Args:
+            min_support: Minimum number of lines a flag set must appear in
+            max_itemset_size: Largest flag set to mine
+            max_transactions: Distinct flag sets kept per command (memory bound)
+            max_flags: Most frequent flags per command considered for mining
+            table_size: Completions kept per typed flag set
+        """
+        self.min_support = min_support
+        self.max_itemset_size = max_itemset_size
+        self.max_transactions = max_transactions
+        self.max_flags = max_flags
+        self.table_size = table_size
+        self._transactions: Dict[str, Counter] = {}
+        self._table: Dict[str, Dict[FlagSet, List[Tuple[Tuple[str, ...], float]]]] = {}
+
+    @staticmethod
+    def extract_flags(tokens: Sequence[str]) -> List[str]:
+        """Get the flag tokens (`-x`, `--long`) of a tokenized command line."""
+        return [
+            token for token in tokens[1:]
+            if token.startswith('-') and len(token) > 1 and token != '--'
+        ]
+
+    def add(self, command: str, flags: Sequence[str], count: int = 1) -> None:
+        """
+        Record the flags used on one command line.
+
+        Args:
+            command: Base command
+            flags: Flags on the line
+            count: Number of times the line was seen
+        """
+        if not flags:
+            return
+
+        transactions = self._transactions.get(command)
+        if transactions is None:
+            transactions = Counter()
+            self._transactions[command] = transactions
+
+        transactions[frozenset(flags)] += count
+
+        # Keep memory bounded: drop the rarest half once the cap is hit
+        if len(transactions) > self.max_transactions:
+            keep = transactions.most_common(self.max_transactions // 2)
+            transactions.clear()
+            transactions.update(dict(keep))
+
+    def mine(self) -> None:
+        """Mine frequent flag sets and rebuild the association table."""
+        self._table.clear()
+
+        for command, transactions in self._transactions.items():
+            itemsets: Dict[FlagSet, int] = {}
+            _mine_fp_tree(
+                list(transactions.items()), (), self.min_support,
+                self.max_flags, self.max_itemset_size, itemsets
+            )
+
+            table: Dict[FlagSet, List[Tuple[Tuple[str, ...], float]]] = {}
+            for itemset, support in itemsets.items():
+                if len(itemset) < 2:
+                    continue
+                for size in range(1, len(itemset)):
+                    for antecedent in combinations(sorted(itemset), size):
+                        antecedent_set = frozenset(antecedent)
+                        confidence = support / itemsets[antecedent_set]
+                        consequent = tuple(sorted(itemset - antecedent_set))
+                        table.setdefault(antecedent_set, []).append((consequent, confidence))
+
+            for antecedent_set, completions in table.items():
+                completions.sort(key=lambda item: (-item[1], -len(item[0])))
+                del completions[self.table_size:]
+
+            if table:
+                self._table[command] = table
+
+    def complete(self, command: str, flags: Sequence[str]) -> List[Tuple[Tuple[str, ...], float]]:
+        """
+        Get the flags that usually accompany the ones already typed.
+
+        Args:
+            command: Base command
+            flags: Flags already on the line
+
+        Returns:
+            List of (missing_flags, confidence) tuples
+        """
+        table = self._table.get(command)
+        if not table:
+            return []
+        return table.get(frozenset(flags), [])
+
+    def clear(self) -> None:
+        """Drop all transactions and mined tables."""
+        self._transactions.clear()
+        self._table.clear()
+
+    def __len__(self) -> int:
+        return len(self._table)
@@ -0,0 +1,177 @@
+"""
+Frecency Module
+
+Exponentially time-decayed usage counters. Each key stores (score, last_update)
+so recording a use is O(1) and decay is applied lazily when the score is read.
+"""
+
+import bisect
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FrecencyCounter:
+    """Decayed counters with a ranking that stays valid as time passes."""
+
+    def __init__(self, half_life: float = 7 * 24 * 3600):
+        """
+        Initialize FrecencyCounter.
+
+        Args:
+            half_life: Time (seconds) after which a use counts half as much
+        """
+        if half_life <= 0:
+            raise ValueError("Frecency half-life must be positive")
+
+        self.half_life = half_life
+        self._decay_rate = math.log(2) / half_life
+        self._entries: Dict[str, Tuple[float, float]] = {}  # key -> (score, last_update)
+
+        # All scores decay by the same factor, so ordering keys by their
+        # log-score projected to a common time never changes between updates.
+        self._ranking: List[Tuple[float, str]] = []
+        self._ranking_valid = True
+
+    def copy(self) -> 'FrecencyCounter':
+        """Get a copy that can record more uses without changing this counter."""
+        clone = FrecencyCounter(self.half_life)
+        clone._entries = dict(self._entries)
+        clone._ranking = list(self._ranking)
+        clone._ranking_valid = self._ranking_valid
+        return clone
+
+    def _rank_value(self, score: float, last_update: float) -> float:
+        """Time-independent ordering value (log-score shifted to time zero)."""
+        return math.log(score) + self._decay_rate * last_update
+
+    def _decay(self, elapsed: float) -> float:
+        """Decay factor after the given number of seconds."""
+        return math.exp(-self._decay_rate * elapsed)
+
+    def add(self, key: str, timestamp: Optional[float] = None, weight: float = 1.0) -> None:
+        """
+        Record a use of a key.
+
+        Args:
+            key: Key being used
+            timestamp: When it was used (defaults to now)
+            weight: Contribution of this use before decay
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        previous = self._entries.get(key)
+        if previous is None:
+            score, last_update = weight, timestamp
+        else:
+            old_score, old_update = previous
+            if timestamp >= old_update:
+                score = old_score * self._decay(timestamp - old_update) + weight
+                last_update = timestamp
+            else:
+                # Out-of-order event: decay the event instead of the counter
+                score = old_score + weight * self._decay(old_update - timestamp)
+                last_update = old_update
+
+        self._entries[key] = (score, last_update)
+
+        if not self._ranking_valid:
+            return
+
+        if previous is not None:
+            old_item = (-self._rank_value(*previous), key)
+            index = bisect.bisect_left(self._ranking, old_item)
+            if index < len(self._ranking) and self._ranking[index] == old_item:
+                del self._ranking[index]
+        bisect.insort(self._ranking, (-self._rank_value(score, last_update), key))
+
+    def merge(self, other: 'FrecencyCounter') -> None:
+        """
+        Fold another counter (with the same half-life) into this one.
+
+        Args:
+            other: Counter built from a different slice of history
+        """
+        if other.half_life != self.half_life:
+            raise ValueError("Cannot merge frecency counters with different half-lives")
+
+        self.invalidate_ranking()
+        for key, (score, last_update) in other._entries.items():
+            self.add(key, last_update, score)
+
+    def load(self, scores: Dict[str, float], timestamp: float) -> None:
+        """
+        Replace all counters with scores already decayed to a common time.
+
+        Args:
+            scores: Positive decayed score per key
+            timestamp: Time the scores were evaluated at
+        """
+        self._entries = {key: (score, timestamp) for key, score in scores.items()}
+        self.invalidate_ranking()
+
+    def invalidate_ranking(self) -> None:
+        """Defer ranking maintenance during bulk loads; it is rebuilt on next read."""
+        self._ranking_valid = False
+        self._ranking = []
+
+    def _ensure_ranking(self) -> None:
+        """Rebuild the ranking after a bulk load."""
+        if self._ranking_valid:
+            return
+        self._ranking = sorted(
+            (-self._rank_value(score, last_update), key)
+            for key, (score, last_update) in self._entries.items()
+        )
+        self._ranking_valid = True
+
+    def score(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Get the decayed score of a key.
+
+        Args:
+            key: Key to look up
+            now: Time to decay to (defaults to now)
+
+        Returns:
+            Decayed score, 0.0 for unknown keys
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        if now is None:
+            now = time.time()
+        score, last_update = entry
+        return score * self._decay(max(0.0, now - last_update))
+
+    def top(self, limit: int = 20, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Get the highest-scoring keys.
+
+        Args:
+            limit: Maximum number of keys
+            now: Time to decay to (defaults to now)
+
+        Returns:
+            List of (key, decayed_score) tuples, best first
+        """
+        self._ensure_ranking()
+        if now is None:
+            now = time.time()
+        return [(key, self.score(key, now)) for _, key in self._ranking[:limit]]
+
+    def clear(self) -> None:
+        """Drop all counters."""
+        self._entries.clear()
+        self._ranking = []
+        self._ranking_valid = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
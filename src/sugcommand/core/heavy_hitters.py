@@ -0,0 +1,112 @@
+"""
+Heavy Hitters Module
+
+Fixed-memory approximate counting with the Space-Saving algorithm. Keeps the
+most frequent keys of an unbounded stream (e.g. distinct command lines with
+generated paths or hashes) in at most `capacity` slots, with a per-key
+overestimation bounded by the count of the slot it replaced.
+"""
+
+import heapq
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SpaceSavingCounter(Mapping):
+    """Counter-compatible Space-Saving summary holding at most `capacity` keys."""
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize SpaceSavingCounter.
+
+        Args:
+            capacity: Maximum number of keys tracked
+        """
+        if capacity < 1:
+            raise ValueError("Space-Saving capacity must be at least 1")
+
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # Lazy min-heap of (count, key); stale entries are skipped on pop
+        self._heap: List[Tuple[int, str]] = []
+
+    def __getitem__(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        """
+        Set a key's count; supports `counter[key] += n` like collections.Counter.
+
+        When the summary is full, a new key takes over the slot of the current
+        minimum and inherits its count as the error bound.
+        """
+        if key in self._counts or len(self._counts) < self.capacity:
+            self._counts[key] = value
+            self._errors.setdefault(key, 0)
+        else:
+            evicted, minimum = self._pop_min()
+            del self._counts[evicted]
+            del self._errors[evicted]
+            self._counts[key] = minimum + value
+            self._errors[key] = minimum
+
+        heapq.heappush(self._heap, (self._counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, k) for k, count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[str, int]:
+        """Remove and return the key with the smallest current count."""
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self._counts.get(key) == count:
+                return key, count
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._counts
+
+    def update(self, other: Optional[Mapping] = None) -> None:
+        """Add counts from another mapping (Counter or SpaceSavingCounter)."""
+        if not other:
+            return
+        for key, count in other.items():
+            self[key] = self[key] + count
+
+    def copy(self) -> 'SpaceSavingCounter':
+        """Get an independent copy of the summary."""
+        clone = SpaceSavingCounter(self.capacity)
+        clone._counts = dict(self._counts)
+        clone._errors = dict(self._errors)
+        clone._heap = list(self._heap)
+        return clone
+
+    def error(self, key: str) -> int:
+        """Get the maximum overestimation of a key's count."""
+        return self._errors.get(key, 0)
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """List the n most common keys and their (approximate) counts."""
+        if n is None:
+            return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(n, self._counts.items(), key=lambda item: item[1])
+
+    def __repr__(self) -> str:
+        return f"SpaceSavingCounter(capacity={self.capacity}, size={len(self)})"
+
+
+def new_line_counter(capacity: Optional[int] = None):
+    """Create an exact Counter, or a Space-Saving summary when a capacity is given."""
+    if capacity is None:
+        return Counter()
+    return SpaceSavingCounter(capacity)
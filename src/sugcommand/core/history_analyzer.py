@@ -5,35 +5,112 @@ Analyzes command history from various shells to understand usage patterns
 and provide intelligent suggestions based on past behavior.
 """
 
+import glob
+import gzip
+import itertools
+import multiprocessing
 import os
 import re
 import threading
 import time
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Tuple, Any
+from typing import Dict, List, NamedTuple, Sequence, Set, Optional, Tuple, Any
 import logging
 
+from .argument_model import ArgumentModel
+from .flag_miner import FlagMiner
+from .frecency import FrecencyCounter
+from .directory_index import DirectoryIndex
+from .heavy_hitters import new_line_counter
+from .pipe_model import PipeTransitionModel
+from .shared_counters import SharedCounters
+from .tokenizer import get_base_command, get_command_tokens, parse_command_line
+from .history_store import ColumnarHistoryStore, NUMPY_AVAILABLE
+from ..utils.performance import record_history_analysis_time
+
 logger = logging.getLogger(__name__)
 
+# Assumed gap between history lines that carry no timestamp (seconds)
+UNTIMED_COMMAND_SPACING = 60.0
+
+# Distinct recent commands remembered (least recently used are evicted)
+RECENT_COMMANDS_SIZE = 100
+
+# Exit status shells use for "command not found" (typos are not learned)
+COMMAND_NOT_FOUND_STATUS = 127
+
+# History files smaller than this in total are parsed in-process: starting
+# worker processes costs more than it saves on ordinary shell histories
+PARALLEL_INGEST_MIN_BYTES = 8 * 1024 * 1024
+
+# Live commands are folded into a new snapshot at most this often (seconds):
+# a publish copies the snapshot's tables, so its cost grows with the history
+LIVE_PUBLISH_INTERVAL = 1.0
+
+
+class HistoryEntry(NamedTuple):
+    """A single command from shell history."""
+    command: str
+    timestamp: Optional[float] = None
+    cwd: Optional[str] = None
+    exit_status: Optional[int] = None
+    duration: Optional[float] = None
+
 
 class HistoryAnalyzer:
     """Analyzer for shell command history patterns."""
     
-    def __init__(self, cache_duration: int = 1800):
+    def __init__(self,
+                 cache_duration: int = 1800,
+                 frecency_half_life: float = 7 * 24 * 3600,
+                 history_sources: Optional[List[str]] = None,
+                 ingest_workers: int = 0,
+                 line_capacity: Optional[int] = None,
+                 columnar: bool = True,
+                 parallel_ingest_bytes: int = PARALLEL_INGEST_MIN_BYTES,
+                 live_publish_interval: float = LIVE_PUBLISH_INTERVAL):
         """
         Initialize HistoryAnalyzer.
         
         Args:
             cache_duration: How long to cache history analysis (seconds)
+            frecency_half_life: Half-life of command usage scores (seconds)
+            history_sources: Extra glob patterns of history files (may be .gz)
+            ingest_workers: Processes used to parse history files (0 = CPU count)
+            line_capacity: Distinct lines kept per command (Space-Saving); None counts exactly
+            columnar: Keep history in a NumPy column store (needs numpy and exact counting)
+            parallel_ingest_bytes: Total history size from which files are parsed in worker processes
+            live_publish_interval: Least time between snapshots publishing live commands (0 = every record)
         """
         self.cache_duration = cache_duration
-        self._command_sequences: Dict[str, Counter] = {}
-        self._command_frequencies: Counter = Counter()
-        self._command_pairs: Dict[str, Counter] = {}
-        self._recent_commands: List[str] = []
+        self.frecency_half_life = frecency_half_life
+        self.history_sources = list(history_sources or [])
+        self.ingest_workers = ingest_workers or os.cpu_count() or 1
+        self.parallel_ingest_bytes = parallel_ingest_bytes
+        self.line_capacity = line_capacity
+        # The column store keeps every distinct line, so it is skipped when
+        # memory is bounded with Space-Saving counters
+        self.columnar = columnar and NUMPY_AVAILABLE and line_capacity is None
+        # Published models; replaced wholesale on refresh, never cleared in place
+        self._generations = itertools.count(1)
+        self._snapshot = HistorySnapshot(0, frecency_half_life, line_capacity)
+        # Commands pushed by shell hooks, replayed after a re-read until the
+        # shell has flushed them to its history file
+        self._live_entries: deque = deque(maxlen=5000)
+        # Live commands not in the published snapshot yet, and when it last took some
+        self.live_publish_interval = live_publish_interval
+        self._unpublished: List[HistoryEntry] = []
+        self._last_live_publish = float('-inf')
+        self._publish_timer: Optional[threading.Timer] = None
         self._last_analysis_time = 0
+        self._files_mtime = 0.0
         self._analysis_lock = threading.Lock()
+        # When False, stale snapshots keep being served until a snapshot is
+        # installed or a refresh is forced (e.g. the daemon rebuilds out of process)
+        self.auto_refresh = True
         
         # Shell history files to check
         self.history_files = self._get_history_files()
@@ -60,263 +137,567 @@ class HistoryAnalyzer:
         
         return history_files
     
-    def _parse_bash_history(self, file_path: Path) -> List[str]:
+    def _expand_history_sources(self) -> List[Path]:
+        """Get the default history files plus everything matching the configured globs."""
+        files = list(self.history_files)
+        seen = set(files)
+        
+        for pattern in self.history_sources:
+            for match in sorted(glob.glob(os.path.expanduser(pattern))):
+                path = Path(match)
+                if path not in seen and path.is_file():
+                    files.append(path)
+                    seen.add(path)
+        
+        return files
+    
+    @staticmethod
+    def _open_history_file(file_path: Path):
+        """Open a history file as text, transparently decompressing .gz archives."""
+        if str(file_path).endswith('.gz'):
+            return gzip.open(file_path, 'rt', encoding='utf-8', errors='ignore')
+        return open(file_path, 'r', encoding='utf-8', errors='ignore')
+    
+    @staticmethod
+    def _parse_history_file(file_path: Path) -> List[HistoryEntry]:
+        """Parse a history file with the parser matching its shell."""
+        if 'fish' in str(file_path):
+            return HistoryAnalyzer._parse_fish_history(file_path)
+        elif 'zsh' in str(file_path):
+            return HistoryAnalyzer._parse_zsh_history(file_path)
+        return HistoryAnalyzer._parse_bash_history(file_path)
+    
+    @staticmethod
+    def _parse_bash_history(file_path: Path) -> List[HistoryEntry]:
         """Parse bash history file."""
-        commands = []
+        entries = []
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            with HistoryAnalyzer._open_history_file(file_path) as f:
+                timestamp = None
                 for line in f:
                     line = line.strip()
-                    if line and not line.startswith('#'):
-                        commands.append(line)
+                    if not line:
+                        continue
+                    if line.startswith('#'):
+                        # HISTTIMEFORMAT writes "#<epoch>" before each command
+                        if line[1:].isdigit():
+                            timestamp = float(line[1:])
+                        continue
+                    entries.append(HistoryEntry(line, timestamp))
+                    timestamp = None
         except Exception as e:
             logger.warning(f"Failed to parse bash history {file_path}: {e}")
         
-        return commands
+        return entries
     
-    def _parse_zsh_history(self, file_path: Path) -> List[str]:
+    @staticmethod
+    def _parse_zsh_history(file_path: Path) -> List[HistoryEntry]:
         """Parse zsh history file."""
-        commands = []
+        entries = []
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            with HistoryAnalyzer._open_history_file(file_path) as f:
                 for line in f:
                     line = line.strip()
                     if line:
                         # Zsh history format: : timestamp:elapsed;command
                         if line.startswith(':') and ';' in line:
-                            command = line.split(';', 1)[1]
-                            commands.append(command)
+                            header, command = line.split(';', 1)
+                            timestamp = header[1:].split(':', 1)[0].strip()
+                            entries.append(HistoryEntry(
+                                command, float(timestamp) if timestamp.isdigit() else None
+                            ))
                         elif not line.startswith(':'):
-                            commands.append(line)
+                            entries.append(HistoryEntry(line))
         except Exception as e:
             logger.warning(f"Failed to parse zsh history {file_path}: {e}")
         
-        return commands
+        return entries
     
-    def _parse_fish_history(self, file_path: Path) -> List[str]:
+    @staticmethod
+    def _parse_fish_history(file_path: Path) -> List[HistoryEntry]:
         """Parse fish shell history file."""
-        commands = []
+        entries = []
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            with HistoryAnalyzer._open_history_file(file_path) as f:
                 current_command = ""
                 for line in f:
                     line = line.strip()
                     if line.startswith('- cmd: '):
                         current_command = line[7:]  # Remove '- cmd: '
                         if current_command:
-                            commands.append(current_command)
+                            entries.append(HistoryEntry(current_command))
+                    elif not entries or not current_command:
+                        continue
+                    elif line.startswith('when: '):
+                        when = line[6:].strip()
+                        if when.isdigit():
+                            entries[-1] = entries[-1]._replace(timestamp=float(when))
+                    # 'paths:' lists the files a command's arguments named, not
+                    # where it ran, so fish entries get their cwd from live capture
         except Exception as e:
             logger.warning(f"Failed to parse fish history {file_path}: {e}")
         
-        return commands
+        return entries
+    
+    @staticmethod
+    def _fill_missing_timestamps(entries: List[HistoryEntry], now: float) -> List[HistoryEntry]:
+        """Give untimed entries a timestamp, counting back from the next known one."""
+        filled = []
+        clock = now
+        for entry in reversed(entries):
+            if entry.timestamp is not None:
+                clock = entry.timestamp
+            else:
+                entry = entry._replace(timestamp=clock)
+            filled.append(entry)
+            clock -= UNTIMED_COMMAND_SPACING
+        filled.reverse()
+        return filled
     
-    def _extract_command_from_line(self, line: str) -> Optional[str]:
+    @staticmethod
+    def get_command_tokens(line: str) -> List[str]:
+        """Split the first command of a line into tokens, without wrappers and assignments."""
+        return get_command_tokens(line)
+    
+    @staticmethod
+    def _extract_command_from_line(line: str) -> Optional[str]:
         """Extract the base command from a command line."""
-        # Remove leading/trailing whitespace
-        line = line.strip()
-        
-        if not line:
-            return None
-        
-        # Split by pipes, redirections, and logical operators
-        # to get the first command
-        separators = ['|', '>', '>>', '<', '&&', '||', ';']
-        first_part = line
-        
-        for sep in separators:
-            if sep in first_part:
-                first_part = first_part.split(sep)[0].strip()
-        
-        # Extract the first word (the command)
-        parts = first_part.split()
-        if not parts:
-            return None
-        
-        command = parts[0]
-        
-        # Remove common prefixes
-        prefixes = ['sudo', 'nohup', 'nice', 'ionice', 'time']
-        while command in prefixes and len(parts) > 1:
-            parts = parts[1:]
-            command = parts[0]
-        
-        return command
-    
-    def _analyze_command_sequences(self, commands: List[str]) -> None:
-        """Analyze command sequences to find patterns."""
-        # Analyze command pairs (what command typically follows another)
-        for i in range(len(commands) - 1):
-            current_cmd = self._extract_command_from_line(commands[i])
-            next_cmd = self._extract_command_from_line(commands[i + 1])
-            
-            if current_cmd and next_cmd:
-                if current_cmd not in self._command_pairs:
-                    self._command_pairs[current_cmd] = Counter()
-                self._command_pairs[current_cmd][next_cmd] += 1
-        
-        # Analyze command arguments patterns
-        for command_line in commands:
-            command = self._extract_command_from_line(command_line)
-            if command:
-                # Store full command line for this command
-                if command not in self._command_sequences:
-                    self._command_sequences[command] = Counter()
-                self._command_sequences[command][command_line] += 1
-                
-                # Count command frequency
-                self._command_frequencies[command] += 1
+        return get_base_command(line)
+    
+    def _ingest_files(self, files: List[Path], now: float) -> 'HistoryPartial':
+        """
+        Parse history files and merge their partial counts in file order.
+        
+        Large histories are parsed in worker processes. They are spawned, not
+        forked, since the daemon calls this with other threads running.
+        """
+        workers = min(self.ingest_workers, len(files))
+        partials: List[HistoryPartial] = []
+        
+        if workers > 1 and self._history_files_size(files) >= self.parallel_ingest_bytes:
+            try:
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as executor:
+                    partials = list(executor.map(
+                        _ingest_history_file,
+                        files,
+                        [now] * len(files),
+                        [self.frecency_half_life] * len(files),
+                        [self.line_capacity] * len(files),
+                        [self.columnar] * len(files),
+                        range(len(files))
+                    ))
+            except Exception as e:
+                logger.warning(f"Parallel history ingest failed, parsing serially: {e}")
+                partials = []
+        
+        if not partials:
+            partials = [
+                _ingest_history_file(
+                    file_path, now, self.frecency_half_life,
+                    self.line_capacity, self.columnar, source_id
+                )
+                for source_id, file_path in enumerate(files)
+            ]
+        
+        merged = HistoryPartial(self.frecency_half_life, self.line_capacity, self.columnar)
+        for file_path, partial in zip(files, partials):
+            logger.debug(f"Parsed {partial.total} commands from {file_path}")
+            merged.merge(partial)
+        
+        return merged
+    
+    @staticmethod
+    def _history_files_size(files: List[Path]) -> int:
+        """Get the total size of the history files in bytes."""
+        total = 0
+        for history_file in files:
+            try:
+                total += history_file.stat().st_size
+            except OSError:
+                continue
+        return total
+    
+    def _history_files_mtime(self, files: List[Path]) -> float:
+        """Get the newest modification time of the history files."""
+        mtimes = []
+        for history_file in files:
+            try:
+                mtimes.append(history_file.stat().st_mtime)
+            except OSError:
+                continue
+        return max(mtimes, default=0.0)
+    
+    def record_command(self, entry: HistoryEntry) -> None:
+        """
+        Record a command reported live by a shell hook.
+        
+        Args:
+            entry: The executed command with its timestamp, cwd, exit status and duration
+        """
+        self.record_commands([entry])
+    
+    def record_commands(self, entries: Sequence[HistoryEntry]) -> None:
+        """
+        Record commands reported live by shell hooks.
+        
+        Recording only queues the commands. They are folded into a new snapshot
+        right away if none was published in the last live_publish_interval
+        seconds, otherwise by a timer once it has passed, so a burst of
+        commands costs one snapshot copy.
+        
+        Args:
+            entries: Executed commands, oldest first
+        """
+        now = time.time()
+        entries = [
+            entry if entry.timestamp is not None else entry._replace(timestamp=now)
+            for entry in entries if entry.exit_status != COMMAND_NOT_FOUND_STATUS
+        ]
+        if not entries:
+            return
+        
+        self.analyze_history()
+        
+        with self._analysis_lock:
+            self._live_entries.extend(entries)
+            self._unpublished.extend(entries)
+            wait = self._last_live_publish + self.live_publish_interval - time.monotonic()
+            if wait <= 0:
+                self._publish_live()
+            elif self._publish_timer is None:
+                self._publish_timer = threading.Timer(wait, self._publish_live_later)
+                self._publish_timer.daemon = True
+                self._publish_timer.start()
+    
+    def _publish_live(self) -> None:
+        """Fold the queued live commands into a copy of the snapshot and swap it in (lock held)."""
+        if not self._unpublished:
+            return
+        # Copy-on-write: readers holding the current snapshot never see it change
+        snapshot = self._snapshot.copy(next(self._generations))
+        for entry in self._unpublished:
+            snapshot.apply_entry(entry)
+        if snapshot.history_store is not None:
+            snapshot.history_store.flush()
+        self._snapshot = snapshot
+        self._unpublished = []
+        self._last_live_publish = time.monotonic()
+    
+    def _publish_live_later(self) -> None:
+        """Timer callback publishing the live commands queued since the last publish."""
+        with self._analysis_lock:
+            self._publish_timer = None
+            self._publish_live()
+    
+    @property
+    def generation(self) -> int:
+        """Generation of the published snapshot (changes whenever the models do)."""
+        return self._snapshot.generation
     
-    def analyze_history(self, force_refresh: bool = False) -> None:
+    def get_snapshot(self) -> 'HistorySnapshot':
+        """Get the current models as one consistent snapshot, refreshing it if stale."""
+        return self.analyze_history()
+    
+    def _resolve_snapshot(self, snapshot: Optional['HistorySnapshot']) -> 'HistorySnapshot':
+        """Get the snapshot an accessor reads: the caller's, or the published one."""
+        return snapshot if snapshot is not None else self.analyze_history()
+    
+    def analyze_history(self, force_refresh: bool = False) -> 'HistorySnapshot':
         """
         Analyze shell history to extract patterns.
         
+        The new models are built off to the side and published with a single
+        reference swap, so readers never take the lock or see half-built state.
+        
         Args:
             force_refresh: Force re-analysis even if cache is valid
+            
+        Returns:
+            The published snapshot
         """
-        current_time = time.time()
+        snapshot = self._snapshot
+        if (not force_refresh and
+            snapshot.generation and
+            (not self.auto_refresh or time.time() - self._last_analysis_time < self.cache_duration)):
+            return snapshot
         
-        with self._analysis_lock:
-            if (not force_refresh and 
-                self._command_frequencies and 
-                current_time - self._last_analysis_time < self.cache_duration):
-                return
+        # Only one thread rebuilds; once a snapshot exists, others keep reading it
+        if not self._analysis_lock.acquire(blocking=force_refresh or not snapshot.generation):
+            return snapshot
+        
+        try:
+            current_time = time.time()
+            if (not force_refresh and
+                self._snapshot.generation and
+                (not self.auto_refresh or current_time - self._last_analysis_time < self.cache_duration)):
+                return self._snapshot
             
             logger.info("Analyzing shell history...")
             
-            # Reset data
-            self._command_sequences.clear()
-            self._command_frequencies.clear()
-            self._command_pairs.clear()
-            self._recent_commands.clear()
-            
-            all_commands = []
+            # Parse all history sources (map) and merge their counts (reduce)
+            files = self._expand_history_sources()
+            partial = self._ingest_files(files, current_time)
+            snapshot = HistorySnapshot.from_partial(partial, current_time, self.line_capacity)
             
-            # Parse all history files
-            for history_file in self.history_files:
-                file_commands = []
-                
-                if 'fish' in str(history_file):
-                    file_commands = self._parse_fish_history(history_file)
-                elif 'zsh' in str(history_file):
-                    file_commands = self._parse_zsh_history(history_file)
-                else:
-                    file_commands = self._parse_bash_history(history_file)
-                
-                all_commands.extend(file_commands)
-                logger.debug(f"Parsed {len(file_commands)} commands from {history_file}")
+            if partial.total:
+                logger.info(f"Analyzed {partial.total} total commands from {len(files)} files")
+                logger.info(f"Found {len(snapshot.frequencies)} unique commands")
             
-            if all_commands:
-                # Keep recent commands (last 100)
-                self._recent_commands = all_commands[-100:]
-                
-                # Analyze patterns
-                self._analyze_command_sequences(all_commands)
-                
-                logger.info(f"Analyzed {len(all_commands)} total commands")
-                logger.info(f"Found {len(self._command_frequencies)} unique commands")
-            
-            self._last_analysis_time = current_time
+            self._publish(snapshot, current_time, self._history_files_mtime(files))
+            record_history_analysis_time(time.time() - current_time)
+            return snapshot
+        finally:
+            self._analysis_lock.release()
+    
+    def _publish(self, snapshot: 'HistorySnapshot', analysis_time: float, files_mtime: float) -> None:
+        """Replay pending live commands into a new snapshot and swap it in (lock held)."""
+        # Re-apply live commands the shells had not written to disk yet
+        pending = [entry for entry in self._live_entries if entry.timestamp > files_mtime]
+        self._live_entries = deque(pending, maxlen=self._live_entries.maxlen)
+        self._unpublished = []
+        for entry in pending:
+            snapshot.apply_entry(entry)
+        if snapshot.history_store is not None:
+            snapshot.history_store.flush()
+        
+        snapshot.generation = next(self._generations)
+        self._snapshot = snapshot
+        self._last_analysis_time = analysis_time
+        self._files_mtime = files_mtime
+    
+    def export_snapshot(self) -> Tuple['HistorySnapshot', float, float]:
+        """
+        Get the published snapshot with the time it was built and the history
+        files' modification time it reflects, for install_snapshot() elsewhere.
+        """
+        snapshot = self.analyze_history()
+        return snapshot, self._last_analysis_time, self._files_mtime
     
-    def get_command_suggestions_after(self, command: str, limit: int = 10) -> List[Tuple[str, float]]:
+    def install_snapshot(self, snapshot: 'HistorySnapshot', analysis_time: float, files_mtime: float) -> None:
+        """
+        Publish a snapshot built elsewhere (e.g. in a child process).
+        
+        Args:
+            snapshot: Snapshot from export_snapshot()
+            analysis_time: When it was built
+            files_mtime: Newest history file modification time it reflects
+        """
+        with self._analysis_lock:
+            self._publish(snapshot, analysis_time, files_mtime)
+    
+    def get_command_suggestions_after(self, command: str, limit: int = 10,
+                                      snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float]]:
         """
         Get commands that typically follow the given command.
         
         Args:
             command: The command to get suggestions for
             limit: Maximum number of suggestions
+            snapshot: Snapshot to read (default: the published one)
             
         Returns:
             List of (command, confidence_score) tuples
         """
-        self.analyze_history()
+        snapshot = self._resolve_snapshot(snapshot)
         
-        if command not in self._command_pairs:
+        if command not in snapshot.pairs:
             return []
         
         suggestions = []
-        total_count = sum(self._command_pairs[command].values())
+        total_count = sum(snapshot.pairs[command].values())
         
-        for next_cmd, count in self._command_pairs[command].most_common(limit):
+        for next_cmd, count in snapshot.pairs[command].most_common(limit):
             confidence = count / total_count
             suggestions.append((next_cmd, confidence))
         
         return suggestions
     
-    def get_argument_suggestions(self, command: str, limit: int = 10) -> List[Tuple[str, float]]:
+    def get_argument_suggestions(self, command: str, limit: int = 10,
+                                 snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float]]:
         """
         Get argument patterns for a command based on history.
         
         Args:
             command: The command to get argument suggestions for
             limit: Maximum number of suggestions
+            snapshot: Snapshot to read (default: the published one)
             
         Returns:
             List of (full_command_line, usage_frequency) tuples
         """
-        self.analyze_history()
+        snapshot = self._resolve_snapshot(snapshot)
         
-        if command not in self._command_sequences:
+        if command not in snapshot.sequences:
             return []
         
         suggestions = []
-        total_count = sum(self._command_sequences[command].values())
+        total_count = sum(snapshot.sequences[command].values())
         
-        for cmd_line, count in self._command_sequences[command].most_common(limit):
+        for cmd_line, count in snapshot.sequences[command].most_common(limit):
             frequency = count / total_count
             suggestions.append((cmd_line, frequency))
         
         return suggestions
     
-    def get_frequent_commands(self, limit: int = 20) -> List[Tuple[str, int]]:
+    def get_next_token_suggestions(self, tokens: List[str], limit: int = 10,
+                                   snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float]]:
+        """
+        Get the tokens most often typed after the given command line prefix.
+        
+        Args:
+            tokens: Completed tokens so far, starting with the base command
+            limit: Maximum number of suggestions
+            snapshot: Snapshot to read (default: the published one)
+            
+        Returns:
+            List of (token, probability) tuples
+        """
+        snapshot = self._resolve_snapshot(snapshot)
+        return snapshot.argument_model.lookup(tokens)[:limit]
+    
+    def get_flag_completions(self, tokens: List[str], limit: int = 5,
+                             snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[Tuple[str, ...], float]]:
+        """
+        Get the flags habitually used together with the flags already typed.
+        
+        Args:
+            tokens: Completed tokens so far, starting with the base command
+            limit: Maximum number of completions
+            snapshot: Snapshot to read (default: the published one)
+            
+        Returns:
+            List of (missing_flags, confidence) tuples
+        """
+        snapshot = self._resolve_snapshot(snapshot)
+        
+        if not tokens:
+            return []
+        
+        flags = FlagMiner.extract_flags(tokens)
+        if not flags:
+            return []
+        
+        return snapshot.flag_miner.complete(tokens[0], flags)[:limit]
+    
+    def get_pipe_suggestions(self, command: str, limit: int = 10,
+                             snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float]]:
+        """
+        Get the pipeline stages most often fed by a command's output.
+        
+        Args:
+            command: Base command of the previous pipeline stage
+            limit: Maximum number of suggestions
+            snapshot: Snapshot to read (default: the published one)
+            
+        Returns:
+            List of (next_stage, probability) tuples
+        """
+        snapshot = self._resolve_snapshot(snapshot)
+        return snapshot.pipe_model.lookup(command)[:limit]
+    
+    def get_frequent_commands(self, limit: int = 20, since: Optional[float] = None,
+                              snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, int]]:
         """
         Get most frequently used commands.
         
         Args:
             limit: Maximum number of commands to return
+            since: Only count uses at or after this timestamp (needs the
+                column store; all-time counts are returned without it)
+            snapshot: Snapshot to read (default: the published one)
             
         Returns:
             List of (command, frequency) tuples
         """
-        self.analyze_history()
-        return self._command_frequencies.most_common(limit)
+        snapshot = self._resolve_snapshot(snapshot)
+        
+        store = snapshot.history_store
+        if since is None or store is None:
+            return snapshot.frequencies.most_common(limit)
+        
+        counts = store.window_command_counts(since)
+        return [
+            (store.commands[index], int(counts[index]))
+            for index in ColumnarHistoryStore.top_k(counts, limit)
+            if counts[index] > 0
+        ]
     
-    def get_recent_commands(self, limit: int = 10) -> List[str]:
+    def get_frecent_commands(self, limit: int = 20,
+                             snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float]]:
         """
-        Get recently used commands.
+        Get commands ranked by exponentially decayed usage (frequency and recency).
         
         Args:
-            limit: Maximum number of recent commands
+            limit: Maximum number of commands to return
+            snapshot: Snapshot to read (default: the published one)
             
         Returns:
-            List of recent command names
+            List of (command, score) tuples, scores normalized so the top command is 1.0
         """
-        self.analyze_history()
+        snapshot = self._resolve_snapshot(snapshot)
+        
+        ranked = snapshot.frecency.top(limit)
+        if not ranked or ranked[0][1] <= 0:
+            return []
         
-        recent_unique = []
-        seen = set()
+        top_score = ranked[0][1]
+        return [(command, score / top_score) for command, score in ranked]
+    
+    def get_directory_suggestions(self, cwd: str, limit: int = 20,
+                                  snapshot: Optional['HistorySnapshot'] = None) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """
+        Get the command lines most used in a directory (or its nearest indexed parent).
         
-        for cmd_line in reversed(self._recent_commands):
-            cmd = self._extract_command_from_line(cmd_line)
-            if cmd and cmd not in seen:
-                recent_unique.append(cmd)
-                seen.add(cmd)
-                if len(recent_unique) >= limit:
-                    break
+        Args:
+            cwd: Current working directory
+            limit: Maximum number of command lines
+            snapshot: Snapshot to read (default: the published one)
+            
+        Returns:
+            (indexed_directory, [(command_line, score)]) tuple
+        """
+        snapshot = self._resolve_snapshot(snapshot)
+        directory, table = snapshot.directory_index.lookup(cwd)
+        return directory, table[:limit]
+    
+    def get_recent_commands(self, limit: int = 10,
+                            snapshot: Optional['HistorySnapshot'] = None) -> List[str]:
+        """
+        Get recently used commands.
         
-        return recent_unique
+        Args:
+            limit: Maximum number of recent commands
+            snapshot: Snapshot to read (default: the published one)
+            
+        Returns:
+            List of recent command names
+        """
+        snapshot = self._resolve_snapshot(snapshot)
+        return list(islice(reversed(snapshot.recent), limit))
     
-    def get_context_suggestions(self, current_input: str, limit: int = 10) -> List[Tuple[str, float, str]]:
+    def get_context_suggestions(self,
+                                current_input: str,
+                                limit: int = 10,
+                                exact_weight: float = 0.9,
+                                partial_weight: float = 0.7,
+                                sequence_weight: float = 0.3,
+                                snapshot: Optional['HistorySnapshot'] = None) -> List[Tuple[str, float, str]]:
         """
         Get context-aware suggestions based on current input and history.
         
         Args:
             current_input: Current command line input
             limit: Maximum number of suggestions
+            exact_weight: Weight of lines starting with the input
+            partial_weight: Weight of lines only containing the input
+            sequence_weight: Boost weight when the command often follows the last one
+            snapshot: Snapshot to read (default: the published one)
             
         Returns:
             List of (suggestion, confidence, source) tuples
         """
-        self.analyze_history()
+        snapshot = self._resolve_snapshot(snapshot)
         
         suggestions = []
         current_command = self._extract_command_from_line(current_input)
@@ -325,18 +706,18 @@ class HistoryAnalyzer:
             return suggestions
         
         # Get argument suggestions based on exact command match
-        arg_suggestions = self.get_argument_suggestions(current_command, limit)
+        arg_suggestions = self.get_argument_suggestions(current_command, limit, snapshot)
         for cmd_line, freq in arg_suggestions:
             if cmd_line.startswith(current_input):
-                suggestions.append((cmd_line, freq * 0.9, "history_exact"))
+                suggestions.append((cmd_line, min(1.0, freq * exact_weight), "history_exact"))
             elif current_input in cmd_line:
-                suggestions.append((cmd_line, freq * 0.7, "history_partial"))
+                suggestions.append((cmd_line, min(1.0, freq * partial_weight), "history_partial"))
         
         # Get command sequence suggestions
-        recent_commands = self.get_recent_commands(5)
+        recent_commands = self.get_recent_commands(5, snapshot)
         if recent_commands:
             last_command = recent_commands[0]
-            next_suggestions = self.get_command_suggestions_after(last_command, 5)
+            next_suggestions = self.get_command_suggestions_after(last_command, 5, snapshot)
             for next_cmd, conf in next_suggestions:
                 if next_cmd == current_command:
                     # Boost confidence if this command often follows the recent one
@@ -344,7 +725,7 @@ class HistoryAnalyzer:
                         if suggestion[0].startswith(current_command):
                             # Update confidence
                             old_conf = suggestion[1]
-                            new_conf = min(1.0, old_conf + conf * 0.3)
+                            new_conf = min(1.0, old_conf + conf * sequence_weight)
                             suggestions[suggestions.index(suggestion)] = (
                                 suggestion[0], new_conf, suggestion[2]
                             )
@@ -355,13 +736,282 @@ class HistoryAnalyzer:
     
     def get_history_stats(self) -> Dict[str, Any]:
         """Get statistics about analyzed history."""
-        self.analyze_history()
+        snapshot = self.analyze_history()
         
         return {
-            'total_commands_analyzed': sum(self._command_frequencies.values()),
-            'unique_commands': len(self._command_frequencies),
-            'history_files_found': len(self.history_files),
-            'recent_commands_count': len(self._recent_commands),
-            'command_pairs_learned': len(self._command_pairs),
+            'total_commands_analyzed': sum(snapshot.frequencies.values()),
+            'unique_commands': len(snapshot.frequencies),
+            'command_lines_tracked': sum(len(sequence) for sequence in snapshot.sequences.values()),
+            'command_line_capacity': self.line_capacity,
+            'columnar_store_rows': len(snapshot.history_store) if snapshot.history_store is not None else 0,
+            'history_files_found': len(self._expand_history_sources()),
+            'recent_commands_count': len(snapshot.recent),
+            'live_commands_pending': len(self._live_entries),
+            'command_pairs_learned': len(snapshot.pairs),
+            'argument_prefixes_learned': len(snapshot.argument_model),
+            'flag_tables_learned': len(snapshot.flag_miner),
+            'pipe_tables_learned': len(snapshot.pipe_model),
+            'frecency_half_life': snapshot.frecency.half_life,
+            'directories_indexed': len(snapshot.directory_index),
+            'snapshot_generation': snapshot.generation,
             'last_analysis_time': self._last_analysis_time,
-        } 
\ No newline at end of file
+        } 
+
+
+class HistorySnapshot:
+    """
+    Every model derived from history, published as one unit.
+    
+    A refresh builds a new snapshot and swaps it in with one assignment, so a
+    reader that grabbed a snapshot keeps a consistent view without locking.
+    A published snapshot is never changed: live commands are folded into a
+    copy() that shares every structure the command does not touch, and the
+    copy is published as the next generation.
+    """
+    
+    def __init__(self,
+                 generation: int = 0,
+                 frecency_half_life: float = 7 * 24 * 3600,
+                 line_capacity: Optional[int] = None):
+        self.generation = generation
+        self.line_capacity = line_capacity
+        self.sequences: Dict[str, Counter] = SharedCounters()
+        self.frequencies: Counter = Counter()
+        self.pairs: Dict[str, Counter] = SharedCounters()
+        # Base command -> its latest command line, most recently used last
+        self.recent: 'OrderedDict[str, str]' = OrderedDict()
+        self.argument_model = ArgumentModel()
+        self.flag_miner = FlagMiner()
+        self.pipe_model = PipeTransitionModel()
+        self.frecency = FrecencyCounter(frecency_half_life)
+        self.directory_index = DirectoryIndex()
+        self.history_store: Optional[ColumnarHistoryStore] = None
+    
+    def copy(self, generation: int) -> 'HistorySnapshot':
+        """
+        Get a copy to fold live commands into while this snapshot stays published.
+        
+        Outer dictionaries are copied; per-command counters and model tables are
+        shared until the copy changes them, so a copy costs a few dictionary
+        copies rather than a rebuild. That still grows with the history, which
+        is why live commands are published in batches (LIVE_PUBLISH_INTERVAL).
+        
+        Args:
+            generation: Generation of the copy
+        """
+        clone = HistorySnapshot.__new__(HistorySnapshot)
+        clone.generation = generation
+        clone.line_capacity = self.line_capacity
+        clone.sequences = self.sequences.share()
+        clone.frequencies = self.frequencies.copy()
+        clone.pairs = self.pairs.share()
+        clone.recent = self.recent.copy()
+        clone.argument_model = self.argument_model.copy()
+        clone.flag_miner = self.flag_miner  # only rebuilt by a full analysis
+        clone.pipe_model = self.pipe_model.copy()
+        clone.frecency = self.frecency.copy()
+        clone.directory_index = self.directory_index.copy()
+        clone.history_store = self.history_store.copy() if self.history_store is not None else None
+        return clone
+    
+    @classmethod
+    def from_partial(cls,
+                     partial: 'HistoryPartial',
+                     now: float,
+                     line_capacity: Optional[int] = None) -> 'HistorySnapshot':
+        """Build a snapshot from merged history counts, deriving the argument, flag and pipe models."""
+        if partial.store is not None:
+            partial.materialize(now)
+        
+        snapshot = cls(0, partial.frecency.half_life, line_capacity)
+        snapshot.history_store = partial.store
+        snapshot.sequences = SharedCounters(partial.sequences)
+        snapshot.frequencies = partial.frequencies
+        snapshot.pairs = SharedCounters(partial.pairs)
+        snapshot.frecency = partial.frecency
+        snapshot.directory_index = partial.directories
+        snapshot.directory_index.build_tables()
+        for command_line in partial.tail:
+            command = HistoryAnalyzer._extract_command_from_line(command_line)
+            if command:
+                snapshot.touch_recent(command, command_line)
+        
+        # Learn argument, flag and pipe models once per distinct line
+        for sequence in snapshot.sequences.values():
+            for command_line, count in sequence.items():
+                snapshot.learn_line(command_line, count)
+        snapshot.argument_model.build_tables()
+        snapshot.pipe_model.build_tables()
+        snapshot.flag_miner.mine()
+        return snapshot
+    
+    def learn_line(self, command_line: str, count: int = 1, mine_flags: bool = True) -> None:
+        """Feed every segment of a command line to the argument, flag and pipe models."""
+        parsed = parse_command_line(command_line)
+        for segment in parsed.segments:
+            if not segment.tokens:
+                continue
+            self.argument_model.add(segment.tokens, count)
+            if mine_flags:
+                self.flag_miner.add(segment.command, FlagMiner.extract_flags(segment.tokens), count)
+        for command, next_stage in parsed.pipe_transitions():
+            self.pipe_model.add(command, next_stage, count)
+    
+    def touch_recent(self, command: str, command_line: str) -> None:
+        """Mark a command as the most recently used one."""
+        self.recent[command] = command_line
+        self.recent.move_to_end(command)
+        if len(self.recent) > RECENT_COMMANDS_SIZE:
+            self.recent.popitem(last=False)
+    
+    def apply_entry(self, entry: HistoryEntry) -> None:
+        """Incrementally fold one executed command into every model."""
+        command = HistoryAnalyzer._extract_command_from_line(entry.command)
+        if not command:
+            return
+        
+        if self.recent:
+            previous = next(reversed(self.recent))
+            self.pairs.writable(previous)[command] += 1
+        
+        self.touch_recent(command, entry.command)
+        
+        sequence = self.sequences.writable(command, lambda: new_line_counter(self.line_capacity))
+        sequence[entry.command] += 1
+        self.frequencies[command] += 1
+        self.frecency.add(command, entry.timestamp)
+        if self.history_store is not None:
+            self.history_store.append(entry, HistoryAnalyzer._extract_command_from_line)
+        
+        # Only the prefixes touched by this line are re-ranked; flag sets are
+        # mined offline on the next full analysis
+        self.learn_line(entry.command, mine_flags=False)
+        self.argument_model.build_tables()
+        self.pipe_model.build_tables()
+        
+        if entry.cwd:
+            self.directory_index.add(entry.cwd, entry.command)
+            self.directory_index.build_tables()
+
+
+class HistoryPartial:
+    """Mergeable counts built from one slice of history (the map side of ingestion)."""
+    
+    def __init__(self,
+                 frecency_half_life: float,
+                 line_capacity: Optional[int] = None,
+                 columnar: bool = False):
+        self.line_capacity = line_capacity
+        # In columnar mode entries are only encoded; counts come from materialize()
+        self.store = ColumnarHistoryStore() if columnar else None
+        self.sequences: Dict[str, Counter] = {}
+        self.frequencies: Counter = Counter()
+        self.pairs: Dict[str, Counter] = {}
+        self.frecency = FrecencyCounter(frecency_half_life)
+        self.frecency.invalidate_ranking()
+        self.directories = DirectoryIndex()
+        self.tail: List[str] = []
+        self.total = 0
+    
+    def add_entries(self, entries: List[HistoryEntry], source_id: int = 0) -> None:
+        """Count a chronological run of entries from one history file."""
+        self.tail = (self.tail + [entry.command for entry in entries[-100:]])[-100:]
+        self.total += len(entries)
+        
+        if self.store is not None:
+            self.store.add_entries(entries, source_id, HistoryAnalyzer._extract_command_from_line)
+            return
+        
+        previous = None
+        # History repeats itself: tokenize each distinct line only once
+        commands_by_line: Dict[str, Optional[str]] = {}
+        for entry in entries:
+            command = commands_by_line.get(entry.command, '')
+            if command == '':
+                command = HistoryAnalyzer._extract_command_from_line(entry.command)
+                commands_by_line[entry.command] = command
+            if not command:
+                previous = None
+                continue
+            
+            if previous:
+                following = self.pairs.get(previous)
+                if following is None:
+                    following = self.pairs[previous] = Counter()
+                following[command] += 1
+            previous = command
+            
+            sequence = self.sequences.get(command)
+            if sequence is None:
+                sequence = self.sequences[command] = new_line_counter(self.line_capacity)
+            sequence[entry.command] += 1
+            self.frequencies[command] += 1
+            self.frecency.add(command, entry.timestamp)
+            if entry.cwd:
+                self.directories.add(entry.cwd, entry.command)
+    
+    def merge(self, other: 'HistoryPartial') -> None:
+        """Fold another partial into this one; `other` is treated as the later slice."""
+        self.tail = (self.tail + other.tail)[-100:]
+        self.total += other.total
+        
+        if self.store is not None and other.store is not None:
+            self.store.extend(other.store)
+            return
+        
+        for command, sequence in other.sequences.items():
+            if command not in self.sequences:
+                self.sequences[command] = new_line_counter(self.line_capacity)
+            self.sequences[command].update(sequence)
+        self.frequencies.update(other.frequencies)
+        for command, following in other.pairs.items():
+            self.pairs.setdefault(command, Counter()).update(following)
+        self.frecency.merge(other.frecency)
+        self.directories.merge(other.directories)
+    
+    def materialize(self, now: float) -> None:
+        """Derive the counters from the column store with vectorized reductions."""
+        store = self.store
+        commands, lines = store.commands, store.lines
+        
+        self.frequencies = Counter({
+            commands[command_id]: count
+            for command_id, count in enumerate(store.command_counts().tolist()) if count
+        })
+        
+        self.sequences = {}
+        for line_id, count in enumerate(store.line_counts().tolist()):
+            if not count:
+                continue
+            command = commands[store.line_commands[line_id]]
+            sequence = self.sequences.get(command)
+            if sequence is None:
+                sequence = self.sequences[command] = Counter()
+            sequence[lines[line_id]] = count
+        
+        self.pairs = {}
+        for command_id, next_id, count in store.pair_counts():
+            self.pairs.setdefault(commands[command_id], Counter())[commands[next_id]] = count
+        
+        scores = store.frecency_scores(now, self.frecency.half_life).tolist()
+        self.frecency.load(
+            {commands[command_id]: score for command_id, score in enumerate(scores) if score > 0},
+            now
+        )
+        
+        self.directories = DirectoryIndex()
+        for cwd_id, line_id, count in store.directory_line_counts():
+            self.directories.add(store.cwds[cwd_id], lines[line_id], count)
+
+
+def _ingest_history_file(file_path: Path,
+                         now: float,
+                         frecency_half_life: float,
+                         line_capacity: Optional[int] = None,
+                         columnar: bool = False,
+                         source_id: int = 0) -> HistoryPartial:
+    """Parse one history file into partial counts (runs in a worker process)."""
+    entries = HistoryAnalyzer._parse_history_file(file_path)
+    partial = HistoryPartial(frecency_half_life, line_capacity, columnar)
+    partial.add_entries(HistoryAnalyzer._fill_missing_timestamps(entries, now), source_id)
+    return partial
@@ -0,0 +1,248 @@
+"""
+History Store Module
+
+Keeps ingested history as parallel NumPy columns (timestamp, command id, line
+id, cwd id, exit status, source id, break flag) with dictionary-encoded strings, so that
+frequency, frecency, time-window and per-directory statistics are vectorized
+reductions instead of Python loops over Counters.
+
+NumPy is optional; callers check NUMPY_AVAILABLE and fall back to counters.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Column value for a missing cwd or exit status
+MISSING = -1
+
+
+class ColumnarHistoryStore:
+    """Dictionary-encoded, column-oriented store of history entries."""
+
+    def __init__(self):
+        """Initialize an empty store."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("ColumnarHistoryStore requires numpy")
+
+        # String dictionaries
+        self.commands: List[str] = []
+        self.lines: List[str] = []
+        self.cwds: List[str] = []
+        self.line_commands: List[int] = []  # line id -> command id
+        self._command_index: Dict[str, int] = {}
+        self._line_index: Dict[str, int] = {}
+        self._cwd_index: Dict[str, int] = {}
+
+        # Columns
+        self.timestamps = np.empty(0, dtype=np.float64)
+        self.command_ids = np.empty(0, dtype=np.int32)
+        self.line_ids = np.empty(0, dtype=np.int32)
+        self.cwd_ids = np.empty(0, dtype=np.int32)
+        self.exit_statuses = np.empty(0, dtype=np.int32)
+        self.source_ids = np.empty(0, dtype=np.int32)
+        # True where a row does not follow on from the previous one: the first
+        # row of a run, or one after lines that had no command
+        self.breaks = np.empty(0, dtype=bool)
+
+        # Rows appended one at a time (live capture), folded in by flush()
+        self._pending: List[Tuple[float, int, int, int, int, int, bool]] = []
+
+    def copy(self) -> 'ColumnarHistoryStore':
+        """
+        Get a copy that can take appends without changing this store.
+
+        Columns are replaced on append, never written in place, so they are
+        shared. So are the string dictionaries: they only ever grow, so every
+        id in this store's columns stays valid.
+        """
+        clone = ColumnarHistoryStore.__new__(ColumnarHistoryStore)
+        clone.__dict__.update(self.__dict__)
+        clone._pending = list(self._pending)
+        return clone
+
+    @staticmethod
+    def _encode(value: str, values: List[str], index: Dict[str, int]) -> int:
+        """Get the dictionary id of a string, adding it if new."""
+        value_id = index.get(value)
+        if value_id is None:
+            value_id = len(values)
+            index[value] = value_id
+            values.append(value)
+        return value_id
+
+    def _encode_line(self, line: str, command_of: Callable[[str], Optional[str]]) -> int:
+        """Get the id of a command line, or MISSING if it has no command."""
+        line_id = self._line_index.get(line)
+        if line_id is not None:
+            return line_id
+        command = command_of(line)
+        if not command:
+            return MISSING
+        line_id = self._encode(line, self.lines, self._line_index)
+        self.line_commands.append(self._encode(command, self.commands, self._command_index))
+        return line_id
+
+    def _row(self, entry, source_id: int, command_of: Callable[[str], Optional[str]], breaks: bool):
+        """Encode one entry as a row tuple, or None if it has no command."""
+        line_id = self._encode_line(entry.command, command_of)
+        if line_id == MISSING:
+            return None
+        cwd_id = self._encode(entry.cwd, self.cwds, self._cwd_index) if entry.cwd else MISSING
+        exit_status = entry.exit_status if entry.exit_status is not None else MISSING
+        return (entry.timestamp, self.line_commands[line_id], line_id, cwd_id, exit_status, source_id, breaks)
+
+    def add_entries(self,
+                    entries: Sequence,
+                    source_id: int,
+                    command_of: Callable[[str], Optional[str]]) -> None:
+        """
+        Append a chronological run of entries from one history source.
+
+        Args:
+            entries: HistoryEntry objects with timestamps filled in
+            source_id: Id of the history file they came from
+            command_of: Function extracting the base command from a line
+        """
+        rows = []
+        # Like the counters, pairs start over with each run and after any
+        # line without a command
+        breaks = True
+        for entry in entries:
+            row = self._row(entry, source_id, command_of, breaks)
+            breaks = row is None
+            if row:
+                rows.append(row)
+        self._append_rows(rows)
+
+    def append(self, entry, command_of: Callable[[str], Optional[str]], source_id: int = MISSING) -> None:
+        """Append a single entry (buffered until flush()); it follows on from the last row."""
+        row = self._row(entry, source_id, command_of, False)
+        if row:
+            self._pending.append(row)
+
+    def _append_rows(self, rows: List[Tuple]) -> None:
+        """Append encoded rows to the columns."""
+        if not rows:
+            return
+        timestamps, command_ids, line_ids, cwd_ids, exit_statuses, source_ids, breaks = zip(*rows)
+        self.timestamps = np.concatenate([self.timestamps, np.asarray(timestamps, dtype=np.float64)])
+        self.command_ids = np.concatenate([self.command_ids, np.asarray(command_ids, dtype=np.int32)])
+        self.line_ids = np.concatenate([self.line_ids, np.asarray(line_ids, dtype=np.int32)])
+        self.cwd_ids = np.concatenate([self.cwd_ids, np.asarray(cwd_ids, dtype=np.int32)])
+        self.exit_statuses = np.concatenate([self.exit_statuses, np.asarray(exit_statuses, dtype=np.int32)])
+        self.source_ids = np.concatenate([self.source_ids, np.asarray(source_ids, dtype=np.int32)])
+        self.breaks = np.concatenate([self.breaks, np.asarray(breaks, dtype=bool)])
+
+    def flush(self) -> None:
+        """
+        Fold buffered single-row appends into the columns.
+
+        Only the writer calls this, before publishing the store; queries never
+        change the store, so concurrent readers need no lock.
+        """
+        if self._pending:
+            rows, self._pending = self._pending, []
+            self._append_rows(rows)
+
+    def extend(self, other: 'ColumnarHistoryStore') -> None:
+        """
+        Append another store's rows, re-encoding its dictionaries into ours.
+
+        Args:
+            other: Store built from a later slice of history
+        """
+        other.flush()
+        self.flush()
+
+        def remap(values: List[str], target: List[str], index: Dict[str, int]):
+            mapping = np.fromiter(
+                (self._encode(value, target, index) for value in values),
+                dtype=np.int32, count=len(values)
+            )
+            # Extra trailing slot maps MISSING (-1) to itself
+            return np.append(mapping, MISSING).astype(np.int32)
+
+        command_map = remap(other.commands, self.commands, self._command_index)
+        first_new_line = len(self.lines)
+        line_map = remap(other.lines, self.lines, self._line_index)
+        cwd_map = remap(other.cwds, self.cwds, self._cwd_index)
+
+        # Lines first seen in `other` need their command ids translated too
+        for line_id in range(first_new_line, len(self.lines)):
+            other_line_id = other._line_index[self.lines[line_id]]
+            self.line_commands.append(int(command_map[other.line_commands[other_line_id]]))
+
+        self.timestamps = np.concatenate([self.timestamps, other.timestamps])
+        self.command_ids = np.concatenate([self.command_ids, command_map[other.command_ids]])
+        self.line_ids = np.concatenate([self.line_ids, line_map[other.line_ids]])
+        self.cwd_ids = np.concatenate([self.cwd_ids, cwd_map[other.cwd_ids]])
+        self.exit_statuses = np.concatenate([self.exit_statuses, other.exit_statuses])
+        self.source_ids = np.concatenate([self.source_ids, other.source_ids])
+        self.breaks = np.concatenate([self.breaks, other.breaks])
+
+    def __len__(self) -> int:
+        return len(self.timestamps) + len(self._pending)
+
+    # Vectorized queries (read-only; buffered appends are not seen until flush())
+
+    def command_counts(self) -> 'np.ndarray':
+        """Number of uses per command id."""
+        return np.bincount(self.command_ids, minlength=len(self.commands))
+
+    def line_counts(self) -> 'np.ndarray':
+        """Number of uses per line id."""
+        return np.bincount(self.line_ids, minlength=len(self.lines))
+
+    def window_command_counts(self, start: float, end: float = float('inf')) -> 'np.ndarray':
+        """Number of uses per command id with start <= timestamp < end."""
+        mask = (self.timestamps >= start) & (self.timestamps < end)
+        return np.bincount(self.command_ids[mask], minlength=len(self.commands))
+
+    def frecency_scores(self, now: float, half_life: float) -> 'np.ndarray':
+        """Exponentially decayed use count per command id, evaluated at `now`."""
+        weights = np.exp2((self.timestamps - now) / half_life)
+        return np.bincount(self.command_ids, weights=weights, minlength=len(self.commands))
+
+    def pair_counts(self) -> List[Tuple[int, int, int]]:
+        """(command id, next command id, count) for consecutive commands of the same source."""
+        if len(self.command_ids) < 2:
+            return []
+        follows = (self.source_ids[:-1] == self.source_ids[1:]) & ~self.breaks[1:]
+        width = max(len(self.commands), 1)
+        keys = self.command_ids[:-1][follows].astype(np.int64) * width + self.command_ids[1:][follows]
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        return list(zip((unique_keys // width).tolist(), (unique_keys % width).tolist(), counts.tolist()))
+
+    def directory_line_counts(self) -> List[Tuple[int, int, int]]:
+        """(cwd id, line id, count) for every entry with a known cwd."""
+        mask = self.cwd_ids != MISSING
+        if not mask.any():
+            return []
+        width = max(len(self.lines), 1)
+        keys = self.cwd_ids[mask].astype(np.int64) * width + self.line_ids[mask]
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        return list(zip((unique_keys // width).tolist(), (unique_keys % width).tolist(), counts.tolist()))
+
+    def tail_lines(self, count: int = 100) -> List[str]:
+        """The last `count` command lines, oldest first."""
+        return [self.lines[line_id] for line_id in self.line_ids[-count:].tolist()]
+
+    @staticmethod
+    def top_k(values: 'np.ndarray', k: int) -> 'np.ndarray':
+        """Indices of the k largest values, largest first."""
+        if k <= 0 or len(values) == 0:
+            return np.empty(0, dtype=np.int64)
+        if k < len(values):
+            candidates = np.argpartition(values, -k)[-k:]
+        else:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(values[candidates])[::-1]]
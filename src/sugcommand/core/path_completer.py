@@ -0,0 +1,253 @@
+"""
+Path Completer Module
+
+Completes file and directory arguments (`cat src/sug`, `cd ../pro`) from a
+cache of directory listings. Each listing is kept sorted, so a prefix is a
+binary search, and is validated with one stat() of the directory: it is
+re-read only when the directory's mtime changes. After a lookup, the
+matching subdirectories (where the user is likely to descend next) are
+listed ahead of time in the background, to a bounded depth.
+"""
+
+import bisect
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Subdirectories of a lookup that are prefetched
+PREFETCH_FANOUT = 8
+
+# Characters a shell would interpret inside an unquoted word
+SHELL_SPECIAL_CHARACTERS = frozenset(" \t\n'\"\\$`&|;<>()*?[]!#{}")
+
+
+def escape_path(text: str) -> str:
+    """Backslash-escape the characters of a path a shell would interpret."""
+    if not SHELL_SPECIAL_CHARACTERS.intersection(text):
+        return text
+    return ''.join('\\' + char if char in SHELL_SPECIAL_CHARACTERS else char for char in text)
+
+
+def unescape_path(text: str) -> str:
+    """Drop the backslash escapes of a typed path (the inverse of escape_path)."""
+    if '\\' not in text:
+        return text
+    return re.sub(r'\\(.?)', r'\1', text, flags=re.DOTALL)
+
+
+class DirectoryListing(NamedTuple):
+    """Sorted entries of one directory as of its modification time."""
+    mtime_ns: int
+    names: Tuple[str, ...]
+    is_dir: Tuple[bool, ...]
+
+
+class PathCompletion(NamedTuple):
+    """One completed path argument."""
+    # Argument text to put on the command line (directories end with '/')
+    text: str
+    is_dir: bool
+    # Absolute directory the entry was found in
+    directory: str
+
+
+class PathCompleter:
+    """Prefix completion of paths over an mtime-validated scandir cache."""
+
+    def __init__(self, max_directories: int = 2048, prefetch_depth: int = 1):
+        """
+        Initialize PathCompleter.
+
+        Args:
+            max_directories: Directory listings kept (least recently used are dropped)
+            prefetch_depth: Levels of matching subdirectories listed ahead (0 = off)
+        """
+        self.max_directories = max_directories
+        self.prefetch_depth = prefetch_depth
+        self._listings: 'OrderedDict[str, DirectoryListing]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._prefetching: Set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def list_directory(self, directory: str) -> Optional[DirectoryListing]:
+        """
+        Get the entries of a directory, re-reading it only if it changed.
+
+        Args:
+            directory: Absolute, normalized directory path
+
+        Returns:
+            DirectoryListing, or None if the directory cannot be read
+        """
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing.mtime_ns == mtime_ns:
+                self._listings.move_to_end(directory)
+                self.hits += 1
+                return listing
+            self.misses += 1
+
+        entries = []
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    entries.append((entry.name, is_dir))
+        except OSError as e:
+            logger.debug(f"Cannot list {directory}: {e}")
+            return None
+
+        entries.sort()
+        listing = DirectoryListing(
+            mtime_ns,
+            tuple(name for name, _ in entries),
+            tuple(is_dir for _, is_dir in entries)
+        )
+
+        with self._lock:
+            self._listings[directory] = listing
+            self._listings.move_to_end(directory)
+            while len(self._listings) > self.max_directories:
+                self._listings.popitem(last=False)
+        return listing
+
+    @staticmethod
+    def resolve(partial: str, cwd: Optional[str]) -> Tuple[str, str, str]:
+        """
+        Split a typed path into the directory to list and the name prefix.
+
+        Args:
+            partial: Path argument as typed (may start with ~ or be relative)
+            cwd: Directory relative paths are resolved against
+
+        Returns:
+            (typed directory part, absolute directory, name prefix)
+        """
+        typed_directory, _, prefix = partial.rpartition('/')
+        if partial.startswith('/') or typed_directory:
+            typed_directory += '/'
+        directory = os.path.expanduser(typed_directory) if typed_directory else ''
+        if not os.path.isabs(directory):
+            directory = os.path.join(cwd or os.getcwd(), directory)
+        return typed_directory, os.path.normpath(directory), prefix
+
+    def complete(self,
+                 partial: str,
+                 cwd: Optional[str],
+                 limit: int = 20,
+                 directories_only: bool = False) -> List[PathCompletion]:
+        """
+        Complete a path argument.
+
+        Args:
+            partial: Path argument as typed
+            cwd: Client's working directory, for relative paths
+            limit: Maximum number of completions
+            directories_only: Skip files (e.g. for cd)
+
+        Returns:
+            Completions in name order; hidden entries only for a '.' prefix
+        """
+        typed_directory, directory, prefix = self.resolve(partial, cwd)
+        listing = self.list_directory(directory)
+        if listing is None:
+            return []
+
+        names = listing.names
+        start = bisect.bisect_left(names, prefix)
+        show_hidden = prefix.startswith('.')
+        completions = []
+        subdirectories = []
+
+        for index in range(start, len(names)):
+            name = names[index]
+            if not name.startswith(prefix):
+                break
+            if name.startswith('.') and not show_hidden:
+                continue
+            is_dir = listing.is_dir[index]
+            if directories_only and not is_dir:
+                continue
+            if is_dir:
+                subdirectories.append(os.path.join(directory, name))
+            completions.append(PathCompletion(
+                typed_directory + name + ('/' if is_dir else ''),
+                is_dir,
+                directory
+            ))
+            if len(completions) >= limit:
+                break
+
+        if subdirectories and self.prefetch_depth > 0:
+            self.prefetch(subdirectories[:PREFETCH_FANOUT])
+
+        return completions
+
+    def prefetch(self, directories: List[str]) -> None:
+        """
+        List directories (and their subdirectories, to prefetch_depth levels)
+        in a background thread.
+
+        Args:
+            directories: Absolute directory paths
+        """
+        with self._lock:
+            pending = [directory for directory in directories
+                       if directory not in self._listings and directory not in self._prefetching]
+            if not pending:
+                return
+            self._prefetching.update(pending)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sugcommand-paths')
+        self._executor.submit(self._prefetch, pending)
+
+    def _prefetch(self, directories: List[str]) -> None:
+        """List directories breadth first, to the prefetch depth."""
+        level = directories
+        try:
+            for depth in range(self.prefetch_depth):
+                next_level = []
+                for directory in level:
+                    listing = self.list_directory(directory)
+                    if listing is None or depth + 1 >= self.prefetch_depth:
+                        continue
+                    next_level.extend(
+                        os.path.join(directory, name)
+                        for name, is_dir in zip(listing.names, listing.is_dir)
+                        if is_dir and not name.startswith('.')
+                    )
+                level = next_level[:PREFETCH_FANOUT]
+        except Exception as e:
+            logger.debug(f"Path prefetch failed: {e}")
+        finally:
+            with self._lock:
+                self._prefetching.difference_update(directories)
+
+    def clear(self) -> None:
+        """Drop all cached listings."""
+        with self._lock:
+            self._listings.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            'directories_cached': len(self._listings),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,84 @@
+"""
+Pipe Model Module
+
+Learns what users pipe each command into (`ps aux | grep`, `sort | uniq -c`)
+and precomputes a ranked table per command, so suggesting the next pipeline
+stage is a single dictionary lookup.
+"""
+
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+import logging
+
+from .shared_counters import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+
+class PipeTransitionModel:
+    """Transition tables from a command to the pipeline stages that follow it."""
+
+    def __init__(self, table_size: int = 10):
+        """
+        Initialize PipeTransitionModel.
+
+        Args:
+            table_size: Number of next stages kept per command
+        """
+        self.table_size = table_size
+        # Counters are shared with copies until either side changes them
+        self._counts: Dict[str, Counter] = SharedCounters()
+        self._tables: Dict[str, List[Tuple[str, float]]] = {}
+        self._dirty: Set[str] = set()
+
+    def copy(self) -> 'PipeTransitionModel':
+        """Get a copy that can learn more pipes without changing this model."""
+        clone = PipeTransitionModel(self.table_size)
+        clone._counts = self._counts.share()
+        clone._tables = dict(self._tables)
+        clone._dirty = set(self._dirty)
+        return clone
+
+    def add(self, command: str, next_stage: str, count: int = 1) -> None:
+        """
+        Record that a command's output was piped into a stage.
+
+        Args:
+            command: Base command of the producing stage
+            next_stage: Consuming stage with its arguments (e.g. `grep -v foo`)
+            count: Number of times the pipe was seen
+        """
+        self._counts.writable(command)[next_stage] += count
+        self._dirty.add(command)
+
+    def build_tables(self) -> None:
+        """Precompute ranked tables for every command changed since the last build."""
+        for command in self._dirty:
+            counter = self._counts[command]
+            total = sum(counter.values())
+            self._tables[command] = [
+                (stage, count / total)
+                for stage, count in counter.most_common(self.table_size)
+            ]
+        self._dirty.clear()
+
+    def lookup(self, command: str) -> List[Tuple[str, float]]:
+        """
+        Get the stages most often piped after a command.
+
+        Args:
+            command: Base command of the previous stage
+
+        Returns:
+            List of (next_stage, probability) tuples, most likely first
+        """
+        return self._tables.get(command, [])
+
+    def clear(self) -> None:
+        """Drop all learned counts and tables."""
+        self._counts.clear()
+        self._tables.clear()
+        self._dirty.clear()
+
+    def __len__(self) -> int:
+        return len(self._counts)
@@ -0,0 +1,210 @@
+"""
+Ranking Module
+
+Scores merged suggestions as a candidate × feature matrix: one row per
+distinct suggestion (keyed by its full command line), one column per source.
+The sources already are the ranking features (command-name match, history
+frequency, frecency, sequence probability, cwd affinity, ...), each reporting
+one confidence per candidate, so a column holds what that source said and
+the final score is a single weighted matrix-vector product. The top k rows
+are taken with argpartition.
+
+With NumPy the matrix is one preallocated array, grown by blocks and filled
+in place a source at a time; without it the same product and ordering are
+computed in Python.
+"""
+
+import heapq
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import logging
+
+from .history_store import NUMPY_AVAILABLE, np
+
+logger = logging.getLogger(__name__)
+
+# Rows the NumPy matrix starts with (it doubles when full)
+ROW_BLOCK = 64
+
+# Fewer rows than this are written into the NumPy matrix one at a time;
+# converting the index lists costs more than it saves
+FANCY_INDEX_MIN_ROWS = 16
+
+# Scores are rounded to this many units per 1.0 so that sums differing only in
+# floating-point rounding (BLAS vs. Python order) tie, and tie order is the same
+# with and without NumPy
+SCORE_RESOLUTION = 1e12
+
+
+class CandidateMatrix:
+    """Distinct suggestions (rows) by source features (columns)."""
+
+    def __init__(self, features: Sequence[str], weights: Mapping[str, float]):
+        """
+        Initialize CandidateMatrix.
+
+        Args:
+            features: Feature (source) names, one column each
+            weights: Weight per feature; missing features weigh 1.0
+        """
+        self.features = tuple(features)
+        self.weights = [float(weights.get(name, 1.0)) for name in self.features]
+        self._columns = {name: index for index, name in enumerate(self.features)}
+        self._rows: Dict[str, int] = {}
+        self._vectorized = NUMPY_AVAILABLE
+        if self._vectorized:
+            self._values = np.zeros((ROW_BLOCK, len(self.features)))
+            self._weight_vector = np.asarray(self.weights)
+        else:
+            self._values = []
+        # Per row: highest-confidence suggestion, contributing sources, suggestion count
+        self._best: List[Any] = []
+        self._sources: List[List[str]] = []
+        self._counts: List[int] = []
+        # scores() of the current values, until the next add()
+        self._scores: Optional[Sequence[float]] = None
+
+    def weight(self, feature: str) -> float:
+        """Get the weight of a feature."""
+        return self.weights[self._columns[feature]]
+
+    def _new_row(self, key: str, suggestion: Any) -> int:
+        """Add an all-zero row for a candidate not seen before."""
+        row = len(self._best)
+        self._rows[key] = row
+        self._best.append(suggestion)
+        self._sources.append([suggestion.source])
+        self._counts.append(0)
+        if not self._vectorized:
+            self._values.append([0.0] * len(self.features))
+        elif row == len(self._values):
+            grown = np.zeros((2 * row, len(self.features)))
+            grown[:row] = self._values
+            self._values = grown
+        return row
+
+    def add(self, feature: str, suggestions: Sequence[Any]) -> None:
+        """
+        Add one source's suggestions as values of its feature column.
+
+        Args:
+            feature: Name of the source
+            suggestions: Its SuggestionResults
+        """
+        column = self._columns[feature]
+        # Row -> this source's total for it (a source may repeat a candidate)
+        added: Dict[int, float] = {}
+
+        for suggestion in suggestions:
+            key = suggestion.full_command or suggestion.command
+            row = self._rows.get(key)
+            if row is None:
+                row = self._new_row(key, suggestion)
+            else:
+                if suggestion.confidence > self._best[row].confidence:
+                    self._best[row] = suggestion
+                if suggestion.source not in self._sources[row]:
+                    self._sources[row].append(suggestion.source)
+            self._counts[row] += 1
+            added[row] = added.get(row, 0.0) + suggestion.confidence
+
+        if not added:
+            return
+        if self._vectorized and len(added) >= FANCY_INDEX_MIN_ROWS:
+            self._values[list(added), column] += list(added.values())
+        elif self._vectorized:
+            values = self._values
+            for row, confidence in added.items():
+                values[row, column] += confidence
+        else:
+            for row, confidence in added.items():
+                self._values[row][column] += confidence
+        self._scores = None
+
+    def boundary_scores(self, k: int) -> Tuple[float, float]:
+        """
+        Get the k-th best score and the best score below it.
+
+        Missing ranks count as 0, so the second value also bounds candidates
+        that are not in the matrix yet.
+        """
+        scores = self.scores()
+        if k <= 0 or not len(scores):
+            return 0.0, 0.0
+        if isinstance(scores, list):
+            best = heapq.nlargest(k + 1, scores)
+        elif len(scores) > k + 1:
+            best = -np.sort(-np.partition(scores, len(scores) - k - 1)[-(k + 1):])
+        else:
+            best = -np.sort(-scores)
+        kth = float(best[k - 1]) if len(best) >= k else 0.0
+        below = float(best[k]) if len(best) > k else 0.0
+        return kth, below
+
+    def scores(self) -> Sequence[float]:
+        """Get every candidate's score: the weighted sum of its features, capped at 1."""
+        if self._scores is None:
+            if self._vectorized:
+                totals = self._values[:len(self._best)] @ self._weight_vector
+                self._scores = np.minimum(np.rint(totals * SCORE_RESOLUTION) / SCORE_RESOLUTION, 1.0)
+            else:
+                weights = self.weights
+                self._scores = [
+                    min(round(sum(value * weight for value, weight in zip(row, weights) if value)
+                              * SCORE_RESOLUTION) / SCORE_RESOLUTION, 1.0)
+                    for row in self._values
+                ]
+        return self._scores
+
+    def top_rows(self, k: int, scores: Optional[Sequence[float]] = None) -> List[int]:
+        """
+        Get the rows of the k best candidates, best first.
+
+        Ties keep insertion order (the order sources produced the candidates).
+
+        Args:
+            k: Number of rows
+            scores: Output of scores(), if already computed
+        """
+        if scores is None:
+            scores = self.scores()
+        n = len(scores)
+        if k <= 0 or n == 0:
+            return []
+
+        if not isinstance(scores, list):
+            if k < n:
+                kth = np.partition(scores, n - k)[n - k]
+                above = np.flatnonzero(scores > kth)
+                ties = np.flatnonzero(scores == kth)[:k - len(above)]
+                chosen = np.concatenate((above, ties))
+            else:
+                chosen = np.arange(n)
+            return chosen[np.lexsort((chosen, -scores[chosen]))].tolist()
+
+        return sorted(range(n), key=lambda row: -scores[row])[:k]
+
+    def top_k(self, k: int) -> List[Any]:
+        """
+        Get the k best candidates as merged suggestions.
+
+        Args:
+            k: Number of suggestions
+
+        Returns:
+            Suggestions, best first; a candidate found by one source with an
+            unchanged score is returned as is, others are copies of their
+            best suggestion with the merged score and sources
+        """
+        scores = self.scores()
+        ranked = []
+        for row in self.top_rows(k, scores):
+            best = self._best[row]
+            score = float(scores[row])
+            if self._counts[row] == 1 and score == best.confidence:
+                ranked.append(best)
+                continue
+            ranked.append(best._replace(confidence=score, source="+".join(self._sources[row])))
+        return ranked
+
+    def __len__(self) -> int:
+        return len(self._best)
@@ -0,0 +1,78 @@
+"""
+Result Cache Module
+
+Bounded, thread-safe LRU cache for finished suggestion lists. Keys carry the
+generation numbers of the data they were computed from, so a new scan,
+history snapshot or configuration change makes old entries unreachable; a
+short max age bounds how long a hit can hide an expired underlying cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a per-entry maximum age."""
+
+    def __init__(self, max_size: int = 512, max_age: float = 60.0):
+        """
+        Initialize ResultCache.
+
+        Args:
+            max_size: Maximum number of cached results
+            max_age: Seconds a result may be served for
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached result and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss or an expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a result, evicting the least recently used one when full.
+
+        Args:
+            key: Cache key
+            value: Result to cache
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,53 @@
+"""
+Shared Counters Module
+
+Copy-on-write dictionary of counters for the history models. Copying a model
+for a live update copies only this dictionary; the counters stay shared and
+are copied one at a time, the first time either side changes them.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Hashable, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCounters(dict):
+    """Dictionary of counters whose copies share every counter until it changes."""
+
+    __slots__ = ('_owned',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Keys whose counter this dictionary may change in place; None = all
+        self._owned: Optional[Set[Hashable]] = None
+
+    def share(self) -> 'SharedCounters':
+        """Get a copy sharing every counter; neither side changes a shared one in place."""
+        clone = SharedCounters(self)
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def writable(self, key: Hashable, factory: Callable[[], Any] = Counter) -> Any:
+        """
+        Get the counter of a key to change in place, copying it first if it is shared.
+
+        Args:
+            key: Key of the counter
+            factory: Makes the counter of a new key
+        """
+        counter = self.get(key)
+        if counter is None:
+            counter = self[key] = factory()
+        elif self._owned is not None and key not in self._owned:
+            counter = self[key] = counter.copy()
+        if self._owned is not None:
+            self._owned.add(key)
+        return counter
+
+    def clear(self) -> None:
+        """Drop every counter; later ones are not shared with anything."""
+        super().clear()
+        self._owned = None
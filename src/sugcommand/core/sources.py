@@ -0,0 +1,181 @@
+"""
+Suggestion Sources Module
+
+Registry of the sources the suggestion engine draws from. Each source declares
+an estimated cost and the highest confidence it can produce, so the engine can
+run cheap sources first and skip expensive ones once no other candidate could
+reach the top suggestions, even with the most every remaining source could add
+(threshold-algorithm style early termination).
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+from .config_manager import ConfigSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Sources estimated cheaper than this (microseconds) run inline in the request
+# thread; handing them to a worker would cost more than running them
+INLINE_SOURCE_COST = 500.0
+
+
+class QueryContext:
+    """Per-query state handed to every source."""
+
+    def __init__(self,
+                 input_text: str,
+                 config: ConfigSnapshot,
+                 cwd: Optional[str] = None,
+                 command_pool: Optional[Sequence[str]] = None,
+                 history: Optional[Any] = None):
+        """
+        Initialize QueryContext.
+
+        Args:
+            input_text: Normalized command line input
+            config: Configuration snapshot the whole query uses
+            cwd: Working directory of the client
+            command_pool: Commands to search instead of the whole scanned index
+            history: HistorySnapshot the whole query reads (None = no history analysis)
+        """
+        self.input_text = input_text
+        self.config = config
+        self.cwd = cwd
+        self.command_pool = command_pool
+        self.history = history
+        # Set by the command source: every command the input matched
+        self.matched: Optional[Tuple[str, ...]] = None
+
+
+class SuggestionSource:
+    """A named producer of suggestions with its cost model."""
+
+    def __init__(self,
+                 name: str,
+                 fetch: Callable[[QueryContext], List[Any]],
+                 cost: float,
+                 max_confidence: float = 1.0,
+                 bound: Optional[Callable[[QueryContext], float]] = None,
+                 volatile: bool = False):
+        """
+        Initialize SuggestionSource.
+
+        Args:
+            name: Source name used in reports and statistics
+            fetch: Callable returning the source's suggestions for a query
+            cost: Estimated run time in microseconds
+            max_confidence: Highest confidence any of its suggestions can have
+            bound: Optional tighter maximum for one query; 0 means the source
+                cannot contribute and is skipped
+            volatile: Its answers follow live state (e.g. the filesystem) rather
+                than the indexed data, so results it contributed to are not cached
+        """
+        self.name = name
+        self.fetch = fetch
+        self.cost = cost
+        self.max_confidence = max_confidence
+        self.bound = bound
+        self.volatile = volatile
+        self.runs = 0
+        self.hits = 0
+        self.skips = 0
+        self.late = 0
+        self.total_time_ms = 0.0
+
+    def upper_bound(self, context: QueryContext) -> float:
+        """Get the highest confidence this source can produce for a query."""
+        if self.bound is None:
+            return self.max_confidence
+        return min(self.max_confidence, self.bound(context))
+
+    def __repr__(self) -> str:
+        return f"SuggestionSource(name={self.name}, cost={self.cost}, max_confidence={self.max_confidence})"
+
+
+class SourceRegistry:
+    """Ordered collection of suggestion sources with per-source counters."""
+
+    def __init__(self):
+        self._sources: Dict[str, SuggestionSource] = {}
+        self._ordered: Tuple[SuggestionSource, ...] = ()
+        self._lock = threading.Lock()
+
+    def register(self, source: SuggestionSource) -> None:
+        """
+        Add a source, replacing any source with the same name.
+
+        Args:
+            source: Source to add
+        """
+        with self._lock:
+            self._sources[source.name] = source
+            self._ordered = tuple(sorted(self._sources.values(), key=lambda s: s.cost))
+        logger.debug(f"Registered suggestion source {source.name}")
+
+    def unregister(self, name: str) -> bool:
+        """
+        Remove a source.
+
+        Args:
+            name: Name of the source
+
+        Returns:
+            True if the source was registered
+        """
+        with self._lock:
+            if self._sources.pop(name, None) is None:
+                return False
+            self._ordered = tuple(sorted(self._sources.values(), key=lambda s: s.cost))
+        return True
+
+    def get(self, name: str) -> Optional[SuggestionSource]:
+        """Get a source by name."""
+        return self._sources.get(name)
+
+    def ordered(self) -> Tuple[SuggestionSource, ...]:
+        """Get the sources, cheapest first."""
+        return self._ordered
+
+    def record(self, source: SuggestionSource, status: str, suggestions: int = 0, time_ms: float = 0.0) -> None:
+        """
+        Count one query's outcome for a source.
+
+        Args:
+            source: The source
+            status: 'ok', 'late', 'error' or 'skipped'
+            suggestions: Number of suggestions it produced
+            time_ms: Run time in milliseconds
+        """
+        with self._lock:
+            if status == 'skipped':
+                source.skips += 1
+                return
+            source.runs += 1
+            source.total_time_ms += time_ms
+            if status == 'late':
+                source.late += 1
+            elif suggestions:
+                source.hits += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get cost model and hit/skip counters per source, cheapest first."""
+        return {
+            source.name: {
+                'cost_us': source.cost,
+                'max_confidence': source.max_confidence,
+                'runs': source.runs,
+                'hits': source.hits,
+                'skips': source.skips,
+                'late': source.late,
+                'avg_time_ms': source.total_time_ms / source.runs if source.runs else 0.0,
+            }
+            for source in self._ordered
+        }
+
+    def __iter__(self) -> Iterator[SuggestionSource]:
+        return iter(self._ordered)
+
+    def __len__(self) -> int:
+        return len(self._ordered)
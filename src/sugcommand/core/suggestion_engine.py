@@ -5,31 +5,210 @@ Main engine that combines command scanning, history analysis, and user preferenc
 to provide intelligent command suggestions.
 """
 
+import asyncio
+import os
+import threading
 import time
-from typing import Dict, List, Set, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Set, Optional, Sequence, Tuple, Any
 import logging
 
 from .command_scanner import CommandScanner
-from .history_analyzer import HistoryAnalyzer
-from .config_manager import ConfigManager
+from .history_analyzer import HistoryAnalyzer, HistoryEntry, HistorySnapshot
+from .path_completer import PathCompleter, escape_path, unescape_path
+from .config_manager import ConfigManager, ConfigSnapshot
+from .ranking import CandidateMatrix
+from .result_cache import ResultCache
+from .sources import INLINE_SOURCE_COST, QueryContext, SourceRegistry, SuggestionSource
+from .tokenizer import CommandSegment, PIPE_OPERATORS, parse_command_line
+from ..utils.performance import (
+    increment_cache_hits, increment_cache_misses,
+    increment_suggestion_requests, record_batch_throughput, record_suggestion_time
+)
 
 logger = logging.getLogger(__name__)
 
+# Worker threads shared by all engines for running sources concurrently
+SOURCE_WORKERS = 8
+
+# Commands whose arguments are completed with directories only
+DIRECTORY_COMMANDS = frozenset({'cd', 'pushd', 'rmdir'})
+# Path completion confidence: bare names compete with subcommands and other
+# arguments, typed paths (with '/', '.', '~') almost certainly want a path;
+# listings (nothing typed yet) and names history knows as arguments rank last
+PATH_CONFIDENCE = 0.3
+EXPLICIT_PATH_CONFIDENCE = 0.6
+UNIQUE_PATH_BONUS = 0.3
+DIRECTORY_LISTING_CONFIDENCE = 0.15
+
+_source_executor: Optional[ThreadPoolExecutor] = None
+_source_executor_lock = threading.Lock()
+
+
+def _get_source_executor() -> ThreadPoolExecutor:
+    """Get the process-wide executor that suggestion sources run on."""
+    global _source_executor
+    with _source_executor_lock:
+        if _source_executor is None:
+            _source_executor = ThreadPoolExecutor(
+                max_workers=SOURCE_WORKERS, thread_name_prefix="sugcommand-source"
+            )
+        return _source_executor
+
+
+def _timed(source: Callable[[], List['SuggestionResult']]) -> Tuple[List['SuggestionResult'], float]:
+    """Run a source and return its suggestions with its run time in seconds."""
+    start = time.perf_counter()
+    suggestions = source()
+    return suggestions, time.perf_counter() - start
+
+
+async def _aiterate(updates: Iterator[Any]) -> AsyncIterator[Any]:
+    """Step a blocking iterator in the loop's default executor, one item at a time."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            update = await loop.run_in_executor(None, next, updates, done)
+            if update is done:
+                return
+            yield update
+    finally:
+        close = getattr(updates, 'close', None)
+        if close is not None:
+            close()
+
+
+class SourceReport(NamedTuple):
+    """How one suggestion source fared in a query."""
+    time_ms: float
+    suggestions: int
+    # 'ok', 'late' (missed the deadline, dropped), 'error' or 'skipped'
+    # (could not beat the suggestions already found)
+    status: str
+
+
+class QueryResult(NamedTuple):
+    """Ranked suggestions with per-source timing."""
+    suggestions: List['SuggestionResult']
+    sources: Dict[str, SourceReport]
+    cached: bool = False
+    # Every command the input matched, for narrowing the next keystroke
+    matched: Optional[Tuple[str, ...]] = None
+
+
+class SuggestionUpdate(NamedTuple):
+    """Provisional (or final) ranking of a streamed query."""
+    suggestions: List['SuggestionResult']
+    # Source whose answer changed the ranking; None for the final update
+    source: Optional[str]
+    final: bool
+    # Seconds since the query started
+    elapsed: float
+    # The complete answer, on the final update only
+    result: Optional[QueryResult] = None
+
+
+class PreparedQuery(NamedTuple):
+    """What every source of a query (or a batch of queries) reads."""
+    config: ConfigSnapshot
+    # (scanner, history, config) generations, part of the result cache key
+    generation: Tuple[int, int, int]
+    history: Optional[HistorySnapshot]
+
+
+class BatchResult(NamedTuple):
+    """Answers to a batch of inputs, in input order, with the batch's throughput."""
+    suggestions: List[List['SuggestionResult']]
+    elapsed: float
+    
+    @property
+    def qps(self) -> float:
+        """Queries answered per second."""
+        return len(self.suggestions) / self.elapsed if self.elapsed > 0 else 0.0
+
 
 class SuggestionResult:
-    """Represents a single command suggestion."""
+    """
+    Represents a single command suggestion.
+    
+    Most candidates are dropped during ranking, so results are slotted and
+    keep their description as a shared template and one detail value,
+    formatted only when read. The dictionary sent to clients is built once
+    and reused, e.g. for results served from the result cache.
+    """
+    
+    __slots__ = ('command', 'confidence', 'source', 'full_command',
+                 '_description', '_template', '_detail', '_wire')
     
     def __init__(self, 
                  command: str, 
                  confidence: float, 
                  source: str, 
                  description: str = "",
-                 full_command: str = ""):
+                 full_command: str = "",
+                 template: Optional[str] = None,
+                 detail: Any = None):
+        """
+        Initialize SuggestionResult.
+        
+        Args:
+            command: Suggested command
+            confidence: Score between 0 and 1
+            source: Name of the source(s) that produced it
+            description: Ready-made description
+            full_command: Complete command line (defaults to the command)
+            template: Format string of the description, used when no description is given
+            detail: Value filled into the template
+        """
         self.command = command
         self.confidence = confidence
         self.source = source
-        self.description = description
         self.full_command = full_command or command
+        self._description = description if description or template is None else None
+        self._template = template
+        self._detail = detail
+        self._wire: Optional[Dict[str, Any]] = None
+    
+    @property
+    def description(self) -> str:
+        """Human-readable explanation, formatted on first use."""
+        if self._description is None:
+            self._description = self._template.format(self._detail)
+        return self._description
+    
+    def _replace(self, **changes: Any) -> 'SuggestionResult':
+        """Get a copy with some fields changed, keeping the description unformatted."""
+        result = SuggestionResult.__new__(SuggestionResult)
+        result.command = changes.pop('command', self.command)
+        result.confidence = changes.pop('confidence', self.confidence)
+        result.source = changes.pop('source', self.source)
+        result.full_command = changes.pop('full_command', self.full_command)
+        result._description = self._description
+        result._template = self._template
+        result._detail = self._detail
+        result._wire = None
+        if changes:
+            raise ValueError(f"Unknown SuggestionResult fields: {', '.join(changes)}")
+        return result
+    
+    def to_wire(self) -> Dict[str, Any]:
+        """
+        Get the result as sent to clients.
+        
+        Returns:
+            Dictionary with command, full_command, confidence, source and
+            description; cached, so callers must not modify it
+        """
+        if self._wire is None:
+            self._wire = {
+                'command': self.command,
+                'full_command': self.full_command,
+                'confidence': self.confidence,
+                'source': self.source,
+                'description': self.description,
+            }
+        return self._wire
         
     def __repr__(self) -> str:
         return f"SuggestionResult(command={self.command}, confidence={self.confidence:.2f}, source={self.source})"
@@ -52,20 +231,133 @@ class SuggestionEngine:
         history_cache_duration = self.config.get_history_cache_duration()
         
         self.command_scanner = CommandScanner(cache_duration) if self.config.is_command_scan_enabled() else None
-        self.history_analyzer = HistoryAnalyzer(history_cache_duration) if self.config.is_history_analysis_enabled() else None
+        self.history_analyzer = HistoryAnalyzer(
+            history_cache_duration,
+            self.config.get_frecency_half_life(),
+            self.config.get_history_sources(),
+            self.config.get('history_ingest_workers', 0),
+            self.config.get_sequence_line_capacity(),
+            self.config.get('columnar_history_enabled', True),
+            self.config.get('history_parallel_ingest_bytes', 8 * 1024 * 1024),
+            self.config.get('history_live_publish_interval', 1.0)
+        ) if self.config.is_history_analysis_enabled() else None
+        self.path_completer = PathCompleter(
+            self.config.get('path_cache_size', 2048),
+            self.config.get('path_prefetch_depth', 1)
+        ) if self.config.get('path_completion_enabled', True) else None
+        
+        self._result_cache = ResultCache(
+            self.config.get('result_cache_size', 512),
+            self.config.get('result_cache_ttl', 60)
+        )
+        
+        self.sources = SourceRegistry()
+        self._register_builtin_sources()
         
         logger.info("SuggestionEngine initialized")
     
+    def _register_builtin_sources(self) -> None:
+        """Register the built-in sources with their estimated cost (microseconds)."""
+        builtin = [
+            SuggestionSource('command_scanner', self._command_source, 1500.0,
+                             bound=self._command_source_bound),
+            SuggestionSource('history',
+                             lambda context: self._get_history_suggestions(context.input_text, context.config,
+                                                                           context.history),
+                             100.0),
+            SuggestionSource('arguments',
+                             lambda context: self._get_argument_suggestions(context.input_text, context.config,
+                                                                            context.history),
+                             30.0),
+            SuggestionSource('flags',
+                             lambda context: self._get_flag_suggestions(context.input_text, context.config,
+                                                                        context.history),
+                             10.0),
+            SuggestionSource('pipe',
+                             lambda context: self._get_pipe_suggestions(context.input_text, context.config,
+                                                                        context.history),
+                             10.0),
+            SuggestionSource('frecency',
+                             lambda context: self._get_frecency_suggestions(context.input_text, context.config,
+                                                                            context.history),
+                             60.0),
+            SuggestionSource('sequential',
+                             lambda context: self._get_sequential_suggestions(context.input_text, context.config,
+                                                                              context.history),
+                             40.0, bound=lambda context: context.config.sequential_weight),
+            SuggestionSource('directory',
+                             lambda context: self._get_directory_suggestions(context.input_text, context.cwd,
+                                                                             context.config, context.history),
+                             10.0),
+            # Cheap on a cached listing, but a miss stats and lists a directory
+            # that may be large or remote, so it runs under the deadline
+            SuggestionSource('path',
+                             lambda context: self._get_path_suggestions(context.input_text, context.cwd,
+                                                                        context.config, context.history),
+                             INLINE_SOURCE_COST, bound=self._path_source_bound, volatile=True),
+        ]
+        for source in builtin:
+            self.sources.register(source)
+    
+    @staticmethod
+    def _normalize_input(input_text: str) -> str:
+        """Drop leading whitespace and collapse trailing whitespace to one space."""
+        normalized = input_text.lstrip()
+        if normalized and normalized[-1].isspace():
+            normalized = normalized.rstrip() + " "
+        return normalized
+    
+    def get_data_generation(self, config: Optional[ConfigSnapshot] = None) -> Tuple[int, int, int]:
+        """Get the (scanner, history, config) generations the suggestions depend on."""
+        return (
+            self.command_scanner.generation if self.command_scanner else 0,
+            self.history_analyzer.generation if self.history_analyzer else 0,
+            config.generation if config is not None else self.config.generation,
+        )
+    
     def _normalize_confidence(self, confidence: float, max_confidence: float = 1.0) -> float:
         """Normalize confidence score to 0-1 range."""
         return min(confidence / max_confidence, 1.0) if max_confidence > 0 else 0.0
     
-    def _should_exclude_command(self, command: str) -> bool:
-        """Check if command should be excluded from suggestions."""
-        excluded = self.config.get_excluded_commands()
-        return command in excluded
+    @staticmethod
+    def _split_current_segment(input_text: str) -> Optional[Tuple[CommandSegment, Tuple[str, ...], str]]:
+        """
+        Find the pipeline segment being edited and split it at the cursor.
+        
+        Returns:
+            (segment, completed_tokens, partial_token), or None while a
+            redirection target is being typed
+        """
+        segment = parse_command_line(input_text).current
+        if segment is None:
+            return None
+        
+        tokens = segment.tokens
+        # A trailing space means the last token is complete, unless it is
+        # escaped or quoted and so part of that token
+        if input_text[-1].isspace() and not (tokens and input_text.endswith(tokens[-1])):
+            return segment, tokens, ""
+        if not tokens or not input_text.endswith(tokens[-1]):
+            return None
+        return segment, tokens[:-1], tokens[-1]
+    
+    def _match_commands(self,
+                        input_text: str,
+                        candidates: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """Get every scanned command matching the input, optionally searching only `candidates`."""
+        if not self.command_scanner or not input_text.strip():
+            return []
+        
+        try:
+            return self.command_scanner.match_commands(input_text.strip(), candidates)
+        except Exception as e:
+            logger.warning(f"Error matching commands: {e}")
+            return []
     
-    def _get_command_suggestions(self, input_text: str) -> List[SuggestionResult]:
+    def _get_command_suggestions(self,
+                                 input_text: str,
+                                 config: ConfigSnapshot,
+                                 matches: Optional[List[Tuple[str, float]]] = None) -> List[SuggestionResult]:
         """Get command suggestions based on available commands."""
         suggestions = []
         
@@ -73,24 +365,28 @@ class SuggestionEngine:
             return suggestions
         
         try:
-            # Search for matching commands
-            matches = self.command_scanner.search_commands(input_text.strip(), limit=20)
+            if matches is None:
+                matches = self._match_commands(input_text)
+            
+            # Best 20 matches, index order breaking ties like search_commands()
+            matches = sorted(matches, key=lambda x: x[1], reverse=True)[:20]
             
             for command, score in matches:
-                if self._should_exclude_command(command):
+                if command in config.excluded_commands:
                     continue
                 
                 confidence = self._normalize_confidence(score, 100.0)
                 
                 # Skip low confidence matches
-                if confidence < self.config.get_min_confidence_threshold():
+                if confidence < config.min_confidence:
                     continue
                 
                 suggestion = SuggestionResult(
                     command=command,
                     confidence=confidence,
                     source="command_scanner",
-                    description=f"Available command: {command}"
+                    template="Available command: {0}",
+                    detail=command
                 )
                 suggestions.append(suggestion)
                 
@@ -99,7 +395,22 @@ class SuggestionEngine:
         
         return suggestions
     
-    def _get_history_suggestions(self, input_text: str) -> List[SuggestionResult]:
+    def _command_source(self, context: QueryContext) -> List[SuggestionResult]:
+        """Command scanner source; records the full match set for incremental sessions."""
+        matches = self._match_commands(context.input_text, context.command_pool)
+        context.matched = tuple(command for command, _ in matches)
+        return self._get_command_suggestions(context.input_text, context.config, matches)
+    
+    def _command_source_bound(self, context: QueryContext) -> float:
+        """Highest confidence the command scanner can give this input."""
+        if not self.command_scanner:
+            return 0.0
+        return self.command_scanner.max_match_score(context.input_text.strip()) / 100.0
+    
+    def _get_history_suggestions(self,
+                                 input_text: str,
+                                 config: ConfigSnapshot,
+                                 history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
         """Get suggestions based on command history."""
         suggestions = []
         
@@ -110,19 +421,24 @@ class SuggestionEngine:
             # Get context-aware suggestions from history
             history_suggestions = self.history_analyzer.get_context_suggestions(
                 input_text.strip(), 
-                limit=15
+                limit=15,
+                exact_weight=config.history_exact_weight,
+                partial_weight=config.history_partial_weight,
+                sequence_weight=config.history_sequence_weight,
+                snapshot=history
             )
             
             for cmd_line, confidence, source in history_suggestions:
-                if self._should_exclude_command(cmd_line.split()[0] if cmd_line.split() else ""):
+                command = parse_command_line(cmd_line).command or cmd_line
+                if command in config.excluded_commands:
                     continue
                 
                 # Skip low confidence matches
-                if confidence < self.config.get_min_confidence_threshold():
+                if confidence < config.min_confidence:
                     continue
                 
                 suggestion = SuggestionResult(
-                    command=cmd_line.split()[0] if cmd_line.split() else cmd_line,
+                    command=command,
                     confidence=confidence,
                     source=f"history_{source}",
                     description="From command history",
@@ -135,57 +451,170 @@ class SuggestionEngine:
         
         return suggestions
     
-    def _get_frequent_command_suggestions(self, input_text: str) -> List[SuggestionResult]:
-        """Get suggestions based on frequently used commands."""
+    def _get_argument_suggestions(self,
+                                  input_text: str,
+                                  config: ConfigSnapshot,
+                                  history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """Get next-token suggestions (subcommands, arguments) for the command being typed."""
         suggestions = []
         
-        if not self.history_analyzer:
+        if not self.history_analyzer or not input_text.strip():
             return suggestions
         
         try:
-            input_lower = input_text.lower().strip()
-            if not input_lower:
+            current = self._split_current_segment(input_text)
+            if current is None:
+                return suggestions
+            
+            _, completed, partial = current
+            if not completed:
+                return suggestions
+            
+            if completed[0] in config.excluded_commands:
                 return suggestions
             
-            # Get frequent commands
-            frequent_commands = self.history_analyzer.get_frequent_commands(30)
+            line_prefix = input_text[:len(input_text) - len(partial)]
+            weight = config.argument_weight
+            after = " ".join(completed)
             
-            for command, frequency in frequent_commands:
-                if self._should_exclude_command(command):
+            for token, probability in self.history_analyzer.get_next_token_suggestions(completed, snapshot=history):
+                if not token.startswith(partial) or token == partial:
                     continue
                 
-                command_lower = command.lower()
+                confidence = min(probability * weight, 1.0)
+                if confidence < config.min_confidence:
+                    continue
                 
-                # Check if command matches input
-                score = 0.0
-                if command_lower == input_lower:
-                    score = 1.0
-                elif command_lower.startswith(input_lower):
-                    score = 0.8
-                elif input_lower in command_lower:
-                    score = 0.6
+                suggestion = SuggestionResult(
+                    command=token,
+                    confidence=confidence,
+                    source="arguments",
+                    template="Often used after '{0}'",
+                    detail=after,
+                    full_command=line_prefix + token
+                )
+                suggestions.append(suggestion)
                 
-                if score > 0:
-                    # Weight by frequency and recent commands weight
-                    weight = self.config.get('frequent_commands_weight', 1.2)
-                    confidence = score * min(frequency / 100.0, 1.0) * weight
-                    
-                    if confidence >= self.config.get_min_confidence_threshold():
-                        suggestion = SuggestionResult(
-                            command=command,
-                            confidence=confidence,
-                            source="frequent_commands",
-                            description=f"Frequently used ({frequency} times)"
-                        )
-                        suggestions.append(suggestion)
-                        
         except Exception as e:
-            logger.warning(f"Error getting frequent command suggestions: {e}")
+            logger.warning(f"Error getting argument suggestions: {e}")
         
         return suggestions
     
-    def _get_recent_command_suggestions(self, input_text: str) -> List[SuggestionResult]:
-        """Get suggestions based on recently used commands."""
+    def _get_flag_suggestions(self,
+                              input_text: str,
+                              config: ConfigSnapshot,
+                              history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """Get suggestions that complete a habitual flag set from the flags already typed."""
+        suggestions = []
+        
+        if not self.history_analyzer or not input_text.strip():
+            return suggestions
+        
+        try:
+            current = self._split_current_segment(input_text)
+            if current is None:
+                return suggestions
+            
+            _, completed, partial = current
+            
+            # Only complete flags at a fresh token or while typing a flag
+            if len(completed) < 2 or (partial and not partial.startswith('-')):
+                return suggestions
+            
+            if completed[0] in config.excluded_commands:
+                return suggestions
+            
+            line_prefix = input_text[:len(input_text) - len(partial)]
+            weight = config.flag_weight
+            
+            for missing_flags, confidence in self.history_analyzer.get_flag_completions(completed, snapshot=history):
+                flags = list(missing_flags)
+                if partial:
+                    matching = [flag for flag in flags if flag.startswith(partial)]
+                    if not matching:
+                        continue
+                    # Put the flag being typed first so the completion extends it
+                    flags.remove(matching[0])
+                    flags.insert(0, matching[0])
+                
+                confidence = min(confidence * weight, 1.0)
+                if confidence < config.min_confidence:
+                    continue
+                
+                completion = " ".join(flags)
+                suggestion = SuggestionResult(
+                    command=flags[0],
+                    confidence=confidence,
+                    source="flags",
+                    template="Usually used together: {0}",
+                    detail=completion,
+                    full_command=line_prefix + completion
+                )
+                suggestions.append(suggestion)
+                
+        except Exception as e:
+            logger.warning(f"Error getting flag suggestions: {e}")
+        
+        return suggestions
+    
+    def _get_pipe_suggestions(self,
+                              input_text: str,
+                              config: ConfigSnapshot,
+                              history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """Get the next pipeline stage when the input ends in (or is typing after) a pipe."""
+        suggestions = []
+        
+        if not self.history_analyzer or not input_text.strip():
+            return suggestions
+        
+        try:
+            segments = parse_command_line(input_text).segments
+            if len(segments) < 2 or segments[-1].operator not in PIPE_OPERATORS:
+                return suggestions
+            
+            producer = segments[-2].command
+            if not producer:
+                return suggestions
+            
+            current = segments[-1]
+            typed = input_text[current.start:]
+            line_prefix = input_text[:current.start]
+            if not line_prefix[-1].isspace():
+                line_prefix += " "
+            weight = config.pipe_weight
+            
+            for stage, probability in self.history_analyzer.get_pipe_suggestions(producer, snapshot=history):
+                if not stage.startswith(typed) or stage == typed:
+                    continue
+                
+                command = stage.split(" ", 1)[0]
+                if command in config.excluded_commands:
+                    continue
+                
+                confidence = min(probability * weight, 1.0)
+                if confidence < config.min_confidence:
+                    continue
+                
+                suggestion = SuggestionResult(
+                    command=command,
+                    confidence=confidence,
+                    source="pipe",
+                    template="Often piped from '{0}'",
+                    detail=producer,
+                    full_command=line_prefix + stage
+                )
+                suggestions.append(suggestion)
+                
+        except Exception as e:
+            logger.warning(f"Error getting pipe suggestions: {e}")
+        
+        return suggestions
+    
+    def _get_frecency_suggestions(self,
+                                  input_text: str,
+                                  config: ConfigSnapshot,
+                                  history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """Get suggestions from commands ranked by decayed usage (frequency and recency)."""
         suggestions = []
         
         if not self.history_analyzer:
@@ -196,11 +625,10 @@ class SuggestionEngine:
             if not input_lower:
                 return suggestions
             
-            # Get recent commands
-            recent_commands = self.history_analyzer.get_recent_commands(20)
+            weight = config.frecency_weight
             
-            for i, command in enumerate(recent_commands):
-                if self._should_exclude_command(command):
+            for command, frecency in self.history_analyzer.get_frecent_commands(50, snapshot=history):
+                if command in config.excluded_commands:
                     continue
                 
                 command_lower = command.lower()
@@ -215,26 +643,159 @@ class SuggestionEngine:
                     score = 0.6
                 
                 if score > 0:
-                    # Weight by recency and recent commands weight
-                    recency_bonus = (20 - i) / 20.0  # More recent = higher score
-                    weight = self.config.get('recent_commands_weight', 1.5)
-                    confidence = score * recency_bonus * weight
+                    confidence = min(score * frecency * weight, 1.0)
                     
-                    if confidence >= self.config.get_min_confidence_threshold():
+                    if confidence >= config.min_confidence:
                         suggestion = SuggestionResult(
                             command=command,
                             confidence=confidence,
-                            source="recent_commands",
-                            description=f"Recently used (#{i+1})"
+                            source="frecency",
+                            template="Frequently and recently used (score {0:.2f})",
+                            detail=frecency
                         )
                         suggestions.append(suggestion)
                         
         except Exception as e:
-            logger.warning(f"Error getting recent command suggestions: {e}")
+            logger.warning(f"Error getting frecency suggestions: {e}")
+        
+        return suggestions
+    
+    def _get_directory_suggestions(self,
+                                   input_text: str,
+                                   cwd: Optional[str],
+                                   config: ConfigSnapshot,
+                                   history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """Get suggestions from command lines used in the current working directory."""
+        suggestions = []
+        
+        if not self.history_analyzer or not cwd:
+            return suggestions
+        
+        try:
+            prefix = input_text.lstrip()
+            if not prefix.strip():
+                return suggestions
+            
+            directory, table = self.history_analyzer.get_directory_suggestions(cwd, snapshot=history)
+            if not table:
+                return suggestions
+            
+            weight = config.directory_weight
+            
+            for cmd_line, score in table:
+                if cmd_line == prefix or not cmd_line.startswith(prefix):
+                    continue
+                
+                command = parse_command_line(cmd_line).command
+                if not command or command in config.excluded_commands:
+                    continue
+                
+                confidence = min(score * weight, 1.0)
+                if confidence < config.min_confidence:
+                    continue
+                
+                suggestion = SuggestionResult(
+                    command=command,
+                    confidence=confidence,
+                    source="directory",
+                    template="Used in {0}",
+                    detail=directory,
+                    full_command=cmd_line
+                )
+                suggestions.append(suggestion)
+                
+        except Exception as e:
+            logger.warning(f"Error getting directory suggestions: {e}")
+        
+        return suggestions
+    
+    def _path_source_bound(self, context: QueryContext) -> float:
+        """Paths are only completed once the command name is followed by an argument."""
+        if not self.path_completer or ' ' not in context.input_text.lstrip():
+            return 0.0
+        return min((EXPLICIT_PATH_CONFIDENCE + UNIQUE_PATH_BONUS) * context.config.path_weight, 1.0)
+    
+    def _is_known_argument_prefix(self,
+                                  completed: List[str],
+                                  partial: str,
+                                  history: Optional[HistorySnapshot] = None) -> bool:
+        """Check whether history has seen a token starting with partial after the completed tokens."""
+        if not self.history_analyzer:
+            return False
+        return any(token.startswith(partial)
+                   for token, _ in self.history_analyzer.get_next_token_suggestions(completed, snapshot=history))
+    
+    def _get_path_suggestions(self,
+                              input_text: str,
+                              cwd: Optional[str],
+                              config: ConfigSnapshot,
+                              history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
+        """
+        Complete the file or directory argument being typed, relative to the client's cwd.
+        
+        Backslash escapes in the typed argument (`my\\ fi`) are removed before
+        completing; quoted arguments (`"my fi`) are not completed.
+        """
+        suggestions = []
+        
+        if not self.path_completer or not input_text.strip():
+            return suggestions
+        
+        try:
+            current = self._split_current_segment(input_text)
+            if current is None:
+                return suggestions
+            
+            _, completed, partial = current
+            if not completed or partial.startswith('-') or completed[0] in config.excluded_commands:
+                return suggestions
+            
+            typed = unescape_path(partial)
+            completions = self.path_completer.complete(
+                typed, cwd, limit=20, directories_only=completed[0] in DIRECTORY_COMMANDS
+            )
+            
+            if not partial:
+                confidence = DIRECTORY_LISTING_CONFIDENCE
+            elif '/' in typed or typed.startswith(('.', '~')):
+                confidence = EXPLICIT_PATH_CONFIDENCE
+            elif self._is_known_argument_prefix(completed, partial, history):
+                # Most likely a subcommand or habitual argument, not a file
+                confidence = DIRECTORY_LISTING_CONFIDENCE
+            else:
+                confidence = PATH_CONFIDENCE
+            if partial and len(completions) == 1 and confidence > DIRECTORY_LISTING_CONFIDENCE:
+                confidence += UNIQUE_PATH_BONUS
+            confidence = min(confidence * config.path_weight, 1.0)
+            if confidence < config.min_confidence:
+                return suggestions
+            
+            line_prefix = input_text[:len(input_text) - len(partial)]
+            
+            for completion in completions:
+                if completion.text == typed:
+                    continue
+                
+                text = escape_path(completion.text)
+                suggestion = SuggestionResult(
+                    command=text,
+                    confidence=confidence,
+                    source="path",
+                    template="Directory in {0}" if completion.is_dir else "File in {0}",
+                    detail=completion.directory,
+                    full_command=line_prefix + text
+                )
+                suggestions.append(suggestion)
+                
+        except Exception as e:
+            logger.warning(f"Error getting path suggestions: {e}")
         
         return suggestions
     
-    def _get_sequential_suggestions(self, input_text: str) -> List[SuggestionResult]:
+    def _get_sequential_suggestions(self,
+                                    input_text: str,
+                                    config: ConfigSnapshot,
+                                    history: Optional[HistorySnapshot] = None) -> List[SuggestionResult]:
         """Get suggestions based on command sequences (what usually comes next)."""
         suggestions = []
         
@@ -243,7 +804,7 @@ class SuggestionEngine:
         
         try:
             # Get recent commands to understand context
-            recent_commands = self.history_analyzer.get_recent_commands(3)
+            recent_commands = self.history_analyzer.get_recent_commands(3, snapshot=history)
             
             if recent_commands:
                 last_command = recent_commands[0]
@@ -251,25 +812,27 @@ class SuggestionEngine:
                 # Get commands that typically follow the last command
                 next_commands = self.history_analyzer.get_command_suggestions_after(
                     last_command, 
-                    limit=10
+                    limit=10,
+                    snapshot=history
                 )
                 
                 input_lower = input_text.lower().strip()
                 
                 for next_cmd, confidence in next_commands:
-                    if self._should_exclude_command(next_cmd):
+                    if next_cmd in config.excluded_commands:
                         continue
                     
                     # Check if the suggested next command matches current input
                     if input_lower and not next_cmd.lower().startswith(input_lower):
                         continue
                     
-                    if confidence >= self.config.get_min_confidence_threshold():
+                    if confidence >= config.min_confidence:
                         suggestion = SuggestionResult(
                             command=next_cmd,
-                            confidence=confidence * 0.9,  # Slightly lower priority
+                            confidence=min(1.0, confidence * config.sequential_weight),
                             source="sequential",
-                            description=f"Often follows '{last_command}'"
+                            template="Often follows '{0}'",
+                            detail=last_command
                         )
                         suggestions.append(suggestion)
                         
@@ -278,93 +841,432 @@ class SuggestionEngine:
         
         return suggestions
     
-    def _merge_and_rank_suggestions(self, all_suggestions: List[SuggestionResult]) -> List[SuggestionResult]:
-        """Merge suggestions from different sources and rank them."""
-        # Group suggestions by command
-        command_groups: Dict[str, List[SuggestionResult]] = {}
+    def get_suggestions(self, input_text: str, cwd: Optional[str] = None) -> List[SuggestionResult]:
+        """
+        Get command suggestions for the given input.
         
-        for suggestion in all_suggestions:
-            key = suggestion.full_command if suggestion.full_command else suggestion.command
-            if key not in command_groups:
-                command_groups[key] = []
-            command_groups[key].append(suggestion)
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Returns:
+            List of ranked suggestions
+        """
+        return self.query(input_text, cwd).suggestions
+    
+    def query(self, input_text: str, cwd: Optional[str] = None) -> QueryResult:
+        """
+        Get command suggestions together with how each source contributed.
         
-        # Merge suggestions for same command
-        merged_suggestions = []
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Returns:
+            QueryResult with the ranked suggestions and a report per source
+        """
+        if not input_text or not input_text.strip() or not self.config.snapshot().enabled:
+            return QueryResult([], {})
         
-        for command, group in command_groups.items():
-            if len(group) == 1:
-                merged_suggestions.append(group[0])
-            else:
-                # Combine confidences from multiple sources
-                total_confidence = sum(s.confidence for s in group)
-                best_suggestion = max(group, key=lambda s: s.confidence)
-                
-                # Create merged suggestion
-                sources = list(set(s.source for s in group))
-                merged_suggestion = SuggestionResult(
-                    command=best_suggestion.command,
-                    confidence=min(total_confidence, 1.0),
-                    source="+".join(sources),
-                    description=best_suggestion.description,
-                    full_command=best_suggestion.full_command
-                )
-                merged_suggestions.append(merged_suggestion)
+        start_time = time.time()
+        increment_suggestion_requests()
+        input_text = self._normalize_input(input_text)
+        
+        result = self._query(input_text, cwd)
+        elapsed_time = time.time() - start_time
+        record_suggestion_time(elapsed_time)
+        logger.debug(f"Generated {len(result.suggestions)} suggestions in {elapsed_time:.3f}s")
+        return result
+    
+    def iter_suggestions(self, input_text: str, cwd: Optional[str] = None) -> Iterator[SuggestionUpdate]:
+        """
+        Stream suggestions: a provisional top k each time a source changes it,
+        cheapest sources first, then the final ranking.
         
-        # Sort by confidence (descending)
-        merged_suggestions.sort(key=lambda s: s.confidence, reverse=True)
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Yields:
+            SuggestionUpdates; the last one has final=True and the QueryResult
+        """
+        if not input_text or not input_text.strip() or not self.config.snapshot().enabled:
+            yield SuggestionUpdate([], None, True, 0.0, QueryResult([], {}))
+            return
         
-        # Limit results
-        max_suggestions = self.config.get_max_suggestions()
-        return merged_suggestions[:max_suggestions]
+        increment_suggestion_requests()
+        for update in self._iter_query(self._normalize_input(input_text), cwd):
+            if update.final:
+                record_suggestion_time(update.elapsed)
+            yield update
     
-    def get_suggestions(self, input_text: str) -> List[SuggestionResult]:
+    async def aiter_suggestions(self, input_text: str, cwd: Optional[str] = None) -> AsyncIterator[SuggestionUpdate]:
         """
-        Get command suggestions for the given input.
+        Async version of iter_suggestions(); sources run off the event loop.
         
         Args:
             input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Yields:
+            SuggestionUpdates; the last one has final=True and the QueryResult
+        """
+        async for update in _aiterate(self.iter_suggestions(input_text, cwd)):
+            yield update
+    
+    def _run_sources(self, context: QueryContext) -> Tuple[CandidateMatrix, Dict[str, SourceReport]]:
+        """
+        Run the registered sources, cheapest first, within the request deadline.
+        
+        Args:
+            context: The query
             
         Returns:
-            List of ranked suggestions
+            (candidate matrix of the sources that ran in time, report per source)
         """
-        if not self.config.is_enabled():
-            return []
+        sources = self.sources.ordered()
+        matrix = CandidateMatrix([source.name for source in sources], context.config.source_weights)
+        report: Dict[str, SourceReport] = {}
+        for _ in self._iter_sources(context, matrix, report):
+            pass
+        return matrix, report
+    
+    def _iter_sources(self,
+                      context: QueryContext,
+                      matrix: CandidateMatrix,
+                      report: Dict[str, SourceReport]) -> Iterator[SuggestionSource]:
+        """
+        Run the registered sources into a candidate matrix, yielding after each one.
         
-        if not input_text or not input_text.strip():
-            return []
+        With parallel sources, the expensive tail (and any source that can
+        block, e.g. on the filesystem) is submitted to the shared executor
+        first, so it runs while the cheap sources run inline in the request
+        thread. Everything shares one deadline: inline sources not started
+        by then are dropped, as are tail sources that have not answered. Tail
+        answers are added in cost order so rankings do not depend on thread
+        timing.
         
-        start_time = time.time()
-        all_suggestions = []
+        Scores add up across sources, so a source is skipped only when no
+        candidate outside the top k (max_suggestions), nor a new one, could
+        reach the k-th best score even if every source still to be added gave
+        it its maximum; the top k are then the same as with every source run,
+        though their scores may be lower. A skipped tail source is cancelled,
+        or its answer ignored, without waiting for it.
         
-        # Get suggestions from different sources
-        try:
-            # Command scanner suggestions
-            all_suggestions.extend(self._get_command_suggestions(input_text))
-            
-            # History-based suggestions
-            all_suggestions.extend(self._get_history_suggestions(input_text))
+        Args:
+            context: The query
+            matrix: Matrix the suggestions are added to
+            report: Filled with the outcome per source
             
-            # Frequent commands
-            all_suggestions.extend(self._get_frequent_command_suggestions(input_text))
+        Yields:
+            Each source whose suggestions were just added
+        """
+        config = context.config
+        early_termination = config.early_termination
+        parallel = config.parallel_sources
+        deadline_ms = config.source_deadline_ms if parallel else 0
+        k = config.max_suggestions
+        
+        ordered = self.sources.ordered()
+        bounds = {source.name: source.upper_bound(context) * matrix.weight(source.name) for source in ordered}
+        # The most the sources not yet added can still add to any one candidate
+        remaining = sum(bounds.values())
+        
+        def beaten(source: SuggestionSource) -> bool:
+            if bounds[source.name] <= 0:
+                return True
+            if not early_termination:
+                return False
+            kth, below = matrix.boundary_scores(k)
+            return kth > below + remaining
+        
+        def skip(source: SuggestionSource) -> None:
+            report[source.name] = SourceReport(0.0, 0, 'skipped')
+            self.sources.record(source, 'skipped')
+        
+        def elapsed_ms() -> float:
+            return (time.perf_counter() - start) * 1000
+        
+        def late(source: SuggestionSource) -> None:
+            report[source.name] = SourceReport(elapsed_ms(), 0, 'late')
+            self.sources.record(source, 'late', time_ms=report[source.name].time_ms)
+        
+        def add(source: SuggestionSource, suggestions: List[SuggestionResult], elapsed: float) -> None:
+            matrix.add(source.name, suggestions)
+            report[source.name] = SourceReport(elapsed * 1000, len(suggestions), 'ok')
+            self.sources.record(source, 'ok', len(suggestions), elapsed * 1000)
+        
+        def failed(source: SuggestionSource, error: Exception) -> None:
+            logger.warning(f"Suggestion source {source.name} failed: {error}")
+            report[source.name] = SourceReport(0.0, 0, 'error')
+            self.sources.record(source, 'error')
+        
+        start = time.perf_counter()
+        inline = [source for source in ordered if not parallel or source.cost < INLINE_SOURCE_COST]
+        futures = []
+        
+        try:
+            # Start the tail before the inline sources so the two overlap;
+            # nothing has been added yet, so only sources that cannot
+            # contribute at all are skipped here
+            for source in ordered:
+                if parallel and source.cost >= INLINE_SOURCE_COST:
+                    if bounds[source.name] <= 0:
+                        remaining -= bounds[source.name]
+                        skip(source)
+                        continue
+                    futures.append((source, _get_source_executor().submit(
+                        _timed, lambda source=source: source.fetch(context))))
             
-            # Recent commands
-            all_suggestions.extend(self._get_recent_command_suggestions(input_text))
+            for source in inline:
+                skipped = beaten(source)
+                remaining -= bounds[source.name]
+                if skipped:
+                    skip(source)
+                    continue
+                if deadline_ms > 0 and elapsed_ms() >= deadline_ms:
+                    late(source)
+                    continue
+                try:
+                    suggestions, elapsed = _timed(lambda: source.fetch(context))
+                except Exception as e:
+                    failed(source, e)
+                    continue
+                add(source, suggestions, elapsed)
+                yield source
             
-            # Sequential suggestions
-            all_suggestions.extend(self._get_sequential_suggestions(input_text))
+            for source, future in futures:
+                # Tail sources have not added anything until they are
+                # collected, so they leave the remaining bound one by one
+                if beaten(source):
+                    remaining -= bounds[source.name]
+                    future.cancel()
+                    skip(source)
+                    continue
+                remaining -= bounds[source.name]
+                remaining_ms = deadline_ms - elapsed_ms()
+                try:
+                    suggestions, elapsed = future.result(
+                        timeout=max(remaining_ms, 0) / 1000 if deadline_ms > 0 else None
+                    )
+                except FutureTimeoutError:
+                    # A late source keeps its worker until it returns; its answer is dropped
+                    future.cancel()
+                    late(source)
+                    continue
+                except Exception as e:
+                    failed(source, e)
+                    continue
+                add(source, suggestions, elapsed)
+                yield source
+        finally:
+            # The consumer may stop early; do not start sources nobody waits for
+            for _, future in futures:
+                future.cancel()
+        
+        dropped = [name for name, entry in report.items() if entry.status == 'late']
+        if dropped:
+            logger.debug(f"Dropped sources that missed the {deadline_ms}ms deadline: {', '.join(dropped)}")
+    
+    def _query(self,
+               input_text: str,
+               cwd: Optional[str],
+               command_pool: Optional[Sequence[str]] = None,
+               prepared: Optional[PreparedQuery] = None) -> QueryResult:
+        """
+        Answer a normalized input from the result cache or all sources.
+        
+        Args:
+            input_text: Normalized command line input
+            cwd: Working directory of the client
+            command_pool: Commands to search instead of the whole scanned index
+                (the matches of an input this one extends)
+            prepared: Output of _prepare() shared by several queries
             
-            # Merge and rank
-            final_suggestions = self._merge_and_rank_suggestions(all_suggestions)
+        Returns:
+            QueryResult; answers missing a late source are not cached
+        """
+        config, generation, history = prepared or self._prepare()
+        cache_key = (input_text, os.path.normpath(cwd) if cwd else None, generation)
+        cached = self._cached_result(cache_key)
+        if cached is not None:
+            return cached
+        
+        context = QueryContext(input_text, config, cwd, command_pool, history)
+        
+        try:
+            matrix, report = self._run_sources(context)
+            return self._finish_query(context, matrix, report, cache_key)
             
-            elapsed_time = time.time() - start_time
-            logger.debug(f"Generated {len(final_suggestions)} suggestions in {elapsed_time:.3f}s")
+        except Exception as e:
+            logger.error(f"Error generating suggestions: {e}")
+            return QueryResult([], {})
+    
+    def _iter_query(self,
+                    input_text: str,
+                    cwd: Optional[str],
+                    command_pool: Optional[Sequence[str]] = None) -> Iterator['SuggestionUpdate']:
+        """
+        Answer a normalized input progressively: like _query(), but yielding
+        the provisional top k whenever a finished source changes it.
+        
+        Args:
+            input_text: Normalized command line input
+            cwd: Working directory of the client
+            command_pool: Commands to search instead of the whole scanned index
             
-            return final_suggestions
+        Yields:
+            SuggestionUpdates; the last one is final and carries the QueryResult
+        """
+        start = time.perf_counter()
+        config, generation, history = self._prepare()
+        cache_key = (input_text, os.path.normpath(cwd) if cwd else None, generation)
+        cached = self._cached_result(cache_key)
+        if cached is not None:
+            yield SuggestionUpdate(cached.suggestions, None, True, time.perf_counter() - start, cached)
+            return
+        
+        context = QueryContext(input_text, config, cwd, command_pool, history)
+        k = config.max_suggestions
+        matrix = CandidateMatrix([source.name for source in self.sources.ordered()], config.source_weights)
+        report: Dict[str, SourceReport] = {}
+        shown: List[Tuple[str, float]] = []
+        
+        try:
+            for source in self._iter_sources(context, matrix, report):
+                provisional = matrix.top_k(k)
+                ranking = [(suggestion.full_command, suggestion.confidence) for suggestion in provisional]
+                if ranking != shown:
+                    shown = ranking
+                    yield SuggestionUpdate(provisional, source.name, False, time.perf_counter() - start)
+            result = self._finish_query(context, matrix, report, cache_key)
             
         except Exception as e:
             logger.error(f"Error generating suggestions: {e}")
-            return []
+            result = QueryResult([], {})
+        
+        yield SuggestionUpdate(result.suggestions, None, True, time.perf_counter() - start, result)
+    
+    def _cached_result(self, cache_key: Tuple) -> Optional[QueryResult]:
+        """Get a cached answer (as a fresh list) and count the hit or miss."""
+        cached = self._result_cache.get(cache_key)
+        if cached is None:
+            increment_cache_misses()
+            return None
+        increment_cache_hits()
+        return cached._replace(suggestions=list(cached.suggestions), cached=True)
+    
+    def _finish_query(self,
+                      context: QueryContext,
+                      matrix: CandidateMatrix,
+                      report: Dict[str, SourceReport],
+                      cache_key: Tuple) -> QueryResult:
+        """Rank the candidates of a query and cache the answer if every source made it."""
+        # Merge and rank: weighted sum of each candidate's source features
+        final_suggestions = matrix.top_k(context.config.max_suggestions)
+        
+        scanner_report = report.get('command_scanner')
+        result = QueryResult(
+            final_suggestions,
+            report,
+            matched=context.matched if scanner_report and scanner_report.status == 'ok' else None
+        )
+        if all(entry.status in ('ok', 'skipped') for entry in report.values()) and not any(
+                entry.suggestions and self.sources.get(name).volatile for name, entry in report.items()):
+            self._result_cache.put(cache_key, result._replace(suggestions=tuple(final_suggestions)))
+        return result
+    
+    def _prepare(self) -> PreparedQuery:
+        """
+        Refresh stale data, then take the configuration view, history snapshot
+        and data generation for a query.
+        """
+        # Rebuild before the sources start, so a rescan is never "late" and the
+        # cache key sees the new generations
+        if self.command_scanner:
+            self.command_scanner.refresh_if_stale()
+        # One history snapshot for every source, so a live update or rebuild
+        # published mid-query cannot mix generations
+        history = self.history_analyzer.get_snapshot() if self.history_analyzer else None
+        
+        # One configuration view for the whole request
+        config = self.config.snapshot()
+        generation = (
+            self.command_scanner.generation if self.command_scanner else 0,
+            history.generation if history is not None else 0,
+            config.generation,
+        )
+        return PreparedQuery(config, generation, history)
+    
+    def get_suggestions_batch(self,
+                              inputs: Sequence[str],
+                              cwd: Optional[str] = None,
+                              cwds: Optional[Sequence[Optional[str]]] = None) -> BatchResult:
+        """
+        Get suggestions for many inputs at once (replays, weight tuning).
+        
+        Data refresh, the configuration snapshot and the generation key are
+        taken once for the whole batch. Inputs are answered in sorted order so
+        each one searches only the commands matched by the longest earlier input
+        it extends, and duplicates are answered once. Sources run in the calling
+        thread without a deadline, so answers are complete and repeatable.
+        
+        Args:
+            inputs: Command line inputs
+            cwd: Working directory for every input
+            cwds: Working directory per input (overrides cwd)
+            
+        Returns:
+            BatchResult with one suggestion list per input, in input order
+        """
+        start_time = time.perf_counter()
+        results: List[List[SuggestionResult]] = [[] for _ in inputs]
+        
+        prepared = self._prepare()
+        if not prepared.config.enabled:
+            return BatchResult(results, time.perf_counter() - start_time)
+        prepared = prepared._replace(config=prepared.config._replace(parallel_sources=False))
+        
+        if cwds is None:
+            cwds = [cwd] * len(inputs)
+        normalized = [self._normalize_input(text) if text and text.strip() else '' for text in inputs]
+        
+        answers: Dict[Tuple[str, Optional[str]], QueryResult] = {}
+        # Earlier inputs that prefix the current one, with the commands they matched
+        ancestors: List[Tuple[str, Tuple[str, ...]]] = []
+        
+        for index in sorted(range(len(inputs)), key=normalized.__getitem__):
+            text = normalized[index]
+            if not text:
+                continue
+            increment_suggestion_requests()
+            
+            while ancestors and not text.startswith(ancestors[-1][0]):
+                ancestors.pop()
+            
+            key = (text, cwds[index])
+            result = answers.get(key)
+            if result is None:
+                pool = ancestors[-1][1] if ancestors else None
+                result = self._query(text, cwds[index], pool, prepared)
+                answers[key] = result
+            if result.matched is not None:
+                ancestors.append((text, result.matched))
+            results[index] = list(result.suggestions)
+        
+        batch = BatchResult(results, time.perf_counter() - start_time)
+        record_batch_throughput(batch.qps)
+        logger.debug(f"Answered {len(inputs)} inputs in {batch.elapsed:.3f}s ({batch.qps:.0f} queries/s)")
+        return batch
+    
+    def create_session(self) -> 'SuggestionSession':
+        """
+        Start an incremental session for one shell's keystrokes.
+        
+        Returns:
+            SuggestionSession answering each input from the previous one's matches
+        """
+        return SuggestionSession(self)
     
     def get_engine_stats(self) -> Dict[str, Any]:
         """Get statistics about the suggestion engine."""
@@ -374,8 +1276,14 @@ class SuggestionEngine:
             'min_confidence_threshold': self.config.get_min_confidence_threshold(),
             'command_scanner_enabled': self.command_scanner is not None,
             'history_analyzer_enabled': self.history_analyzer is not None,
+            'result_cache_entries': len(self._result_cache),
+            'data_generation': self.get_data_generation(),
+            'sources': self.sources.get_stats(),
         }
         
+        if self.path_completer:
+            stats['path_cache'] = self.path_completer.get_stats()
+        
         if self.command_scanner:
             stats.update({
                 'command_scanner_stats': self.command_scanner.get_command_stats()
@@ -388,6 +1296,82 @@ class SuggestionEngine:
         
         return stats
     
+    def record_command(self,
+                       command: str,
+                       exit_status: Optional[int] = None,
+                       duration: Optional[float] = None,
+                       cwd: Optional[str] = None,
+                       timestamp: Optional[float] = None) -> None:
+        """
+        Learn from a command the user just executed.
+        
+        Args:
+            command: Executed command line
+            exit_status: Exit status reported by the shell
+            duration: Run time in seconds
+            cwd: Directory the command ran in
+            timestamp: When the command finished (defaults to now)
+        """
+        self.record_commands([HistoryEntry(
+            command=command,
+            timestamp=timestamp,
+            cwd=cwd,
+            exit_status=exit_status,
+            duration=duration
+        )])
+    
+    def record_commands(self, entries: Sequence[HistoryEntry]) -> None:
+        """
+        Learn from several executed commands at once (e.g. a drained spool);
+        the history models are republished once for the whole batch.
+        
+        Args:
+            entries: Executed commands, oldest first
+        """
+        if not self.history_analyzer:
+            return
+        
+        entries = [entry._replace(command=entry.command.strip()) for entry in entries if entry.command.strip()]
+        if entries:
+            self.history_analyzer.record_commands(entries)
+    
+    def set_background_refresh(self, enabled: bool) -> None:
+        """
+        Stop (or resume) rebuilding stale data on the request path.
+        
+        Args:
+            enabled: True when an external refresher installs new models
+        """
+        if self.command_scanner:
+            self.command_scanner.auto_refresh = not enabled
+        if self.history_analyzer:
+            self.history_analyzer.auto_refresh = not enabled
+    
+    def export_models(self) -> Dict[str, Any]:
+        """Rebuild all data and return it in a picklable form for install_models()."""
+        self.refresh_data()
+        
+        models: Dict[str, Any] = {}
+        if self.command_scanner:
+            models['commands'] = self.command_scanner.export_index()
+        if self.history_analyzer:
+            models['history'] = self.history_analyzer.export_snapshot()
+        return models
+    
+    def install_models(self, models: Dict[str, Any]) -> None:
+        """
+        Swap in data built by export_models(), typically in another process.
+        
+        Args:
+            models: Output of export_models()
+        """
+        if self.command_scanner and 'commands' in models:
+            self.command_scanner.install_index(*models['commands'])
+        if self.history_analyzer and 'history' in models:
+            self.history_analyzer.install_snapshot(*models['history'])
+        self._result_cache.clear()
+        logger.info("Installed rebuilt suggestion data")
+    
     def warm_up(self) -> None:
         """Warm up the engine by pre-loading data."""
         logger.info("Warming up suggestion engine...")
@@ -410,4 +1394,149 @@ class SuggestionEngine:
         if self.history_analyzer:
             self.history_analyzer.analyze_history(force_refresh=True)
         
-        logger.info("Suggestion engine data refreshed") 
\ No newline at end of file
+        self._result_cache.clear()
+        logger.info("Suggestion engine data refreshed")
+
+
+class SuggestionSession:
+    """
+    Incremental suggestions for the keystrokes of one shell.
+    
+    Typing `g`, `gi`, `git` only ever narrows the set of matching commands, so
+    the session keeps the commands the previous input matched and, while each
+    input extends the last one, searches only those instead of the whole index.
+    Deletions, edits and a rescanned index fall back to a full query.
+    """
+    
+    def __init__(self, engine: SuggestionEngine):
+        """
+        Initialize SuggestionSession.
+        
+        Args:
+            engine: Engine answering the queries
+        """
+        self.engine = engine
+        self.full_queries = 0
+        self.incremental_queries = 0
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Forget the previous input so the next query searches everything."""
+        self._last_input: Optional[str] = None
+        self._scanner_generation: Optional[int] = None
+        self._command_pool: Optional[Tuple[str, ...]] = None
+    
+    @property
+    def pool_size(self) -> Optional[int]:
+        """Number of commands the next extending keystroke will search."""
+        return len(self._command_pool) if self._command_pool is not None else None
+    
+    def _take_pool(self, input_text: str, scanner_generation: int) -> Optional[Tuple[str, ...]]:
+        """Get the commands to search if the input extends the last one (lock held)."""
+        if (self._command_pool is not None
+                and input_text.startswith(self._last_input)
+                and scanner_generation == self._scanner_generation):
+            self.incremental_queries += 1
+            return self._command_pool
+        self.full_queries += 1
+        return None
+    
+    def get_suggestions(self, input_text: str, cwd: Optional[str] = None) -> List[SuggestionResult]:
+        """
+        Get suggestions for the current input of this session.
+        
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Returns:
+            List of ranked suggestions, the same as SuggestionEngine.get_suggestions()
+        """
+        return self.query(input_text, cwd).suggestions
+    
+    def query(self, input_text: str, cwd: Optional[str] = None) -> QueryResult:
+        """
+        Get suggestions for the current input with a report per source.
+        
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Returns:
+            QueryResult, the same as SuggestionEngine.query()
+        """
+        engine = self.engine
+        if not input_text or not input_text.strip() or not engine.config.snapshot().enabled:
+            self.reset()
+            return QueryResult([], {})
+        
+        start_time = time.time()
+        increment_suggestion_requests()
+        input_text = engine._normalize_input(input_text)
+        scanner_generation = engine.command_scanner.generation if engine.command_scanner else 0
+        
+        with self._lock:
+            pool = self._take_pool(input_text, scanner_generation)
+            result = engine._query(input_text, cwd, pool)
+            
+            self._last_input = input_text
+            self._scanner_generation = scanner_generation
+            self._command_pool = result.matched
+        
+        elapsed_time = time.time() - start_time
+        record_suggestion_time(elapsed_time)
+        logger.debug(
+            f"Generated {len(result.suggestions)} suggestions in {elapsed_time:.3f}s "
+            f"({'incremental' if pool is not None else 'full'})"
+        )
+        return result
+    
+    def iter_suggestions(self, input_text: str, cwd: Optional[str] = None) -> Iterator[SuggestionUpdate]:
+        """
+        Stream suggestions for the current input of this session.
+        
+        Args:
+            input_text: Current command line input
+            cwd: Working directory of the client, for directory-aware ranking
+            
+        Yields:
+            SuggestionUpdates, the same as SuggestionEngine.iter_suggestions()
+        """
+        engine = self.engine
+        if not input_text or not input_text.strip() or not engine.config.snapshot().enabled:
+            self.reset()
+            yield SuggestionUpdate([], None, True, 0.0, QueryResult([], {}))
+            return
+        
+        increment_suggestion_requests()
+        input_text = engine._normalize_input(input_text)
+        scanner_generation = engine.command_scanner.generation if engine.command_scanner else 0
+        
+        with self._lock:
+            pool = self._take_pool(input_text, scanner_generation)
+            # Forget the pool until the query completes; an abandoned stream
+            # must not leave a pool for an input it never finished
+            self.reset()
+        
+        for update in engine._iter_query(input_text, cwd, pool):
+            if update.final:
+                with self._lock:
+                    self._last_input = input_text
+                    self._scanner_generation = scanner_generation
+                    self._command_pool = update.result.matched
+                record_suggestion_time(update.elapsed)
+            yield update
+    
+    async def aiter_suggestions(self, input_text: str, cwd: Optional[str] = None) -> AsyncIterator[SuggestionUpdate]:
+        """Async version of iter_suggestions(); sources run off the event loop."""
+        async for update in _aiterate(self.iter_suggestions(input_text, cwd)):
+            yield update
+    
+    def get_session_stats(self) -> Dict[str, Any]:
+        """Get statistics about this session."""
+        return {
+            'full_queries': self.full_queries,
+            'incremental_queries': self.incremental_queries,
+            'pool_size': self.pool_size,
+        }
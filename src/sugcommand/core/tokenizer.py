@@ -0,0 +1,283 @@
+"""
+Tokenizer Module
+
+Single-pass, quote-aware parser for shell command lines. Splits a line into
+segments at pipes and list operators, collects redirections, leading
+environment assignments and wrapper commands (sudo, env, time, ...), and
+memoizes results in a bounded LRU since history lines repeat a lot.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Distinct lines whose parse is memoized
+TOKENIZER_CACHE_SIZE = 8192
+
+# Operators separating commands, longest first
+CONTROL_OPERATORS = ('||', '&&', '|&', ';;', '|', '&', ';')
+
+# Control operators that feed one command's output to the next
+PIPE_OPERATORS = ('|', '|&')
+
+# Redirection operators, longest first so '>>' is never read as '>'
+REDIRECTION_OPERATORS = ('&>>', '<<<', '<<', '>>', '>&', '<&', '&>', '<>', '>|', '>', '<')
+
+# Commands that run another command, with their options taking an argument
+WRAPPERS = {
+    'sudo': {'-u', '-g', '-C', '-h', '-p', '-U', '-r', '-t', '-D'},
+    'doas': {'-u', '-C'},
+    'env': {'-u', '-C', '-S'},
+    'time': {'-f', '-o'},
+    'nice': {'-n'},
+    'ionice': {'-c', '-n', '-p'},
+    'nohup': set(),
+    'command': set(),
+    'exec': {'-a'},
+    'builtin': set(),
+}
+
+_ASSIGNMENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*\+?=')
+
+
+class Redirection(NamedTuple):
+    """A redirection such as `2>> log.txt`."""
+    operator: str
+    target: str
+
+
+class CommandSegment(NamedTuple):
+    """One simple command of a command line."""
+    tokens: Tuple[str, ...]
+    operator: Optional[str] = None  # operator before this segment ('|', '&&', ...)
+    assignments: Tuple[str, ...] = ()
+    wrappers: Tuple[str, ...] = ()
+    redirections: Tuple[Redirection, ...] = ()
+    start: int = 0  # offset of the segment's first word in the line
+
+    @property
+    def command(self) -> Optional[str]:
+        """Base command of the segment."""
+        return self.tokens[0] if self.tokens else None
+
+
+class ParsedCommandLine(NamedTuple):
+    """A command line split into segments."""
+    line: str
+    segments: Tuple[CommandSegment, ...]
+
+    @property
+    def command(self) -> Optional[str]:
+        """Base command of the first segment."""
+        return self.segments[0].command if self.segments else None
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        """Tokens of the first segment."""
+        return self.segments[0].tokens if self.segments else ()
+
+    @property
+    def current(self) -> Optional[CommandSegment]:
+        """The last segment, i.e. the one being edited while typing."""
+        return self.segments[-1] if self.segments else None
+
+    def pipe_transitions(self) -> List[Tuple[str, str]]:
+        """(command, next stage) for every `a | b` in the line; the stage keeps its arguments."""
+        return [
+            (previous.command, ' '.join(segment.tokens))
+            for previous, segment in zip(self.segments, self.segments[1:])
+            if segment.operator in PIPE_OPERATORS and previous.command and segment.tokens
+        ]
+
+
+def _split_words(line: str) -> List[Tuple[str, bool, int]]:
+    """
+    Split a line into (word, is_operator, offset) triples in one pass.
+
+    Quotes, backslash escapes, `$(...)` and backticks are kept inside words
+    exactly as typed; offsets point at the first character of each word.
+    """
+    words: List[Tuple[str, bool, int]] = []
+    current: List[str] = []
+    start = 0
+    quote = None
+    depth = 0
+    i = 0
+    length = len(line)
+
+    def flush():
+        if current:
+            words.append((''.join(current), False, start))
+            current.clear()
+
+    while i < length:
+        char = line[i]
+
+        if quote:
+            current.append(char)
+            if char == '\\' and quote == '"' and i + 1 < length:
+                current.append(line[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+            i += 1
+            continue
+
+        if not current:
+            start = i
+
+        if char == '\\' and i + 1 < length:
+            current.append(line[i:i + 2])
+            i += 2
+            continue
+
+        if char in '\'"`':
+            quote = char
+            current.append(char)
+            i += 1
+            continue
+
+        if char == '$' and line.startswith('$(', i):
+            depth += 1
+            current.append('$(')
+            i += 2
+            continue
+
+        if depth:
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            current.append(char)
+            i += 1
+            continue
+
+        if char.isspace():
+            flush()
+            i += 1
+            continue
+
+        if char == '#' and not current:
+            break
+
+        if char in '|&;<>':
+            # A number right before a redirection is its file descriptor
+            fd = ''
+            if current and char in '<>' and ''.join(current).isdigit():
+                fd = ''.join(current)
+                current.clear()
+            flush()
+            for operator in REDIRECTION_OPERATORS + CONTROL_OPERATORS:
+                if line.startswith(operator, i):
+                    words.append((fd + operator, True, i - len(fd)))
+                    i += len(operator)
+                    break
+            continue
+
+        current.append(char)
+        i += 1
+
+    flush()
+    return words
+
+
+def _strip_wrappers(tokens: List[str]) -> Tuple[List[str], List[str], List[str]]:
+    """Separate leading assignments and wrapper commands from the real command."""
+    assignments: List[str] = []
+    wrappers: List[str] = []
+    index = 0
+
+    while index < len(tokens):
+        token = tokens[index]
+        if _ASSIGNMENT.match(token):
+            assignments.append(token)
+            index += 1
+            continue
+
+        # A lone wrapper (`time`, `sudo`) is the command itself
+        if token not in WRAPPERS or index == len(tokens) - 1:
+            break
+
+        wrappers.append(token)
+        index += 1
+        takes_argument = WRAPPERS[token]
+        while index < len(tokens) and tokens[index].startswith('-') and tokens[index] != '-':
+            option = tokens[index]
+            index += 1
+            if option == '--':
+                break
+            if option in takes_argument:
+                index += 1
+
+    return tokens[index:], assignments, wrappers
+
+
+def _build_segment(words: List[Tuple[str, bool, int]],
+                   operator: Optional[str],
+                   start: int) -> CommandSegment:
+    """Turn the words between two control operators into a segment."""
+    tokens: List[str] = []
+    redirections: List[Redirection] = []
+    pending = None
+
+    for word, is_operator, _ in words:
+        if is_operator:
+            pending = word
+            continue
+        if pending is not None:
+            redirections.append(Redirection(pending, word))
+            pending = None
+        else:
+            tokens.append(word)
+
+    if pending is not None:
+        redirections.append(Redirection(pending, ''))
+
+    tokens, assignments, wrappers = _strip_wrappers(tokens)
+    return CommandSegment(
+        tuple(tokens), operator, tuple(assignments), tuple(wrappers), tuple(redirections), start
+    )
+
+
+@lru_cache(maxsize=TOKENIZER_CACHE_SIZE)
+def parse_command_line(line: str) -> ParsedCommandLine:
+    """
+    Parse a command line into segments (memoized).
+
+    Args:
+        line: Command line as typed or read from history
+
+    Returns:
+        ParsedCommandLine; a line ending in an operator (`ps aux | `) gets an
+        empty final segment
+    """
+    segments: List[CommandSegment] = []
+    words: List[Tuple[str, bool, int]] = []
+    operator = None
+
+    for word in _split_words(line):
+        if word[1] and word[0] in CONTROL_OPERATORS:
+            if words or segments:
+                segments.append(_build_segment(words, operator, words[0][2] if words else word[2]))
+            words = []
+            operator = word[0]
+        else:
+            words.append(word)
+
+    if words or operator is not None:
+        segments.append(_build_segment(words, operator, words[0][2] if words else len(line)))
+
+    return ParsedCommandLine(line, tuple(segments))
+
+
+def get_command_tokens(line: str) -> List[str]:
+    """Get the tokens of a line's first command, without wrappers and assignments."""
+    return list(parse_command_line(line.strip()).tokens)
+
+
+def get_base_command(line: str) -> Optional[str]:
+    """Get the base command of a line's first command."""
+    return parse_command_line(line.strip()).command
@@ -77,8 +77,96 @@ class BashIntegration:
         """Check if bash integration is installed."""
         return self.completion_script_path.exists()
     
+    def _generate_capture_hooks(self) -> str:
+        """Generate preexec/precmd hooks that push executed commands to the daemon."""
+        return f'''
+# Live history capture: report each executed command (with exit status,
+# duration and cwd) to the daemon, which spools it if it is not running.
+_sugcommand_record() {{
+    python3 -c "
+import sys
+sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
+from sugcommand.integrations.realtime_daemon import record_shell_command
+record_shell_command(sys.argv[1:])
+" "$@" >/dev/null 2>&1 &
+    disown 2>/dev/null
+}}
+
+# Before a command: note the start time of the first command after a prompt
+_sugcommand_preexec() {{
+    [[ -n "$_sugcommand_at_prompt" ]] || return 0
+    _sugcommand_at_prompt=
+    _sugcommand_cmd_start="${{EPOCHREALTIME:-$(date +%s)}}"
+}}
+
+_sugcommand_set_status() {{
+    return "$1"
+}}
+
+# DEBUG trap without bash-preexec: our hook, then the trap that was set
+# before ours, with the previous command's exit status restored in $?
+_sugcommand_debug() {{
+    local status=$?
+    _sugcommand_preexec
+    [[ -n "$_sugcommand_prev_debug_trap" ]] || return 0
+    _sugcommand_set_status "$status"
+    eval "$_sugcommand_prev_debug_trap"
+}}
+
+# First PROMPT_COMMAND entry: report the command that just finished
+_sugcommand_precmd() {{
+    local exit_status=$?
+    local hist_num command
+    read -r hist_num command <<< "$(HISTTIMEFORMAT= builtin history 1)"
+    
+    if [[ -n "$_sugcommand_cmd_start" && "$hist_num" != "$_sugcommand_last_hist" ]]; then
+        _sugcommand_last_hist="$hist_num"
+        _sugcommand_record "$command" "$exit_status" "$_sugcommand_cmd_start" \\
+            "${{EPOCHREALTIME:-$(date +%s)}}" "$PWD"
+    fi
+    _sugcommand_cmd_start=
+    return $exit_status
+}}
+
+# Last PROMPT_COMMAND entry: the next DEBUG trap belongs to the user's command
+_sugcommand_arm() {{
+    _sugcommand_at_prompt=1
+}}
+
+# Hooks are installed from the first prompt rather than while this file is
+# sourced: bash hides the DEBUG trap from sourced files and functions, and
+# bash-preexec may be loaded after this file. The existing trap is read at the
+# top level of PROMPT_COMMAND, just before this runs.
+_sugcommand_install_command='_sugcommand_debug_trap="$(trap -p DEBUG)"; _sugcommand_install'
+_sugcommand_install() {{
+    PROMPT_COMMAND="${{PROMPT_COMMAND//"$_sugcommand_install_command"/:}}"
+    if [[ -n "${{bash_preexec_imported:-}}${{__bp_imported:-}}" ]]; then
+        # bash-preexec owns the DEBUG trap and PROMPT_COMMAND: register with it
+        precmd_functions=(_sugcommand_precmd "${{precmd_functions[@]}}" _sugcommand_arm)
+        preexec_functions+=(_sugcommand_preexec)
+    else
+        PROMPT_COMMAND="_sugcommand_precmd; ${{PROMPT_COMMAND:+$PROMPT_COMMAND; }}_sugcommand_arm"
+        # Chain onto an existing DEBUG trap (trap -p prints: trap -- 'command' DEBUG)
+        local -a debug_trap
+        eval "debug_trap=($_sugcommand_debug_trap)"
+        _sugcommand_prev_debug_trap="${{debug_trap[2]:-}}"
+        trap '_sugcommand_debug' DEBUG
+    fi
+    unset _sugcommand_debug_trap
+    _sugcommand_arm
+}}
+
+if [[ -z "$_sugcommand_hooks_installed" ]]; then
+    _sugcommand_hooks_installed=1
+    PROMPT_COMMAND="${{PROMPT_COMMAND:+$PROMPT_COMMAND; }}$_sugcommand_install_command"
+fi
+'''
+    
     def _generate_completion_script(self) -> str:
         """Generate bash completion script."""
+        from ..core.config_manager import ConfigManager
+        capture_hooks = self._generate_capture_hooks() if ConfigManager().is_live_capture_enabled() else ""
+        
         return f'''#!/bin/bash
 # SugCommand bash completion script
 # Generated automatically - do not edit manually
@@ -104,7 +192,7 @@ import json
 sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
 from sugcommand.integrations.realtime_daemon import DaemonClient
 client = DaemonClient()
-suggestions = client.get_suggestions('$current_command', timeout=0.5)
+suggestions = client.get_suggestions('$current_command', timeout=0.5, session='$$')
 for suggestion in suggestions[:5]:  # Limit to top 5
     print(suggestion['command'])
 " 2>/dev/null
@@ -234,6 +322,7 @@ if _sugcommand_daemon_available; then
     # bind -x '"\\C-_": _sugcommand_realtime_display'  # Ctrl+_
 fi
 
+{capture_hooks}
 # Export functions for use in subshells
 export -f _sugcommand_get_suggestions
 export -f _sugcommand_daemon_available
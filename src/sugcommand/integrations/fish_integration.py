@@ -49,8 +49,30 @@ class FishIntegration:
             logger.error(f"Failed to install fish integration: {e}")
             return False
     
+    def _generate_capture_hooks(self) -> str:
+        """Generate a postexec hook that pushes executed commands to the daemon."""
+        return f'''
+# Live history capture: report each executed command (with exit status,
+# duration and cwd) to the daemon, which spools it if it is not running.
+function __sugcommand_postexec --on-event fish_postexec
+    set -l exit_status $status
+    set -l end_time (date +%s)
+    set -l start_time (math "$end_time - $CMD_DURATION / 1000")
+    python3 -c "
+import sys
+sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
+from sugcommand.integrations.realtime_daemon import record_shell_command
+record_shell_command(sys.argv[1:])
+" "$argv[1]" "$exit_status" "$start_time" "$end_time" "$PWD" >/dev/null 2>&1 &
+    disown 2>/dev/null
+end
+'''
+    
     def _generate_completion_script(self) -> str:
         """Generate fish completion script."""
+        from ..core.config_manager import ConfigManager
+        capture_hooks = self._generate_capture_hooks() if ConfigManager().is_live_capture_enabled() else ""
+        
         return f'''# SugCommand fish completion script
 
 # Check if daemon is available
@@ -73,7 +95,7 @@ import sys
 sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
 from sugcommand.integrations.realtime_daemon import DaemonClient
 client = DaemonClient()
-suggestions = client.get_suggestions('$current_command', timeout=0.5)
+suggestions = client.get_suggestions('$current_command', timeout=0.5, session='$fish_pid')
 for suggestion in suggestions[:8]:
     print(suggestion['command'] + '\\t' + suggestion.get('description', ''))
 " 2>/dev/null
@@ -149,7 +171,7 @@ end
 
 # Bind Ctrl+X to show suggestions
 bind \\cx __sugcommand_show_suggestions
-'''
+{capture_hooks}'''
     
     def _show_install_instructions(self) -> None:
         """Show installation instructions."""
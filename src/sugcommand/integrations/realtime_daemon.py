@@ -7,20 +7,27 @@ through a Unix socket interface.
 
 import asyncio
 import json
+import math
+import multiprocessing
 import os
 import signal
 import socket
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Union
 import logging
 
-from ..core import SuggestionEngine, ConfigManager
-from ..utils.performance import timer
+from ..core import HistoryEntry, QueryResult, SuggestionEngine, SuggestionSession, ConfigManager
+from ..utils.performance import timer, get_memory_usage, get_monitor
 
 logger = logging.getLogger(__name__)
 
+# Commands recorded by shell hooks while the daemon is down
+SPOOL_FILENAME = "history_spool.jsonl"
+
 
 class RealtimeDaemon:
     """Realtime suggestion daemon for shell integration."""
@@ -39,6 +46,7 @@ class RealtimeDaemon:
         if socket_path is None:
             socket_path = self.config.config_dir / "daemon.sock"
         self.socket_path = socket_path
+        self.spool_path = self.config.config_dir / SPOOL_FILENAME
         
         # State
         self.server_socket: Optional[socket.socket] = None
@@ -49,9 +57,27 @@ class RealtimeDaemon:
         self.request_count = 0
         self.total_response_time = 0.0
         
+        # Background rebuilds
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.refresh_count = 0
+        self.last_refresh_duration: Optional[float] = None
+        
+        # Incremental keystroke sessions, one per shell, least recently used first
+        self.sessions: 'OrderedDict[str, SuggestionSession]' = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        
         # Warm up the engine
         logger.info("Warming up suggestion engine...")
+        memory_before = get_memory_usage()
         self.engine.warm_up()
+        self.memory_usage = get_memory_usage()
+        get_monitor().record_metric('daemon_memory_rss', self.memory_usage)
+        logger.info(
+            f"Daemon memory: {memory_before / 2**20:.1f} MiB before warm-up, "
+            f"{self.memory_usage / 2**20:.1f} MiB after"
+        )
+        self._drain_spool()
         logger.info("Daemon initialized")
     
     def start(self) -> None:
@@ -64,6 +90,8 @@ class RealtimeDaemon:
         self._setup_signal_handlers()
         
         self.running = True
+        self._stop_event.clear()
+        self._start_refresh_thread()
         logger.info(f"Starting daemon on {self.socket_path}")
         
         try:
@@ -82,6 +110,7 @@ class RealtimeDaemon:
         
         logger.info("Stopping daemon...")
         self.running = False
+        self._stop_event.set()
         
         # Close client connections
         for client in self.clients[:]:
@@ -101,6 +130,54 @@ class RealtimeDaemon:
         
         logger.info("Daemon stopped")
     
+    def _start_refresh_thread(self) -> None:
+        """Periodically rebuild suggestion data off the request path."""
+        interval = self.config.get('daemon_refresh_interval', 900)
+        if not interval or interval <= 0:
+            return
+        
+        # Requests keep using the current data until a rebuild is swapped in
+        self.engine.set_background_refresh(True)
+        
+        def refresh_loop():
+            while not self._stop_event.wait(interval):
+                self.refresh_models()
+        
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="sugcommand-refresh", daemon=True)
+        self._refresh_thread.start()
+    
+    def refresh_models(self) -> bool:
+        """
+        Rebuild the command index and history models and swap them in.
+        
+        The rebuild runs in a child process at idle CPU/IO priority so it does
+        not hold this process's GIL; only unpickling the result happens here.
+        
+        Returns:
+            True if new models were installed
+        """
+        start_time = time.time()
+        
+        if not self.config.get('daemon_refresh_in_child', True):
+            self.engine.refresh_data()
+        else:
+            try:
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                         initializer=_lower_priority) as executor:
+                    models = executor.submit(_build_models, str(self.config.config_dir)).result()
+            except Exception as e:
+                logger.warning(f"Out-of-process rebuild failed: {e}")
+                return False
+            
+            self.engine.install_models(models)
+        
+        self.refresh_count += 1
+        self.last_refresh_duration = time.time() - start_time
+        get_monitor().record_metric('daemon_refresh_time', self.last_refresh_duration)
+        logger.info(f"Rebuilt suggestion data in {self.last_refresh_duration:.2f}s")
+        return True
+    
     def _setup_socket(self) -> None:
         """Setup Unix socket server."""
         # Remove existing socket file
@@ -161,16 +238,18 @@ class RealtimeDaemon:
             while self.running:
                 try:
                     # Read request
-                    data = client_socket.recv(4096)
+                    data = self._receive_request(client_socket)
                     if not data:
                         break
                     
                     # Process request
                     response = self._process_request(data.decode('utf-8'))
                     
-                    # Send response
-                    response_data = json.dumps(response).encode('utf-8')
-                    client_socket.send(response_data + b'\n')
+                    # Send response; a streamed one is a line per update
+                    if isinstance(response, dict):
+                        response = [response]
+                    for message in response:
+                        client_socket.sendall(json.dumps(message).encode('utf-8') + b'\n')
                     
                 except socket.timeout:
                     # Client timeout
@@ -182,6 +261,25 @@ class RealtimeDaemon:
         finally:
             self._close_client(client_socket)
     
+    @staticmethod
+    def _receive_request(client_socket: socket.socket) -> bytes:
+        """
+        Read one request: up to a newline, or a complete JSON document for
+        clients that send a single unterminated message.
+        """
+        data = client_socket.recv(4096)
+        while data and not data.endswith(b'\n'):
+            try:
+                json.loads(data.decode('utf-8'))
+                break
+            except ValueError:
+                pass
+            chunk = client_socket.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        return data
+    
     def _close_client(self, client_socket: socket.socket) -> None:
         """Close client connection."""
         try:
@@ -192,13 +290,140 @@ class RealtimeDaemon:
         except Exception:
             pass
     
-    def _process_request(self, request_data: str) -> Dict:
-        """Process suggestion request."""
+    @staticmethod
+    def _record_entry(record: Dict) -> HistoryEntry:
+        """
+        Convert an executed-command record sent by a shell hook.
+        
+        Raises:
+            TypeError, ValueError: If a field has the wrong type, so a bad
+                client cannot put values into the history the models cannot compare
+        """
+        def number(field: str, convert):
+            value = record.get(field)
+            if value is None:
+                return None
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise TypeError(f"{field} must be a number")
+            value = convert(value)
+            if not math.isfinite(value):
+                raise ValueError(f"{field} must be finite")
+            return value
+        
+        command = record.get('command', '')
+        cwd = record.get('cwd')
+        if not isinstance(command, str):
+            raise TypeError("command must be a string")
+        if cwd is not None and not isinstance(cwd, str):
+            raise TypeError("cwd must be a string")
+        return HistoryEntry(
+            command=command,
+            timestamp=number('timestamp', float),
+            cwd=cwd,
+            exit_status=number('exit_status', int),
+            duration=number('duration', float)
+        )
+    
+    def _drain_spool(self) -> None:
+        """Apply commands spooled by shell hooks while the daemon was down."""
+        draining_path = self.spool_path.with_suffix('.draining')
+        
+        # Claim the spool atomically so hooks start a fresh one meanwhile
+        if self.spool_path.exists() and not draining_path.exists():
+            try:
+                os.replace(self.spool_path, draining_path)
+            except OSError as e:
+                logger.warning(f"Cannot claim history spool: {e}")
+                return
+        
+        if not draining_path.exists():
+            return
+        
+        entries = []
+        try:
+            with open(draining_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    try:
+                        entries.append(self._record_entry(json.loads(line)))
+                    except (ValueError, AttributeError, TypeError):
+                        # A bad line is skipped, not allowed to block the rest
+                        continue
+            # One snapshot publish for the whole spool
+            self.engine.record_commands(entries)
+            os.unlink(draining_path)
+        except OSError as e:
+            logger.warning(f"Failed to drain history spool: {e}")
+        
+        logger.info(f"Applied {len(entries)} spooled commands")
+    
+    def _get_session(self, session_id: str) -> SuggestionSession:
+        """Get (or start) the keystroke session of a shell, evicting the oldest when full."""
+        with self._sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.engine.create_session()
+                self.sessions[session_id] = session
+                max_sessions = max(self.config.get('daemon_max_sessions', 64), 1)
+                while len(self.sessions) > max_sessions:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session_id)
+            return session
+    
+    def _process_batch_request(self, request: Dict) -> Dict:
+        """Process a batch of inputs (replays, tuning) in one round trip."""
+        commands = request.get('commands')
+        if not isinstance(commands, list):
+            return {'results': [], 'error': 'No commands provided'}
+        
+        limit = request.get('limit', self.config.get_max_suggestions())
+        with timer('daemon_batch'):
+            batch = self.engine.get_suggestions_batch(
+                [str(command) for command in commands],
+                request.get('cwd'),
+                request.get('cwds')
+            )
+        
+        return {
+            'results': [
+                [suggestion.to_wire() for suggestion in suggestions[:limit]]
+                for suggestions in batch.suggestions
+            ],
+            'elapsed': batch.elapsed,
+            'qps': batch.qps,
+        }
+    
+    def _process_record_request(self, request: Dict) -> Dict:
+        """Process a command reported by a shell hook."""
+        command = request.get('command', '')
+        if not isinstance(command, str) or not command.strip():
+            return {'recorded': False, 'error': 'No command provided'}
+        
+        try:
+            entry = self._record_entry(request)
+        except (TypeError, ValueError) as e:
+            return {'recorded': False, 'error': str(e)}
+        
+        self.engine.record_commands([entry])
+        return {'recorded': True}
+    
+    def _process_request(self, request_data: str) -> Union[Dict, Iterator[Dict]]:
+        """Process suggestion request (a streaming one returns an iterator of responses)."""
         try:
             request = json.loads(request_data.strip())
-            command = request.get('command', '').strip()
             
-            if not command:
+            if request.get('type') == 'record':
+                return self._process_record_request(request)
+            
+            if request.get('type') == 'batch':
+                return self._process_batch_request(request)
+            
+            # Keep trailing whitespace: "git " asks for the next argument
+            command = request.get('command', '').lstrip()
+            cwd = request.get('cwd')
+            session_id = request.get('session')
+            
+            if not command.strip():
                 return {
                     'suggestions': [],
                     'error': 'No command provided'
@@ -211,41 +436,19 @@ class RealtimeDaemon:
                     'error': 'Suggestions disabled'
                 }
             
+            if request.get('stream'):
+                return self._stream_suggestions(command, cwd, session_id)
+            
             # Get suggestions with timing
             start_time = time.time()
             
             with timer('daemon_suggestion'):
-                suggestions = self.engine.get_suggestions(command)
-            
-            response_time = time.time() - start_time
-            
-            # Update stats
-            self.request_count += 1
-            self.total_response_time += response_time
-            
-            # Limit suggestions for fast response
-            max_suggestions = min(self.config.get_max_suggestions(), 10)
-            limited_suggestions = suggestions[:max_suggestions]
+                if session_id is not None:
+                    result = self._get_session(str(session_id)).query(command, cwd)
+                else:
+                    result = self.engine.query(command, cwd)
             
-            # Format suggestions for response
-            suggestion_data = []
-            for suggestion in limited_suggestions:
-                suggestion_data.append({
-                    'command': suggestion.command,
-                    'full_command': suggestion.full_command,
-                    'confidence': suggestion.confidence,
-                    'source': suggestion.source,
-                    'description': suggestion.description,
-                })
-            
-            return {
-                'suggestions': suggestion_data,
-                'response_time': response_time,
-                'stats': {
-                    'total_requests': self.request_count,
-                    'avg_response_time': self.total_response_time / self.request_count
-                }
-            }
+            return self._suggestion_response(result, time.time() - start_time)
             
         except json.JSONDecodeError:
             return {
@@ -259,6 +462,72 @@ class RealtimeDaemon:
                 'error': f'Internal error: {str(e)}'
             }
     
+    def _stream_suggestions(self, command: str, cwd: Optional[str], session_id: Optional[str]) -> Iterator[Dict]:
+        """
+        Answer a request progressively: one response per provisional ranking,
+        as sources finish, then the full response with 'final' set.
+        """
+        start_time = time.time()
+        max_suggestions = min(self.config.get_max_suggestions(), 10)
+        
+        if session_id is not None:
+            updates = self._get_session(str(session_id)).iter_suggestions(command, cwd)
+        else:
+            updates = self.engine.iter_suggestions(command, cwd)
+        
+        try:
+            for update in updates:
+                if update.final:
+                    response = self._suggestion_response(update.result, time.time() - start_time)
+                    response['final'] = True
+                    yield response
+                    return
+                yield {
+                    'suggestions': [suggestion.to_wire() for suggestion in update.suggestions[:max_suggestions]],
+                    'source': update.source,
+                    'elapsed_ms': round(update.elapsed * 1000, 3),
+                    'final': False,
+                }
+        except Exception as e:
+            logger.error(f"Error streaming suggestions: {e}")
+            yield {
+                'suggestions': [],
+                'error': f'Internal error: {str(e)}',
+                'final': True,
+            }
+    
+    def _suggestion_response(self, result: QueryResult, response_time: float) -> Dict:
+        """Count a finished query in the stats and build its response."""
+        # Update stats
+        self.request_count += 1
+        self.total_response_time += response_time
+        
+        # Limit suggestions for fast response
+        max_suggestions = min(self.config.get_max_suggestions(), 10)
+        limited_suggestions = result.suggestions[:max_suggestions]
+        
+        return {
+            'suggestions': [suggestion.to_wire() for suggestion in limited_suggestions],
+            'response_time': response_time,
+            'cached': result.cached,
+            'sources': {
+                name: {
+                    'time_ms': round(report.time_ms, 3),
+                    'suggestions': report.suggestions,
+                    'status': report.status,
+                }
+                for name, report in result.sources.items()
+            },
+            'stats': {
+                'total_requests': self.request_count,
+                'avg_response_time': self.total_response_time / self.request_count,
+                'memory_rss': self.memory_usage,
+                'refresh_count': self.refresh_count,
+                'last_refresh_duration': self.last_refresh_duration,
+                'active_sessions': len(self.sessions),
+            }
+        }
+    
     def is_running(self) -> bool:
         """Check if daemon is running."""
         if not self.socket_path.exists():
@@ -274,24 +543,35 @@ class RealtimeDaemon:
         except (socket.error, OSError):
             return False
     
-    def get_suggestions_sync(self, command: str) -> List[Dict]:
+    def get_suggestions_sync(self, command: str, cwd: Optional[str] = None) -> List[Dict]:
         """Get suggestions synchronously (for testing)."""
         if not self.config.is_enabled():
             return []
         
-        suggestions = self.engine.get_suggestions(command)
-        
-        result = []
-        for suggestion in suggestions:
-            result.append({
-                'command': suggestion.command,
-                'full_command': suggestion.full_command,
-                'confidence': suggestion.confidence,
-                'source': suggestion.source,
-                'description': suggestion.description,
-            })
+        suggestions = self.engine.get_suggestions(command, cwd)
         
-        return result
+        return [suggestion.to_wire() for suggestion in suggestions]
+
+
+def _lower_priority() -> None:
+    """Drop the current (rebuild) process to idle CPU and I/O priority."""
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+    
+    try:
+        import psutil
+        if hasattr(psutil, 'IOPRIO_CLASS_IDLE'):
+            psutil.Process().ionice(psutil.IOPRIO_CLASS_IDLE)
+    except Exception:
+        pass
+
+
+def _build_models(config_dir: str) -> Dict[str, Any]:
+    """Build fresh suggestion data in a child process (pickled back to the daemon)."""
+    engine = SuggestionEngine(ConfigManager(Path(config_dir)))
+    return engine.export_models()
 
 
 class DaemonClient:
@@ -304,11 +584,31 @@ class DaemonClient:
             socket_path = config.config_dir / "daemon.sock"
         self.socket_path = socket_path
     
-    def get_suggestions(self, command: str, timeout: float = 5.0) -> List[Dict]:
-        """Get suggestions from daemon."""
+    def get_suggestions(self,
+                        command: str,
+                        timeout: float = 5.0,
+                        cwd: Optional[str] = None,
+                        session: Optional[str] = None) -> List[Dict]:
+        """
+        Get suggestions from daemon.
+        
+        Args:
+            command: Current command line input
+            timeout: Socket timeout in seconds
+            cwd: Working directory (defaults to the current one)
+            session: Id of the typing shell (e.g. its PID); consecutive
+                keystrokes with the same id are answered incrementally
+        """
         if not self.is_daemon_running():
             return []
         
+        if cwd is None:
+            # Shell hooks run the client in the shell's own working directory
+            try:
+                cwd = os.getcwd()
+            except OSError:
+                cwd = None
+        
         try:
             # Connect to daemon
             client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
@@ -316,7 +616,9 @@ class DaemonClient:
             client_socket.connect(str(self.socket_path))
             
             # Send request
-            request = {'command': command}
+            request = {'command': command, 'cwd': cwd}
+            if session is not None:
+                request['session'] = str(session)
             request_data = json.dumps(request).encode('utf-8')
             client_socket.send(request_data)
             
@@ -337,6 +639,155 @@ class DaemonClient:
             logger.debug(f"Error communicating with daemon: {e}")
             return []
     
+    def iter_suggestions(self,
+                         command: str,
+                         timeout: float = 5.0,
+                         cwd: Optional[str] = None,
+                         session: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream suggestions from the daemon as its sources finish.
+        
+        Args:
+            command: Current command line input
+            timeout: Socket timeout in seconds
+            cwd: Working directory (defaults to the current one)
+            session: Id of the typing shell, as for get_suggestions()
+            
+        Yields:
+            Responses with 'suggestions' and 'final'; provisional ones also
+            name the 'source' that changed the ranking, the last one is the
+            full response of get_suggestions()
+        """
+        if cwd is None:
+            try:
+                cwd = os.getcwd()
+            except OSError:
+                cwd = None
+        
+        request: Dict[str, Any] = {'command': command, 'cwd': cwd, 'stream': True}
+        if session is not None:
+            request['session'] = str(session)
+        
+        try:
+            client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client_socket.settimeout(timeout)
+            client_socket.connect(str(self.socket_path))
+        except (socket.error, OSError) as e:
+            logger.debug(f"Error communicating with daemon: {e}")
+            return
+        
+        try:
+            client_socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            
+            buffer = b''
+            while True:
+                chunk = client_socket.recv(65536)
+                if not chunk:
+                    return
+                buffer += chunk
+                while b'\n' in buffer:
+                    line, buffer = buffer.split(b'\n', 1)
+                    response = json.loads(line.decode('utf-8'))
+                    if 'error' in response:
+                        logger.warning(f"Daemon error: {response['error']}")
+                    yield response
+                    if response.get('final', True):
+                        return
+        except Exception as e:
+            logger.debug(f"Error communicating with daemon: {e}")
+        finally:
+            client_socket.close()
+    
+    def get_suggestions_batch(self,
+                              commands: List[str],
+                              timeout: float = 60.0,
+                              cwd: Optional[str] = None,
+                              limit: Optional[int] = None) -> Optional[Dict]:
+        """
+        Get suggestions for many inputs in one round trip.
+        
+        Args:
+            commands: Command line inputs
+            timeout: Socket timeout in seconds
+            cwd: Working directory for every input
+            limit: Suggestions kept per input (defaults to max_suggestions)
+            
+        Returns:
+            Response with 'results' (one list per input), 'elapsed' and 'qps',
+            or None if the daemon could not be reached
+        """
+        request: Dict[str, Any] = {'type': 'batch', 'commands': list(commands), 'cwd': cwd}
+        if limit is not None:
+            request['limit'] = limit
+        
+        try:
+            client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client_socket.settimeout(timeout)
+            client_socket.connect(str(self.socket_path))
+            client_socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            
+            # Read up to the newline that ends the response
+            response_data = b''
+            while not response_data.endswith(b'\n'):
+                chunk = client_socket.recv(65536)
+                if not chunk:
+                    break
+                response_data += chunk
+            client_socket.close()
+            
+            response = json.loads(response_data.decode('utf-8'))
+            if 'error' in response:
+                logger.warning(f"Daemon error: {response['error']}")
+            return response
+            
+        except Exception as e:
+            logger.debug(f"Error communicating with daemon: {e}")
+            return None
+    
+    def record_command(self,
+                       command: str,
+                       exit_status: Optional[int] = None,
+                       duration: Optional[float] = None,
+                       cwd: Optional[str] = None,
+                       timestamp: Optional[float] = None,
+                       timeout: float = 0.5) -> bool:
+        """
+        Report an executed command to the daemon, spooling it if the daemon is down.
+        
+        Returns:
+            True if the daemon received it, False if it was spooled
+        """
+        record = {
+            'type': 'record',
+            'command': command,
+            'exit_status': exit_status,
+            'duration': duration,
+            'cwd': cwd,
+            'timestamp': timestamp if timestamp is not None else time.time(),
+        }
+        
+        try:
+            client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client_socket.settimeout(timeout)
+            client_socket.connect(str(self.socket_path))
+            client_socket.send(json.dumps(record).encode('utf-8'))
+            response = json.loads(client_socket.recv(4096).decode('utf-8'))
+            client_socket.close()
+            if response.get('recorded'):
+                return True
+        except Exception as e:
+            logger.debug(f"Daemon unavailable, spooling command: {e}")
+        
+        try:
+            spool_path = self.socket_path.parent / SPOOL_FILENAME
+            spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(spool_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            logger.debug(f"Failed to spool command: {e}")
+        
+        return False
+    
     def is_daemon_running(self) -> bool:
         """Check if daemon is running."""
         if not self.socket_path.exists():
@@ -349,4 +800,34 @@ class DaemonClient:
             test_socket.close()
             return True
         except (socket.error, OSError):
-            return False 
\ No newline at end of file
+            return False 
+
+def record_shell_command(argv: List[str]) -> None:
+    """
+    Entry point for shell hooks: record one executed command.
+    
+    Args:
+        argv: [command, exit_status, start_time, end_time, cwd] as strings;
+              times are epoch seconds and may be empty when unavailable
+    """
+    def _number(value: str) -> Optional[float]:
+        try:
+            return float(value.replace(',', '.'))
+        except (AttributeError, ValueError):
+            return None
+    
+    command, exit_status, start_time, end_time, cwd = (list(argv) + [''] * 5)[:5]
+    if not command.strip():
+        return
+    
+    status = _number(exit_status)
+    start = _number(start_time)
+    end = _number(end_time)
+    
+    DaemonClient().record_command(
+        command,
+        exit_status=int(status) if status is not None else None,
+        duration=end - start if start is not None and end is not None else None,
+        cwd=cwd or None,
+        timestamp=end
+    )
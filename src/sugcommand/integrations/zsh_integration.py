@@ -45,8 +45,46 @@ class ZshIntegration:
             logger.error(f"Failed to install zsh integration: {e}")
             return False
     
+    def _generate_capture_hooks(self) -> str:
+        """Generate preexec/precmd hooks that push executed commands to the daemon."""
+        return f'''
+# Live history capture: report each executed command (with exit status,
+# duration and cwd) to the daemon, which spools it if it is not running.
+zmodload zsh/datetime 2>/dev/null
+autoload -Uz add-zsh-hook
+
+_sugcommand_record() {{
+    python3 -c "
+import sys
+sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
+from sugcommand.integrations.realtime_daemon import record_shell_command
+record_shell_command(sys.argv[1:])
+" "$@" >/dev/null 2>&1 &!
+}}
+
+_sugcommand_preexec() {{
+    _sugcommand_cmd="$1"
+    _sugcommand_cmd_start="$EPOCHREALTIME"
+}}
+
+_sugcommand_precmd() {{
+    local exit_status=$?
+    if [[ -n "$_sugcommand_cmd" ]]; then
+        _sugcommand_record "$_sugcommand_cmd" "$exit_status" "$_sugcommand_cmd_start" \\
+            "$EPOCHREALTIME" "$PWD"
+    fi
+    _sugcommand_cmd=
+}}
+
+add-zsh-hook preexec _sugcommand_preexec
+add-zsh-hook precmd _sugcommand_precmd
+'''
+    
     def _generate_completion_script(self) -> str:
         """Generate zsh completion script."""
+        from ..core.config_manager import ConfigManager
+        capture_hooks = self._generate_capture_hooks() if ConfigManager().is_live_capture_enabled() else ""
+        
         return f'''#!/bin/zsh
 # SugCommand zsh completion script
 
@@ -70,7 +108,7 @@ import sys
 sys.path.insert(0, '{Path(__file__).parent.parent.parent}')
 from sugcommand.integrations.realtime_daemon import DaemonClient
 client = DaemonClient()
-suggestions = client.get_suggestions('$current_command', timeout=0.5)
+suggestions = client.get_suggestions('$current_command', timeout=0.5, session='$$')
 for suggestion in suggestions[:8]:
     print(suggestion['command'] + ':' + suggestion.get('description', ''))
 " 2>/dev/null
@@ -151,7 +189,7 @@ if _sugcommand_daemon_available; then
         fi
     done
 fi
-'''
+{capture_hooks}'''
     
     def _show_install_instructions(self) -> None:
         """Show installation instructions."""
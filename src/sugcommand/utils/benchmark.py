@@ -0,0 +1,237 @@
+"""
+Offline benchmark utilities.
+
+Replays a shell history file against a suggestion engine to measure how fast
+and how good suggestions are. The history is split chronologically: the engine
+learns from the older part only, then the newer commands are typed into it one
+keystroke at a time, the way a shell integration would send them.
+"""
+
+import math
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+from ..core.config_manager import ConfigManager
+from ..core.history_analyzer import HistoryAnalyzer, HistoryEntry
+from ..core.suggestion_engine import SuggestionEngine
+
+logger = logging.getLogger(__name__)
+
+# Positions checked for hit@k
+HIT_RANKS = (1, 5)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Get a percentile of already sorted values (nearest rank).
+
+    Args:
+        sorted_values: Values in ascending order
+        q: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for no values
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def load_history(history_file: Path) -> List[HistoryEntry]:
+    """
+    Read a bash, zsh or fish history file in chronological order.
+
+    Args:
+        history_file: History file (may be .gz)
+
+    Returns:
+        Entries with timestamps, untimed ones spaced back from the next known one
+    """
+    entries = HistoryAnalyzer._parse_history_file(Path(history_file))
+    entries = HistoryAnalyzer._fill_missing_timestamps(entries, time.time())
+    # Stable, so commands sharing a timestamp keep their file order
+    return sorted(entries, key=lambda entry: entry.timestamp)
+
+
+def _write_bash_history(entries: Sequence[HistoryEntry], file_path: Path) -> None:
+    """Write entries as a timestamped bash history file."""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(f"#{int(entry.timestamp)}\n{entry.command}\n")
+
+
+def normalize_command(command: str) -> str:
+    """Collapse whitespace so suggestions and typed commands compare equal."""
+    return " ".join(command.split())
+
+
+def split_history(history_file: Path,
+                  train_fraction: float = 0.8,
+                  limit: Optional[int] = None) -> Tuple[List[HistoryEntry], List[HistoryEntry]]:
+    """
+    Split a history file chronologically into training and test commands.
+
+    Args:
+        history_file: History file to split
+        train_fraction: Share of the history, oldest first, used for training
+        limit: Maximum number of test commands
+
+    Returns:
+        (training entries, test entries)
+    """
+    if not 0.0 < train_fraction < 1.0:
+        raise ValueError("train_fraction must be between 0 and 1")
+
+    entries = [entry for entry in load_history(history_file) if entry.command.strip()]
+    split = int(len(entries) * train_fraction)
+    train, test = entries[:split], entries[split:]
+    if limit is not None:
+        test = test[:limit]
+    return train, test
+
+
+@contextmanager
+def trained_engine(train: Sequence[HistoryEntry],
+                   config_manager: Optional[ConfigManager] = None) -> Iterator[SuggestionEngine]:
+    """
+    Create an engine whose history is the training commands only.
+
+    The commands go through the normal history ingest, never mixed with the
+    user's own history; the engine stops re-reading history while in use and
+    publishes recorded commands immediately.
+
+    Args:
+        train: Training entries, oldest first
+        config_manager: Configuration for the engine (defaults to the user's)
+
+    Yields:
+        The trained engine
+    """
+    engine = SuggestionEngine(config_manager)
+    with tempfile.TemporaryDirectory(prefix='sugcommand-bench-') as tmp_dir:
+        if engine.history_analyzer:
+            train_file = Path(tmp_dir) / 'bash_history'
+            _write_bash_history(train, train_file)
+            analyzer = engine.history_analyzer
+            analyzer.history_files = [train_file]
+            analyzer.history_sources = []
+            analyzer.analyze_history(force_refresh=True)
+            analyzer.auto_refresh = False
+            # Every replayed command is visible to the next one's keystrokes
+            analyzer.live_publish_interval = 0
+        if engine.command_scanner:
+            engine.command_scanner.scan_commands()
+        yield engine
+
+
+def replay_history(history_file: Path,
+                   config_manager: Optional[ConfigManager] = None,
+                   train_fraction: float = 0.8,
+                   limit: Optional[int] = None,
+                   cwd: Optional[str] = None,
+                   learn: bool = True) -> Dict[str, Any]:
+    """
+    Train an engine on the start of a history file and replay the rest.
+
+    Every test command is typed one character at a time into a fresh session,
+    which is what the latency figures time: with parallel sources, a source
+    missing the deadline is dropped from that answer and counted as late.
+    Accuracy does not depend on that race: the same keystrokes are answered
+    again as a batch, which reuses the complete (cached) answers and
+    recomputes the ones a late source cut short with sources run serially and
+    no deadline, as get_suggestions_batch() does.
+
+    A keystroke hits at k when the command appears among the first k
+    suggestions. Keystrokes saved counts the characters left to type once the
+    command is the top suggestion, less one keystroke to accept it.
+
+    Args:
+        history_file: History file to replay
+        config_manager: Configuration for the engine (defaults to the user's)
+        train_fraction: Share of the history, oldest first, used for training
+        limit: Maximum number of test commands to replay
+        cwd: Working directory reported with every keystroke
+        learn: Record each replayed command afterwards, as shell hooks do
+
+    Returns:
+        Dictionary with command counts, latency percentiles (milliseconds),
+        the source deadline and late sources, hit rates and keystrokes saved
+    """
+    train, test = split_history(history_file, train_fraction, limit)
+
+    with trained_engine(train, config_manager) as engine:
+        config = engine.config.snapshot()
+        latencies: List[float] = []
+        late: Dict[str, int] = {}
+        late_keystrokes = 0
+        hits = {k: 0 for k in HIT_RANKS}
+        cached = 0
+        typed = 0
+        saved = 0
+
+        for entry in test:
+            target = normalize_command(entry.command)
+            prefixes = [target[:length] for length in range(1, len(target) + 1)]
+            session = engine.create_session()
+            accepted_at = None
+
+            for prefix in prefixes:
+                start_time = time.perf_counter()
+                result = session.query(prefix, cwd)
+                latencies.append((time.perf_counter() - start_time) * 1000)
+                cached += result.cached
+
+                dropped = [name for name, report in result.sources.items() if report.status == 'late']
+                late_keystrokes += bool(dropped)
+                for name in dropped:
+                    late[name] = late.get(name, 0) + 1
+
+            # Answers missing a late source are not cached, so only those are recomputed
+            batch = engine.get_suggestions_batch(prefixes, cwd=cwd)
+            for length, suggestions in enumerate(batch.suggestions, 1):
+                ranked = [normalize_command(s.full_command or s.command) for s in suggestions]
+                for k in HIT_RANKS:
+                    if target in ranked[:k]:
+                        hits[k] += 1
+                if accepted_at is None and ranked[:1] == [target]:
+                    accepted_at = length
+
+            typed += len(target)
+            if accepted_at is not None:
+                saved += max(len(target) - accepted_at - 1, 0)
+
+            if learn:
+                engine.record_command(entry.command, cwd=cwd, timestamp=entry.timestamp)
+
+    keystrokes = len(latencies)
+    latencies.sort()
+    report = {
+        'history_file': str(history_file),
+        'train_commands': len(train),
+        'test_commands': len(test),
+        'keystrokes': keystrokes,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / keystrokes if keystrokes else 0.0,
+            'max': latencies[-1] if latencies else 0.0,
+        },
+        'parallel_sources': config.parallel_sources,
+        'source_deadline_ms': config.source_deadline_ms,
+        'late_keystrokes': late_keystrokes,
+        'late_sources': late,
+        'cached_ratio': cached / keystrokes if keystrokes else 0.0,
+        'keystrokes_saved': saved,
+        'keystrokes_saved_ratio': saved / typed if typed else 0.0,
+    }
+    for k in HIT_RANKS:
+        report[f'hit@{k}'] = hits[k] / keystrokes if keystrokes else 0.0
+
+    logger.info(f"Replayed {len(test)} commands ({keystrokes} keystrokes) from {history_file}")
+    return report
@@ -218,9 +218,13 @@ class SuggestionFormatter:
             'command_scanner': '📋',
             'history_exact': '🎯',
             'history_partial': '📚',
-            'frequent_commands': '⭐',
-            'recent_commands': '🕒',
+            'frecency': '⭐',
             'sequential': '🔗',
+            'arguments': '🧩',
+            'flags': '🚩',
+            'directory': '📁',
+            'pipe': '🚰',
+            'path': '📄',
         }
         
         icon = source_map.get(source, '💡')
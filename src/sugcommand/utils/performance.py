@@ -2,6 +2,8 @@
 Performance monitoring utilities.
 """
 
+import os
+import sys
 import time
 import threading
 from typing import Dict, List, Optional
@@ -24,7 +26,8 @@ class PerformanceMonitor:
         self.max_samples = max_samples
         self._metrics: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
         self._counters: Dict[str, int] = defaultdict(int)
-        self._lock = threading.Lock()
+        # Reentrant: get_all_stats() calls get_metric_stats() while holding it
+        self._lock = threading.RLock()
         
         # Active timers
         self._active_timers: Dict[str, float] = {}
@@ -146,6 +149,11 @@ def record_suggestion_time(duration: float) -> None:
     _global_monitor.record_metric('suggestion_time', duration)
 
 
+def record_batch_throughput(qps: float) -> None:
+    """Record the throughput of a batch of suggestion queries."""
+    _global_monitor.record_metric('batch_qps', qps)
+
+
 def record_scan_time(duration: float) -> None:
     """Record time taken to scan commands."""
     _global_monitor.record_metric('command_scan_time', duration)
@@ -171,6 +179,30 @@ def increment_cache_misses() -> None:
     _global_monitor.increment_counter('cache_misses')
 
 
+def get_memory_usage() -> int:
+    """Get the resident set size of this process in bytes (0 if unavailable)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
 def get_performance_summary() -> Dict[str, any]:
     """Get a summary of performance metrics."""
     stats = _global_monitor.get_all_stats()
@@ -0,0 +1,360 @@
+"""
+Ranking weight tuning.
+
+Fits the ranking weights to the user's own history: the newer part of a
+history file is replayed against an engine trained on the older part, every
+keystroke's candidates are recorded with their per-source feature values,
+and the weights are then improved by coordinate ascent on the mean
+reciprocal rank of the command that was actually typed. Scoring all recorded
+keystrokes for one weight vector is a handful of NumPy array operations, so
+the search never re-runs a source.
+
+The fitted values are plain configuration settings, so the tuned ranking
+costs nothing extra per request.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from ..core.config_manager import ConfigManager, ConfigSnapshot
+from ..core.history_store import NUMPY_AVAILABLE, np
+from ..core.sources import QueryContext
+from ..core.suggestion_engine import SuggestionEngine
+from .benchmark import normalize_command, split_history, trained_engine
+
+logger = logging.getLogger(__name__)
+
+# Multiplicative step sizes tried by coordinate ascent, coarse to fine
+ASCENT_STEPS = (1.0, 0.5, 0.25, 0.1)
+# Weights are kept within this range; a fitted weight never switches a source off
+MIN_WEIGHT = 0.1
+MAX_WEIGHT = 4.0
+# Reciprocal rank is counted down to this position
+RANK_CUTOFF = 5
+
+# History feature columns, weighted inside the history source
+HISTORY_FEATURES = ('history_exact', 'history_partial', 'history_sequence')
+HISTORY_SETTINGS = ('history_exact_weight', 'history_partial_weight', 'history_sequence_weight')
+
+
+class RankingDataset:
+    """Candidates and their feature values for every replayed keystroke."""
+
+    def __init__(self, features: Sequence[str], values: Any, counts: Any, targets: Any, keystrokes: int):
+        """
+        Initialize RankingDataset.
+
+        Args:
+            features: Feature names, one per column
+            values: Array (keystrokes, candidates, features), rows in insertion order
+            counts: Number of real candidates per keystroke; the rest is padding
+            targets: Row of the typed command, per keystroke
+            keystrokes: Keystrokes replayed, including those without the command among the candidates
+        """
+        self.features = tuple(features)
+        self.values = values
+        self.targets = targets
+        self.keystrokes = keystrokes
+        # Padding rows score below any real candidate
+        self.padding = np.arange(values.shape[1])[None, :] >= counts[:, None]
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+
+class RankingModel:
+    """The engine's scoring as a function of the tunable weights."""
+
+    def __init__(self, features: Sequence[str], config: ConfigSnapshot):
+        """
+        Initialize RankingModel.
+
+        Args:
+            features: Dataset feature names
+            config: Configuration the dataset was recorded with
+        """
+        self.features = tuple(features)
+        self.min_confidence = config.min_confidence
+        self.source_weights = dict(config.source_weights)
+        self._history = [self.features.index(name) for name in HISTORY_FEATURES]
+        self._sequential = self.features.index('sequential') if 'sequential' in self.features else None
+        self._linear = [
+            index for index, name in enumerate(self.features)
+            if name not in HISTORY_FEATURES and index != self._sequential
+        ]
+
+    def initial_weights(self, config: ConfigSnapshot) -> Any:
+        """Get the weight vector of a configuration."""
+        theta = np.ones(len(self.features))
+        for index, setting in zip(self._history, HISTORY_SETTINGS):
+            theta[index] = getattr(config, setting)
+        if self._sequential is not None:
+            theta[self._sequential] = config.sequential_weight
+        for index in self._linear:
+            theta[index] = self.source_weights.get(self.features[index], 1.0)
+        return theta
+
+    def scores(self, dataset: RankingDataset, theta: Any) -> Any:
+        """
+        Score every candidate of every keystroke.
+
+        Mirrors the engine: the history source caps and filters its combined
+        confidence, the sequential source caps its own, and the merged score
+        is the source-weighted sum capped at 1.
+
+        Args:
+            dataset: Recorded keystrokes
+            theta: Weight per feature
+
+        Returns:
+            Array (keystrokes, candidates), padding rows at -1
+        """
+        values = dataset.values
+        history = np.minimum(values[..., self._history] @ theta[self._history], 1.0)
+        history = np.where(history >= self.min_confidence, history, 0.0)
+        total = history * self.source_weights.get('history', 1.0)
+        if self._sequential is not None:
+            sequential = np.minimum(values[..., self._sequential] * theta[self._sequential], 1.0)
+            total = total + sequential * self.source_weights.get('sequential', 1.0)
+        if self._linear:
+            total = total + values[..., self._linear] @ theta[self._linear]
+        return np.where(dataset.padding, -1.0, np.minimum(total, 1.0))
+
+    def settings(self, theta: Any) -> Dict[str, Any]:
+        """Get the configuration settings of a weight vector."""
+        settings: Dict[str, Any] = {
+            setting: round(float(theta[index]), 3)
+            for index, setting in zip(self._history, HISTORY_SETTINGS)
+        }
+        if self._sequential is not None:
+            settings['sequential_weight'] = round(float(theta[self._sequential]), 3)
+        source_weights = dict(self.source_weights)
+        for index in self._linear:
+            source_weights[self.features[index]] = round(float(theta[index]), 3)
+        settings['source_weights'] = source_weights
+        return settings
+
+
+def target_ranks(scores: Any, targets: Any) -> Any:
+    """
+    Get the rank (1 = top) of each keystroke's typed command.
+
+    Ties go to the earlier candidate, as in the engine.
+
+    Args:
+        scores: Array (keystrokes, candidates)
+        targets: Row of the typed command, per keystroke
+    """
+    target_scores = scores[np.arange(len(targets)), targets][:, None]
+    earlier = np.arange(scores.shape[1])[None, :] < targets[:, None]
+    return 1 + (scores > target_scores).sum(axis=1) + ((scores == target_scores) & earlier).sum(axis=1)
+
+
+def ranking_metrics(ranks: Any, keystrokes: int) -> Dict[str, float]:
+    """
+    Summarize target ranks.
+
+    Args:
+        ranks: Output of target_ranks()
+        keystrokes: All replayed keystrokes (misses count as rank infinity)
+
+    Returns:
+        Dictionary with mrr@5, hit@1 and hit@5 over all keystrokes
+    """
+    if not keystrokes:
+        return {'mrr@5': 0.0, 'hit@1': 0.0, 'hit@5': 0.0}
+    return {
+        'mrr@5': float(np.where(ranks <= RANK_CUTOFF, 1.0 / ranks, 0.0).sum()) / keystrokes,
+        'hit@1': float((ranks == 1).sum()) / keystrokes,
+        'hit@5': float((ranks <= RANK_CUTOFF).sum()) / keystrokes,
+    }
+
+
+def coordinate_ascent(objective: Callable[[Any], float], theta: Any) -> Tuple[Any, float]:
+    """
+    Maximize an objective one weight at a time.
+
+    Each weight is scaled up and down by the current step and every strict
+    improvement is kept; once no weight improves, the step is refined.
+    Weights stay within MIN_WEIGHT and MAX_WEIGHT.
+
+    Args:
+        objective: Function of the weight vector to maximize
+        theta: Starting weights
+
+    Returns:
+        (best weights, objective value)
+    """
+    theta = np.array(theta, dtype=float)
+    best = objective(theta)
+
+    for step in ASCENT_STEPS:
+        improved = True
+        while improved:
+            improved = False
+            for index in range(len(theta)):
+                current = theta[index]
+                for candidate in (current * (1 + step), current / (1 + step)):
+                    candidate = min(max(candidate, MIN_WEIGHT), MAX_WEIGHT)
+                    if candidate == theta[index]:
+                        continue
+                    trial = theta.copy()
+                    trial[index] = candidate
+                    value = objective(trial)
+                    if value > best + 1e-12:
+                        best, theta, improved = value, trial, True
+
+    return theta, best
+
+
+def _history_variants(config: ConfigSnapshot) -> List[ConfigSnapshot]:
+    """Configurations isolating each history feature, unfiltered."""
+    variants = []
+    for setting in HISTORY_SETTINGS:
+        weights = {name: 1.0 if name == setting else 0.0 for name in HISTORY_SETTINGS}
+        variants.append(config._replace(min_confidence=0.0, **weights))
+    return variants
+
+
+def collect_dataset(engine: SuggestionEngine,
+                    commands: Sequence[Any],
+                    cwd: Optional[str] = None,
+                    learn: bool = True) -> RankingDataset:
+    """
+    Replay commands keystroke by keystroke and record every source's candidates.
+
+    Every source runs for every keystroke (no early termination or deadline),
+    since which sources could be skipped depends on the weights being fitted.
+
+    Args:
+        engine: Engine trained on the older history
+        commands: Test history entries, oldest first
+        cwd: Working directory reported with every keystroke
+        learn: Record each replayed command afterwards, as shell hooks do
+
+    Returns:
+        RankingDataset of the keystrokes whose command was among the candidates
+    """
+    config = engine.config.snapshot()
+    history_variants = _history_variants(config)
+    sequential_config = config._replace(sequential_weight=1.0)
+
+    sources = [source for source in engine.sources.ordered() if source.name != 'history']
+    features = list(HISTORY_FEATURES) + [source.name for source in sources]
+    columns = {name: index for index, name in enumerate(features)}
+    history_source = engine.sources.get('history')
+    # Keep the engine's candidate order: history at its place in the cost order
+    order = [source.name for source in engine.sources.ordered()]
+
+    keystroke_rows: List[Dict[str, List[float]]] = []
+    targets: List[int] = []
+    keystrokes = 0
+
+    for entry in commands:
+        target = normalize_command(entry.command)
+        pool = None
+        for length in range(1, len(target) + 1):
+            input_text = engine._normalize_input(target[:length])
+            if not input_text.strip():
+                continue
+            keystrokes += 1
+            rows: Dict[str, List[float]] = {}
+
+            def add(column: str, suggestions: Sequence[Any]) -> None:
+                index = columns[column]
+                for suggestion in suggestions:
+                    key = normalize_command(suggestion.full_command or suggestion.command)
+                    row = rows.setdefault(key, [0.0] * len(features))
+                    row[index] += suggestion.confidence
+
+            context = QueryContext(input_text, config, cwd, pool)
+            for name in order:
+                try:
+                    if name == 'history':
+                        for column, variant in zip(HISTORY_FEATURES, history_variants):
+                            add(column, history_source.fetch(QueryContext(input_text, variant, cwd)))
+                    elif name == 'sequential':
+                        add(name, engine.sources.get(name).fetch(QueryContext(input_text, sequential_config, cwd)))
+                    else:
+                        add(name, engine.sources.get(name).fetch(context))
+                except Exception as e:
+                    logger.warning(f"Suggestion source {name} failed during tuning: {e}")
+            pool = context.matched
+
+            if target in rows:
+                keys = list(rows)
+                targets.append(keys.index(target))
+                keystroke_rows.append(rows)
+
+        if learn:
+            engine.record_command(entry.command, cwd=cwd, timestamp=entry.timestamp)
+
+    width = max((len(rows) for rows in keystroke_rows), default=1)
+    values = np.zeros((len(keystroke_rows), width, len(features)))
+    for index, rows in enumerate(keystroke_rows):
+        values[index, :len(rows)] = list(rows.values())
+
+    counts = np.asarray([len(rows) for rows in keystroke_rows], dtype=int)
+    return RankingDataset(features, values, counts, np.asarray(targets, dtype=int), keystrokes)
+
+
+def tune_weights(history_file: Path,
+                 config_manager: Optional[ConfigManager] = None,
+                 train_fraction: float = 0.8,
+                 limit: Optional[int] = None,
+                 cwd: Optional[str] = None,
+                 learn: bool = True,
+                 apply: bool = True) -> Dict[str, Any]:
+    """
+    Fit the ranking weights to a history file and optionally save them.
+
+    Args:
+        history_file: History file to replay
+        config_manager: Configuration to start from and write to (defaults to the user's)
+        train_fraction: Share of the history, oldest first, the engine learns from
+        limit: Maximum number of commands to replay for fitting
+        cwd: Working directory reported with every keystroke
+        learn: Record each replayed command afterwards, as shell hooks do
+        apply: Write the fitted weights into the configuration
+
+    Returns:
+        Dictionary with the fitted settings and the ranking metrics before and after
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("Weight tuning requires numpy")
+
+    config_manager = config_manager or ConfigManager()
+    train, test = split_history(history_file, train_fraction, limit)
+
+    with trained_engine(train, config_manager) as engine:
+        config = engine.config.snapshot()
+        dataset = collect_dataset(engine, test, cwd, learn)
+
+    model = RankingModel(dataset.features, config)
+    initial = model.initial_weights(config)
+
+    def objective(theta: Any) -> float:
+        return ranking_metrics(target_ranks(model.scores(dataset, theta), dataset.targets),
+                               dataset.keystrokes)['mrr@5']
+
+    before = ranking_metrics(target_ranks(model.scores(dataset, initial), dataset.targets), dataset.keystrokes)
+    theta, _ = coordinate_ascent(objective, initial) if len(dataset) else (initial, 0.0)
+    after = ranking_metrics(target_ranks(model.scores(dataset, theta), dataset.targets), dataset.keystrokes)
+
+    settings = model.settings(theta)
+    if apply:
+        config_manager.update(settings)
+        logger.info(f"Saved tuned ranking weights: {settings}")
+
+    return {
+        'history_file': str(history_file),
+        'train_commands': len(train),
+        'test_commands': len(test),
+        'keystrokes': dataset.keystrokes,
+        'covered_keystrokes': len(dataset),
+        'before': before,
+        'after': after,
+        'settings': settings,
+        'applied': apply,
+    }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import random
+import sys
+from collections import Counter
+from itertools import combinations
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core.flag_miner import FlagMiner, _mine_fp_tree
+
+
+def brute_force_itemsets(transactions, min_support, max_size):
+    """Count every flag subset directly"""
+    support = Counter()
+    for items, count in transactions:
+        for size in range(1, min(len(items), max_size) + 1):
+            for subset in combinations(sorted(items), size):
+                support[frozenset(subset)] += count
+    return {itemset: count for itemset, count in support.items() if count >= min_support}
+
+
+def test_fp_growth_matches_brute_force():
+    """FP-growth finds exactly the frequent itemsets and their support"""
+    rng = random.Random(7)
+    flags = ['-a', '-v', '-z', '-P', '--delete', '-n', '-r', '-h']
+
+    for _ in range(50):
+        transactions = [
+            (rng.sample(flags, rng.randint(1, 5)), rng.randint(1, 3))
+            for _ in range(rng.randint(1, 40))
+        ]
+        min_support = rng.randint(1, 6)
+        max_size = rng.randint(1, 4)
+
+        mined = {}
+        _mine_fp_tree(transactions, (), min_support, len(flags), max_size, mined)
+
+        assert mined == brute_force_itemsets(transactions, min_support, max_size)
+
+
+def test_extract_flags():
+    """Only dash tokens after the command count as flags"""
+    tokens = ['rsync', '-avz', 'src/', '--delete', '--', '-', 'dst/']
+    assert FlagMiner.extract_flags(tokens) == ['-avz', '--delete']
+    assert FlagMiner.extract_flags(['-x']) == []
+
+
+def test_complete_habitual_flag_set():
+    """A typed subset completes to the flags it is usually used with"""
+    miner = FlagMiner(min_support=3)
+    for _ in range(5):
+        miner.add('rsync', ['-a', '-v', '-z', '-P'])
+    miner.add('rsync', ['-a', '--delete'])
+    miner.add('ls', ['-l'])
+    miner.mine()
+
+    completions = miner.complete('rsync', ['-a', '-v'])
+    assert completions[0] == (('-P', '-z'), 1.0)
+
+    # -a appears on 6 lines, 5 of them with -v -z -P; ties prefer the largest set
+    consequent, confidence = miner.complete('rsync', ['-a'])[0]
+    assert consequent == ('-P', '-v', '-z')
+    assert abs(confidence - 5 / 6) < 1e-9
+
+    # Below min_support: nothing mined
+    assert miner.complete('rsync', ['--delete']) == []
+    assert miner.complete('ls', ['-l']) == []
+    assert len(miner) == 1
+
+
+def test_table_size_and_order():
+    """Completions are capped and ordered by confidence, then by length"""
+    miner = FlagMiner(min_support=1, table_size=2)
+    miner.add('tar', ['-x', '-z', '-f'], count=4)
+    miner.add('tar', ['-x', '-v'], count=1)
+    miner.mine()
+
+    completions = miner.complete('tar', ['-x'])
+    assert len(completions) == 2
+    assert completions[0] == (('-f', '-z'), 0.8)
+    assert [confidence for _, confidence in completions] == sorted(
+        (confidence for _, confidence in completions), reverse=True)
+
+
+def test_transactions_stay_bounded():
+    """The rarest flag sets are dropped once the cap is reached"""
+    miner = FlagMiner(max_transactions=10)
+    miner.add('git', ['--common'], count=100)
+    for index in range(20):
+        miner.add('git', [f'--flag{index}'])
+    assert len(miner._transactions['git']) <= 10
+    assert miner._transactions['git'][frozenset(['--common'])] == 100
+
+    miner.clear()
+    assert miner.complete('git', ['--common']) == []
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
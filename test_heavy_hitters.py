@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pytest
+
+from sugcommand.core.heavy_hitters import SpaceSavingCounter, new_line_counter
+
+
+def zipf_stream(rng, keys, length):
+    """Skewed stream where a few keys dominate, like command history"""
+    weights = [1.0 / (rank + 1) for rank in range(keys)]
+    return rng.choices([f"cmd-{index}" for index in range(keys)], weights, k=length)
+
+
+def test_exact_below_capacity():
+    """With no eviction the summary is an exact Counter"""
+    counter = SpaceSavingCounter(capacity=10)
+    exact = Counter()
+    for key in "abcabcaab":
+        counter[key] += 1
+        exact[key] += 1
+
+    assert dict(counter) == dict(exact)
+    assert counter.most_common(1) == [('a', 4)]
+    assert all(counter.error(key) == 0 for key in counter)
+    assert counter['missing'] == 0
+
+
+def test_space_saving_guarantees():
+    """Bounded size, overestimates within the error, every heavy key kept"""
+    rng = random.Random(3)
+    capacity = 50
+    stream = zipf_stream(rng, 1000, 20000)
+
+    counter = SpaceSavingCounter(capacity)
+    exact = Counter()
+    for key in stream:
+        counter[key] += 1
+        exact[key] += 1
+
+    assert len(counter) == capacity
+    # Counts always sum to the stream length
+    assert sum(counter.values()) == len(stream)
+
+    for key in counter:
+        assert exact[key] <= counter[key] <= exact[key] + counter.error(key)
+
+    # Any key seen more than N / capacity times must be tracked
+    for key, count in exact.items():
+        if count > len(stream) / capacity:
+            assert key in counter
+
+    top = [key for key, _ in counter.most_common(5)]
+    assert top == [key for key, _ in exact.most_common(5)]
+
+
+def test_update_merges_counts():
+    """update() adds another mapping's counts like Counter.update"""
+    counter = SpaceSavingCounter(capacity=3)
+    counter.update(Counter({'ls': 5, 'cd': 2}))
+    counter.update({'ls': 1})
+    counter.update(None)
+    assert counter['ls'] == 6
+    assert counter['cd'] == 2
+
+
+def test_eviction_inherits_minimum():
+    """A new key replaces the minimum and records its count as error"""
+    counter = SpaceSavingCounter(capacity=2)
+    counter['a'] += 5
+    counter['b'] += 1
+    counter['c'] += 1
+
+    assert 'b' not in counter
+    assert counter['c'] == 2
+    assert counter.error('c') == 1
+
+
+def test_new_line_counter():
+    assert isinstance(new_line_counter(), Counter)
+    assert isinstance(new_line_counter(8), SpaceSavingCounter)
+    with pytest.raises(ValueError):
+        SpaceSavingCounter(0)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pytest
+
+from sugcommand.core.history_analyzer import HistoryEntry, HistoryPartial
+from sugcommand.core.history_store import NUMPY_AVAILABLE
+
+# Includes lines without a command, which break the chain of pairs
+LINES = ['git status', 'git push', 'ls -la', 'make', 'FOO=1', '# note', 'cd src', 'sudo']
+
+
+def partial(files, columnar):
+    """Partial counts of several history files, merged in order"""
+    merged = HistoryPartial(3600.0, columnar=columnar)
+    for source_id, entries in enumerate(files):
+        part = HistoryPartial(3600.0, columnar=columnar)
+        part.add_entries(entries, source_id)
+        merged.merge(part)
+    if columnar:
+        merged.materialize(2_000_000_000)
+    return merged
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy is not installed")
+def test_column_store_counts_match_counters():
+    """Pairs, frequencies and sequences are the same with and without the column store"""
+    rng = random.Random(3)
+    for _ in range(50):
+        files = [
+            [HistoryEntry(rng.choice(LINES), 1_700_000_000 + index) for index in range(rng.randint(0, 40))]
+            for _ in range(rng.randint(1, 3))
+        ]
+        counters = partial(files, columnar=False)
+        columns = partial(files, columnar=True)
+
+        assert columns.pairs == counters.pairs
+        assert columns.frequencies == counters.frequencies
+        assert columns.sequences == counters.sequences
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy is not installed")
+def test_pairs_skip_lines_without_command():
+    entries = [HistoryEntry(line, 1_700_000_000) for line in ('git status', 'FOO=1', 'make', 'make')]
+    pairs = partial([entries], columnar=True).pairs
+    assert pairs == {'make': {'make': 1}}
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core.config_manager import ConfigManager
+from sugcommand.core.path_completer import PathCompleter, escape_path, unescape_path
+from sugcommand.core.suggestion_engine import SuggestionEngine
+
+
+def make_tree(root):
+    (root / 'project').mkdir()
+    (root / 'project' / 'src').mkdir()
+    (root / 'projects.txt').write_text('')
+    (root / 'my file.txt').write_text('')
+    (root / '.hidden').write_text('')
+    (root / '.config').mkdir()
+    return root
+
+
+def texts(completions):
+    return [completion.text for completion in completions]
+
+
+def test_resolve(tmp_path, monkeypatch):
+    """Typed paths split into the directory to list and the name prefix"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    cwd = str(tmp_path / 'project')
+
+    assert PathCompleter.resolve('sr', cwd) == ('', cwd, 'sr')
+    assert PathCompleter.resolve('src/ma', cwd) == ('src/', os.path.join(cwd, 'src'), 'ma')
+    assert PathCompleter.resolve('../pro', cwd) == ('../', str(tmp_path), 'pro')
+    assert PathCompleter.resolve('/usr/bi', cwd) == ('/usr/', '/usr', 'bi')
+    assert PathCompleter.resolve('/', cwd) == ('/', '/', '')
+    assert PathCompleter.resolve('~/pro', cwd) == ('~/', str(tmp_path), 'pro')
+    assert PathCompleter.resolve('~/project/../pro', '/') == ('~/project/../', str(tmp_path), 'pro')
+
+
+def test_escape_path():
+    """Shell-special characters are escaped, and unescaping restores the path"""
+    assert escape_path('plain/path.txt') == 'plain/path.txt'
+    assert escape_path('my file.txt') == 'my\\ file.txt'
+    assert escape_path("it's (1)") == "it\\'s\\ \\(1\\)"
+    for name in ('my file.txt', "a$b&c", 'back\\slash', '[x]*?'):
+        assert unescape_path(escape_path(name)) == name
+    assert unescape_path('my\\ fi') == 'my fi'
+    assert unescape_path('my\\') == 'my'
+
+
+def test_complete_hides_dotfiles(tmp_path):
+    """Hidden entries only complete for a '.' prefix; directories end with '/'"""
+    make_tree(tmp_path)
+    completer = PathCompleter(prefetch_depth=0)
+
+    assert texts(completer.complete('pro', str(tmp_path))) == ['project/', 'projects.txt']
+    assert '.hidden' not in texts(completer.complete('', str(tmp_path)))
+    assert texts(completer.complete('.', str(tmp_path))) == ['.config/', '.hidden']
+    assert texts(completer.complete('pro', str(tmp_path), directories_only=True)) == ['project/']
+    assert texts(completer.complete('project/s', str(tmp_path))) == ['project/src/']
+    assert completer.complete('missing/x', str(tmp_path)) == []
+
+
+def test_listing_reread_on_mtime_change(tmp_path):
+    """Listings are cached until the directory's mtime changes"""
+    make_tree(tmp_path)
+    completer = PathCompleter(prefetch_depth=0)
+
+    first = completer.list_directory(str(tmp_path))
+    assert completer.list_directory(str(tmp_path)) is first
+    assert completer.get_stats()['hits'] == 1
+
+    (tmp_path / 'program.py').write_text('')
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, first.mtime_ns + 1_000_000_000))
+
+    assert 'program.py' in texts(completer.complete('prog', str(tmp_path)))
+    assert completer.get_stats()['misses'] == 2
+
+
+def test_least_recently_used_dropped(tmp_path):
+    for name in 'abc':
+        (tmp_path / name).mkdir()
+    completer = PathCompleter(max_directories=2, prefetch_depth=0)
+    completer.list_directory(str(tmp_path / 'a'))
+    completer.list_directory(str(tmp_path / 'b'))
+    completer.list_directory(str(tmp_path / 'a'))
+    completer.list_directory(str(tmp_path / 'c'))
+
+    assert completer.get_stats()['directories_cached'] == 2
+    assert list(completer._listings) == [str(tmp_path / 'a'), str(tmp_path / 'c')]
+
+
+def test_escaped_partial_completes(tmp_path, monkeypatch):
+    """A backslash-escaped argument completes and stays escaped on the line"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    make_tree(tmp_path)
+    engine = SuggestionEngine(ConfigManager(tmp_path / 'config'))
+    config = engine.config.snapshot()
+
+    for line in ('cat my\\ fi', 'cat my\\ ', 'cat my'):
+        suggestions = engine._get_path_suggestions(line, str(tmp_path), config)
+        assert [s.full_command for s in suggestions] == ['cat my\\ file.txt'], line
+
+    suggestions = engine._get_path_suggestions('cd pro', str(tmp_path), config)
+    assert [s.full_command for s in suggestions] == ['cd project/']
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pytest
+
+from sugcommand.core import ranking
+from sugcommand.core.ranking import CandidateMatrix, ROW_BLOCK
+from sugcommand.core.suggestion_engine import SuggestionResult
+
+FEATURES = ['command_scanner', 'history', 'frecency', 'sequential', 'arguments', 'directory']
+
+
+def random_sources(rng, candidates, levels=10):
+    """Suggestions per source over a shared candidate pool, with many exact ties"""
+    pool = [f"cmd-{index}" for index in range(candidates)]
+    sources = []
+    for feature in FEATURES:
+        picked = rng.sample(pool, rng.randint(0, candidates))
+        sources.append((feature, [
+            SuggestionResult(command, rng.randint(1, levels) / levels, feature, full_command=command)
+            for command in picked
+        ]))
+    return sources
+
+
+def build(sources, weights):
+    matrix = CandidateMatrix(FEATURES, weights)
+    for feature, suggestions in sources:
+        matrix.add(feature, suggestions)
+    return matrix
+
+
+def build_without_numpy(sources, weights, monkeypatch):
+    """The same matrix as build(), kept in Python lists"""
+    with monkeypatch.context() as patch:
+        patch.setattr(ranking, 'NUMPY_AVAILABLE', False)
+        return build(sources, weights)
+
+
+def merge_and_rank(suggestions, max_suggestions):
+    """
+    Ranking before the candidate matrix: capped sum of confidences, stable
+    sort. Sums are compared to 9 decimals, so candidates tie whatever order
+    their confidences were added in.
+    """
+    groups = {}
+    for suggestion in suggestions:
+        groups.setdefault(suggestion.full_command or suggestion.command, []).append(suggestion)
+    merged = []
+    for key, group in groups.items():
+        merged.append((key, min(round(sum(s.confidence for s in group), 9), 1.0)))
+    merged.sort(key=lambda item: item[1], reverse=True)
+    return merged[:max_suggestions]
+
+
+@pytest.mark.skipif(not ranking.NUMPY_AVAILABLE, reason="numpy is not installed")
+def test_vectorized_matches_python(monkeypatch):
+    """The NumPy path gives the same scores and the same tie order as the Python path"""
+    rng = random.Random(5)
+    weight_levels = [0.5, 0.75, 1.0, 1.3, 2.0]
+
+    for _ in range(200):
+        candidates = rng.randint(1, 4 * ROW_BLOCK)
+        weights = {feature: rng.choice(weight_levels) for feature in FEATURES}
+        sources = random_sources(rng, candidates)
+        matrix = build(sources, weights)
+        python = build_without_numpy(sources, weights, monkeypatch)
+
+        vectorized = matrix.scores()
+        expected = python.scores()
+        assert isinstance(expected, list) and not isinstance(vectorized, list)
+        assert vectorized.tolist() == expected
+        for k in (1, 5, 10, len(matrix)):
+            assert matrix.top_rows(k) == python.top_rows(k)
+            assert matrix.boundary_scores(k) == python.boundary_scores(k)
+
+
+def test_scores_follow_adds():
+    """Cached scores are dropped by add(), and the matrix grows past its first block"""
+    matrix = CandidateMatrix(['history', 'frecency'], {})
+    matrix.add('history', [SuggestionResult(f'cmd-{index}', 0.25, 'history') for index in range(3 * ROW_BLOCK)])
+    assert len(matrix) == 3 * ROW_BLOCK
+    assert matrix.scores() is matrix.scores()
+
+    matrix.add('frecency', [SuggestionResult('cmd-100', 0.5, 'frecency')])
+    assert matrix.top_k(1)[0].command == 'cmd-100'
+    assert matrix.top_k(1)[0].confidence == 0.75
+
+
+@pytest.mark.parametrize('candidates', [8, 4 * ROW_BLOCK])
+def test_unit_weights_match_sum_of_confidences(candidates):
+    """With every weight 1.0 the ranking is the old capped sum of confidences"""
+    rng = random.Random(candidates)
+    for _ in range(50):
+        sources = random_sources(rng, candidates)
+        matrix = build(sources, {})
+        everything = [suggestion for _, suggestions in sources for suggestion in suggestions]
+
+        for k in (1, 5, 10):
+            ranked = [(s.full_command, s.confidence) for s in matrix.top_k(k)]
+            expected = merge_and_rank(everything, k)
+            assert [key for key, _ in ranked] == [key for key, _ in expected]
+            assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+
+
+def test_top_k_merges_sources():
+    """Merged candidates keep their best suggestion and list every source"""
+    matrix = CandidateMatrix(['history', 'frecency'], {'history': 1.0, 'frecency': 0.5})
+    best = SuggestionResult('git status', 0.6, 'history', full_command='git status')
+    matrix.add('history', [best, SuggestionResult('git stash', 0.55, 'history', full_command='git stash')])
+    matrix.add('frecency', [SuggestionResult('git status', 0.2, 'frecency', full_command='git status')])
+
+    top = matrix.top_k(2)
+    assert [s.full_command for s in top] == ['git status', 'git stash']
+    assert top[0].confidence == pytest.approx(0.7)
+    assert top[0].source == 'history+frecency'
+    # Single-source candidates are returned as is
+    assert top[1].source == 'history' and top[1].confidence == 0.55
+
+
+def test_boundary_scores():
+    matrix = CandidateMatrix(['history'], {})
+    assert matrix.boundary_scores(2) == (0.0, 0.0)
+    matrix.add('history', [SuggestionResult(name, score, 'history')
+                           for name, score in (('a', 0.9), ('b', 0.4), ('c', 0.7))])
+    assert matrix.boundary_scores(1) == (0.9, 0.7)
+    assert matrix.boundary_scores(3) == (0.4, 0.0)
+    assert matrix.boundary_scores(5) == (0.0, 0.0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pytest
+
+from sugcommand.integrations.realtime_daemon import RealtimeDaemon
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('PATH', str(tmp_path))
+    daemon = RealtimeDaemon(tmp_path / 'daemon.sock')
+    daemon.engine.history_analyzer.live_publish_interval = 0
+    return daemon
+
+
+def record(daemon, **fields):
+    return daemon._process_request(json.dumps({'type': 'record', **fields}))
+
+
+def frequent(daemon):
+    return dict(daemon.engine.history_analyzer.get_frequent_commands())
+
+
+def test_bad_record_rejected(daemon):
+    """A record with badly typed fields is refused and does not break later ones"""
+    for bad in ({'timestamp': 'soon'}, {'timestamp': [1]}, {'exit_status': 'x'},
+                {'duration': float('inf')}, {'cwd': 3}, {'timestamp': True}):
+        response = record(daemon, command='make', **bad)
+        assert response['recorded'] is False and response['error'], bad
+    assert record(daemon, command=['ls'])['recorded'] is False
+
+    assert record(daemon, command='git status', timestamp='1700000000', exit_status=0, duration=0.5) == {'recorded': True}
+    assert record(daemon, command='git push', timestamp=1700000060) == {'recorded': True}
+    assert frequent(daemon) == {'git': 2}
+    # Replaying the live entries into a rebuilt history still works
+    daemon.engine.history_analyzer.analyze_history(force_refresh=True)
+    assert frequent(daemon) == {'git': 2}
+
+
+def test_spool_drained_on_start(tmp_path, monkeypatch):
+    """Commands spooled while the daemon was down are applied; bad lines are skipped"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('PATH', str(tmp_path))
+    config_dir = tmp_path / '.config' / 'sugcommand'
+    config_dir.mkdir(parents=True)
+    spool = config_dir / 'history_spool.jsonl'
+    spool.write_text('\n'.join([
+        json.dumps({'command': 'docker ps', 'timestamp': 1700000000}),
+        'not json',
+        json.dumps({'command': 'docker ps', 'timestamp': 'yesterday'}),
+        json.dumps({'command': 'docker ps -a', 'timestamp': 1700000060, 'exit_status': 0}),
+    ]) + '\n')
+
+    daemon = RealtimeDaemon(tmp_path / 'daemon.sock')
+
+    assert frequent(daemon) == {'docker': 2}
+    assert not spool.exists()
+    assert not spool.with_suffix('.draining').exists()
+
+
+def test_live_commands_published_in_batches(daemon):
+    """Commands recorded within the publish interval share one snapshot"""
+    analyzer = daemon.engine.history_analyzer
+    analyzer.live_publish_interval = 0.3
+    generation = analyzer.generation
+
+    for command in ('ls', 'ls -la', 'cd src'):
+        assert record(daemon, command=command)['recorded']
+    # The first command is published at once, the rest wait for the timer
+    assert frequent(daemon) == {'ls': 1}
+    assert analyzer.generation == generation + 1
+
+    deadline = time.monotonic() + 5
+    while frequent(daemon) != {'ls': 2, 'cd': 1} and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert frequent(daemon) == {'ls': 2, 'cd': 1}
+    assert analyzer.generation == generation + 2
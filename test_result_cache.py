@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core import result_cache
+from sugcommand.core.result_cache import ResultCache
+
+
+def test_least_recently_used_dropped():
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_generation_in_key_invalidates():
+    """A key with a newer generation misses, whatever the old one cached"""
+    cache = ResultCache()
+    cache.put(('git', None, (1, 1, 1)), ['git status'])
+    assert cache.get(('git', None, (1, 1, 1))) == ['git status']
+    assert cache.get(('git', None, (1, 2, 1))) is None
+    assert cache.get(('git', '/tmp', (1, 1, 1))) is None
+
+
+def test_expired_entries_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    cache = ResultCache(max_age=5.0)
+    cache.put('a', 1)
+
+    now[0] += 5.0
+    assert cache.get('a') == 1
+    now[0] += 0.1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_zero_size_caches_nothing():
+    cache = ResultCache(max_size=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
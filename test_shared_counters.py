@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core.argument_model import ArgumentModel
+from sugcommand.core.directory_index import DirectoryIndex
+from sugcommand.core.pipe_model import PipeTransitionModel
+from sugcommand.core.shared_counters import SharedCounters
+
+
+def test_counters_copied_once_on_first_change():
+    counters = SharedCounters({'git': Counter(status=2), 'ls': Counter(la=1)})
+    clone = counters.share()
+    assert clone['git'] is counters['git']
+
+    writable = clone.writable('git')
+    writable['push'] += 1
+    assert clone.writable('git') is writable
+    assert counters['git'] == Counter(status=2)
+    assert clone['ls'] is counters['ls']
+
+    # The original copies too, so the clone keeps its counts
+    counters.writable('ls')['-a'] += 1
+    assert clone['ls'] == Counter(la=1)
+    clone.writable('make')['test'] += 1
+    assert 'make' not in counters
+
+
+def test_model_copies_keep_their_counts():
+    """A model and its copy learn independently"""
+    arguments, pipes, directories = ArgumentModel(), PipeTransitionModel(), DirectoryIndex()
+    arguments.add(['git', 'status'])
+    pipes.add('ps', 'grep x')
+    directories.add('/tmp', 'ls')
+    copies = arguments.copy(), pipes.copy(), directories.copy()
+
+    copies[0].add(['git', 'push'], 3)
+    copies[1].add('ps', 'less', 3)
+    copies[2].add('/tmp', 'make', 3)
+    arguments.add(['git', 'log'])
+    for model in (arguments, pipes, directories) + copies:
+        model.build_tables()
+
+    assert [token for token, _ in arguments.lookup(['git'])] == ['status', 'log']
+    assert [token for token, _ in copies[0].lookup(['git'])] == ['push', 'status']
+    assert [stage for stage, _ in pipes.lookup('ps')] == ['grep x']
+    assert [line for line, _ in copies[2].lookup('/tmp')[1]] == ['make', 'ls']
+    assert [line for line, _ in directories.lookup('/tmp')[1]] == ['ls']
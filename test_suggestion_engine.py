@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import random
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core.config_manager import ConfigManager
+from sugcommand.core.history_analyzer import HistoryEntry
+from sugcommand.core.sources import INLINE_SOURCE_COST, SourceRegistry, SuggestionSource
+from sugcommand.core.suggestion_engine import SuggestionEngine, SuggestionResult
+from sugcommand.utils.benchmark import trained_engine
+
+COMMANDS = ['git', 'gitk', 'grep', 'docker', 'ls', 'cat', 'cd', 'tar', 'make', 'python3']
+
+LINES = [
+    'git status', 'git add .', 'git commit -m "fix"', 'git push', 'git checkout main',
+    'git checkout -b feature', 'git log --oneline', 'gitk --all', 'grep -rn TODO .',
+    'docker ps', 'docker ps -a', 'docker compose up -d', 'ls -la', 'ls', 'cat README.md',
+    'cd src', 'cd ..', 'tar -xzvf a.tgz', 'tar -xzf b.tgz', 'make test', 'make',
+    'python3 -m pytest -q', 'python3 setup.py sdist',
+]
+
+INPUTS = [
+    'g', 'gi', 'git', 'git ', 'git c', 'git checkout ', 'git checkout m', 'gitk',
+    'd', 'docker p', 'docker ps -', 'l', 'ls -', 'c', 'cd ', 'ta', 'tar -x', 'tar -xz',
+    'm', 'make t', 'p', 'python3 -m', 'unknowncommand', 'git status', '',
+]
+
+
+def synthetic_history(count=600, seed=11):
+    """Skewed, timestamped history with repeated sequences"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(LINES))]
+    entries = []
+    for index in range(count):
+        if index and entries[-1].command == 'git add .':
+            command = 'git commit -m "fix"'
+        else:
+            command = rng.choices(LINES, weights)[0]
+        entries.append(HistoryEntry(command, 1_700_000_000 + index * 60))
+    return entries
+
+
+@contextmanager
+def make_engine(tmp_path, monkeypatch, **settings):
+    """Engine trained on the synthetic history, with a fixed set of commands on PATH"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir(exist_ok=True)
+    for name in COMMANDS:
+        executable = bin_dir / name
+        executable.write_text('#!/bin/sh\n')
+        executable.chmod(0o755)
+
+    config = ConfigManager(tmp_path / 'config')
+    config.update(settings)
+
+    with trained_engine(synthetic_history(), config) as engine:
+        engine.command_scanner.scan_directories = [bin_dir]
+        engine.command_scanner.scan_commands(force_refresh=True)
+        yield engine
+
+
+def ranked(suggestions):
+    return [(s.full_command or s.command, round(s.confidence, 9), s.source) for s in suggestions]
+
+
+def test_batch_matches_single_queries(tmp_path, monkeypatch):
+    """get_suggestions_batch answers exactly like one query per input"""
+    with make_engine(tmp_path, monkeypatch, parallel_sources_enabled=False) as engine:
+        inputs = INPUTS + list(reversed(INPUTS))
+        batch = engine.get_suggestions_batch(inputs, cwd=str(tmp_path))
+        assert len(batch.suggestions) == len(inputs)
+
+        for text, suggestions in zip(inputs, batch.suggestions):
+            engine._result_cache.clear()
+            single = engine.get_suggestions(text, cwd=str(tmp_path)) if text else []
+            assert ranked(suggestions) == ranked(single), text
+
+        assert any(batch.suggestions)
+
+
+def test_batch_per_input_cwd(tmp_path, monkeypatch):
+    """Each input is answered against its own working directory"""
+    with make_engine(tmp_path, monkeypatch, parallel_sources_enabled=False) as engine:
+        cwds = [str(tmp_path), '/', str(tmp_path)]
+        batch = engine.get_suggestions_batch(['git', 'git', 'docker'], cwds=cwds)
+        for text, cwd, suggestions in zip(['git', 'git', 'docker'], cwds, batch.suggestions):
+            engine._result_cache.clear()
+            assert ranked(suggestions) == ranked(engine.get_suggestions(text, cwd=cwd))
+
+
+def test_early_termination_keeps_top_k(tmp_path, monkeypatch):
+    """Skipping sources never changes which suggestions make the top k"""
+    for k in (1, 3, 10):
+        results = {}
+        for early_termination in (True, False):
+            with make_engine(tmp_path, monkeypatch, parallel_sources_enabled=False,
+                             early_termination_enabled=early_termination, max_suggestions=k) as engine:
+                results[early_termination] = [
+                    sorted(s.full_command or s.command for s in engine.get_suggestions(text, cwd=str(tmp_path)))
+                    for text in INPUTS
+                ]
+        assert results[True] == results[False]
+
+
+def test_early_termination_counts_merged_scores(tmp_path, monkeypatch):
+    """A skipped source could lift a candidate below the k-th into the top k"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+    def fixed(*suggestions):
+        return lambda context: [
+            SuggestionResult(command, confidence, 'test', full_command=command)
+            for command, confidence in suggestions
+        ]
+
+    answers = {}
+    for early_termination in (True, False):
+        config = ConfigManager(tmp_path / 'config')
+        config.update({'max_suggestions': 1, 'parallel_sources_enabled': False,
+                       'early_termination_enabled': early_termination})
+        engine = SuggestionEngine(config)
+        engine.sources = SourceRegistry()
+        engine.sources.register(SuggestionSource('history', fixed(('gitk', 0.85), ('git', 0.5)), 10.0))
+        engine.sources.register(SuggestionSource('command_scanner', fixed(('git', 0.8)), 20.0,
+                                                 max_confidence=0.8))
+        answers[early_termination] = [s.command for s in engine.get_suggestions('gi')]
+        stats = engine.sources.get_stats()
+        assert stats['command_scanner']['runs'] == 1
+
+    assert answers[True] == answers[False] == ['git']
+
+
+def test_tail_sources_overlap_inline_ones(tmp_path, monkeypatch):
+    """Expensive sources run while the cheap ones do, all under one deadline"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+    def sleeping(seconds, command):
+        def fetch(context):
+            time.sleep(seconds)
+            return [SuggestionResult(command, 0.5, 'test', full_command=command)]
+        return fetch
+
+    def run(deadline_ms, tail_seconds=0.2):
+        config = ConfigManager(tmp_path / 'config')
+        config.update({'parallel_sources_enabled': True, 'source_deadline_ms': deadline_ms,
+                       'early_termination_enabled': False})
+        engine = SuggestionEngine(config)
+        engine.sources = SourceRegistry()
+        engine.sources.register(SuggestionSource('slow_inline', sleeping(0.2, 'git'), 10.0))
+        engine.sources.register(SuggestionSource('cheap', sleeping(0, 'gitk'), 20.0))
+        engine.sources.register(SuggestionSource('tail', sleeping(tail_seconds, 'grep'), INLINE_SOURCE_COST * 2))
+        start = time.perf_counter()
+        result = engine.query('g')
+        return result, time.perf_counter() - start
+
+    result, elapsed = run(350)
+    assert {name: report.status for name, report in result.sources.items()} == {
+        'slow_inline': 'ok', 'cheap': 'ok', 'tail': 'ok'}
+    # Run one after the other this would take 0.4s
+    assert elapsed < 0.35
+
+    # A slow inline source uses up the deadline: later ones are dropped unstarted
+    result, elapsed = run(100, tail_seconds=1.0)
+    statuses = {name: report.status for name, report in result.sources.items()}
+    assert statuses == {'slow_inline': 'ok', 'cheap': 'late', 'tail': 'late'}
+    assert elapsed < 0.6
+    assert [s.command for s in result.suggestions] == ['git']
+
+
+def test_query_reads_one_history_snapshot(tmp_path, monkeypatch):
+    """A snapshot published while a query runs is not seen by its later sources"""
+    with make_engine(tmp_path, monkeypatch, parallel_sources_enabled=False,
+                     early_termination_enabled=False) as engine:
+        analyzer = engine.history_analyzer
+        analyzer.live_publish_interval = 0
+        published = iter(LINES * 3)
+
+        def publish(context):
+            # Changes the last command, which the sequence sources read
+            analyzer.record_command(HistoryEntry(next(published), time.time(), str(tmp_path)))
+            return []
+
+        for text in INPUTS[:-1]:
+            engine.sources.unregister('publish')
+            engine._result_cache.clear()
+            expected = ranked(engine.get_suggestions(text, cwd=str(tmp_path)))
+
+            engine.sources.register(SuggestionSource('publish', publish, 0.1))
+            engine._result_cache.clear()
+            generation = analyzer.generation
+            assert ranked(engine.get_suggestions(text, cwd=str(tmp_path))) == expected, text
+            assert analyzer.generation != generation
+
+
+def test_session_narrowing_matches_fresh_query(tmp_path, monkeypatch):
+    """Each keystroke of a session answers exactly like a fresh query of the whole index"""
+    with make_engine(tmp_path, monkeypatch, parallel_sources_enabled=False) as engine:
+        session = engine.create_session()
+        for line in ('git checkout m', 'docker ps -', 'python3 -m'):
+            for end in range(1, len(line) + 1):
+                text = line[:end]
+                incremental = ranked(session.get_suggestions(text, cwd=str(tmp_path)))
+                engine._result_cache.clear()
+                assert incremental == ranked(engine.get_suggestions(text, cwd=str(tmp_path))), text
+                engine._result_cache.clear()
+        assert session.incremental_queries > 0
+
+        # A deletion searches everything again
+        full_queries = session.full_queries
+        session.get_suggestions('pyth', cwd=str(tmp_path))
+        assert session.full_queries == full_queries + 1
+
+
+def test_iter_suggestions_ends_with_final_ranking(tmp_path, monkeypatch):
+    """Updates follow source order, only when the ranking changes, and end with the full answer"""
+    with make_engine(tmp_path, monkeypatch, early_termination_enabled=False) as engine:
+        order = [source.name for source in engine.sources.ordered()]
+        for text in INPUTS[:-1]:
+            engine._result_cache.clear()
+            updates = list(engine.iter_suggestions(text, cwd=str(tmp_path)))
+            *provisional, final = updates
+
+            assert final.final and final.source is None and final.result is not None
+            assert not any(update.final for update in provisional)
+            sources = [update.source for update in provisional]
+            assert sources == sorted(sources, key=order.index), text
+            rankings = [ranked(update.suggestions) for update in provisional]
+            assert all(a != b for a, b in zip(rankings, rankings[1:])), text
+            assert [u.elapsed for u in updates] == sorted(u.elapsed for u in updates)
+
+            engine._result_cache.clear()
+            assert ranked(final.suggestions) == ranked(engine.get_suggestions(text, cwd=str(tmp_path))), text
+
+        # A cached answer is a single final update
+        engine.get_suggestions('git', cwd=str(tmp_path))
+        cached = list(engine.iter_suggestions('git', cwd=str(tmp_path)))
+        assert len(cached) == 1 and cached[0].final and cached[0].result.cached
+
+
+def test_result_cache_key_and_generations(tmp_path, monkeypatch):
+    """Answers are cached per input and cwd, and new data or settings invalidate them"""
+    with make_engine(tmp_path, monkeypatch) as engine:
+        cwd = str(tmp_path)
+        assert not engine.query('git', cwd).cached
+        assert engine.query('git', cwd).cached
+        assert engine.query('  git', cwd + '/').cached
+        assert not engine.query('git', '/').cached
+
+        engine.history_analyzer.live_publish_interval = 0
+        engine.history_analyzer.record_command(HistoryEntry('git push', time.time(), cwd))
+        assert not engine.query('git', cwd).cached
+
+        engine.config.set_max_suggestions(3)
+        result = engine.query('git', cwd)
+        assert not result.cached and len(result.suggestions) <= 3
+        assert engine.query('git', cwd).cached
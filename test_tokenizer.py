@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sugcommand.core.tokenizer import Redirection, get_base_command, parse_command_line
+
+
+def test_quoted_operators_stay_in_words():
+    """Operators inside quotes do not split the line"""
+    parsed = parse_command_line('echo "a|b"')
+    assert len(parsed.segments) == 1
+    assert parsed.tokens == ('echo', '"a|b"')
+    assert parsed.pipe_transitions() == []
+
+
+def test_redirections():
+    """Redirections are collected with their target, not kept as arguments"""
+    segment = parse_command_line('ls >> out').current
+    assert segment.tokens == ('ls',)
+    assert segment.redirections == (Redirection('>>', 'out'),)
+
+    parsed = parse_command_line('cmd 2>&1 | tee log')
+    first, second = parsed.segments
+    assert first.tokens == ('cmd',)
+    assert first.redirections == (Redirection('2>&', '1'),)
+    assert second.operator == '|' and second.tokens == ('tee', 'log')
+    assert second.start == len('cmd 2>&1 | ')
+    assert parsed.pipe_transitions() == [('cmd', 'tee log')]
+
+
+def test_assignments_and_wrappers():
+    """Leading assignments and wrapper commands (with their options) are not the command"""
+    segment = parse_command_line('FOO=1 sudo -u root apt install x').current
+    assert segment.tokens == ('apt', 'install', 'x')
+    assert segment.assignments == ('FOO=1',)
+    assert segment.wrappers == ('sudo',)
+
+    segment = parse_command_line('env A=1 python x.py').current
+    assert segment.tokens == ('python', 'x.py')
+    assert segment.assignments == ('A=1',)
+    assert segment.wrappers == ('env',)
+
+    segment = parse_command_line('time nice -n 5 make').current
+    assert segment.tokens == ('make',)
+    assert segment.wrappers == ('time', 'nice')
+
+    # A lone wrapper is the command itself
+    assert get_base_command('sudo') == 'sudo'
+
+
+def test_unterminated_quotes():
+    """An unterminated quote runs to the end of the line instead of failing"""
+    assert parse_command_line('echo "unterminated | x').tokens == ('echo', '"unterminated | x')
+    assert parse_command_line("git commit -m 'half").tokens == ('git', 'commit', '-m', "'half")
+
+
+def test_bare_assignment_has_no_command():
+    parsed = parse_command_line('FOO=1')
+    assert parsed.command is None
+    assert parsed.current.assignments == ('FOO=1',)
+    assert get_base_command('FOO=1 ') is None
+
+
+def test_trailing_operator_starts_empty_segment():
+    """A line ending in an operator is editing a new, still empty command"""
+    parsed = parse_command_line('ps aux | ')
+    assert [segment.tokens for segment in parsed.segments] == [('ps', 'aux'), ()]
+    assert parsed.current.operator == '|'
+    assert parsed.current.start == len('ps aux | ')